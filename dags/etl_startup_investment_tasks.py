@@ -1,69 +1,120 @@
-"""
-DAG file for running the data extraction tasks with Airflow.
-
-This DAG file defines the data extraction tasks using Airflow. It sets up a DAG with a start
-and finish task, and creates PythonOperator tasks for each ETL file found in the data folder.
-The ETL tasks are performed using the `App.run` method.
-
-DAG Properties:
-    Name: The name of the DAG.
-    Default Args: Default arguments for the DAG.
-    Description: A brief description of the DAG.
-    Schedule Interval: The schedule interval for the DAG.
-    Start Date: The start date for the DAG execution.
-
-Tasks:
-    start: An empty operator to indicate the start of the DAG.
-    finish: An empty operator to indicate the finish of the DAG.
-    tasks: PythonOperator tasks for each ETL file found in the data folder.
-"""
-
-import os
-from airflow import DAG
-from airflow.operators.python import PythonOperator
-from airflow.operators.empty import EmptyOperator
-from airflow.utils.dates import days_ago
-
-from src import App
-from src.configs.app import AppConfigs
-from src.configs.airflow import AirflowConfigs
-
-
-def get_etl_file_names():
-    """
-    Get a list of ETL file names from the data folder.
-
-    Returns:
-        List[str]: A list of file names for ETL files found in the data folder.
-    """
-    return [
-        data
-        for data in os.listdir(AppConfigs.DATA_FOLDER)
-        if data.endswith('.csv')
-    ]
-
-
-dag = DAG(
-    AppConfigs.NAME,
-    default_args=AirflowConfigs.default_args,
-    description=AppConfigs.DESCRIPTION,
-    schedule_interval=AppConfigs.SCHEDULE_INTERVAL,
-    start_date=days_ago(0, minute=1),
-    catchup=False,
-)
-
-start = EmptyOperator(task_id="start")
-finish = EmptyOperator(task_id="finish")
-
-tasks = []
-for file_name in get_etl_file_names():
-    file_path = f'{AppConfigs.DATA_FOLDER}/{file_name}'
-    current_task = PythonOperator(
-        task_id=f'{file_name}',
-        python_callable=App.run,
-        op_kwargs={'file_paths': [file_path]},
-        dag=dag,
-    )
-    tasks.append(current_task)
-
-start >> tasks >> finish  # pylint: disable=pointless-statement
+"""
+DAG file for running the data extraction tasks with Airflow.
+
+This DAG file defines the data extraction tasks using Airflow. It sets up a DAG with a start
+and finish task, a plan task that splits the ETL files found in the data folder into tasks of
+similar size, and an ETL task mapped over the planned tasks. The ETL tasks are performed using
+the `App.run` method.
+
+DAG Properties:
+    Name: The name of the DAG.
+    Default Args: Default arguments for the DAG.
+    Description: A brief description of the DAG.
+    Schedule Interval: The schedule interval for the DAG.
+    Start Date: The start date for the DAG execution.
+
+Tasks:
+    start: An empty operator to indicate the start of the DAG.
+    plan: A PythonOperator planning the ETL tasks with ShardPlanner. Large files are split
+        into byte range shards and small files are grouped.
+    etl: A PythonOperator mapped over the planned ETL tasks.
+    finish: An empty operator to indicate the finish of the DAG.
+
+The scheduler parses this file repeatedly, so parsing only imports Airflow and the
+configurations. The data folder is listed and pandas and pymongo are imported when the
+tasks run, not when the DAG is parsed.
+"""
+
+import os
+from typing import Dict, List, Optional
+from airflow import DAG
+from airflow.operators.python import PythonOperator
+from airflow.operators.empty import EmptyOperator
+from airflow.utils.dates import days_ago
+
+from src.configs.app import AppConfigs
+from src.configs.airflow import AirflowConfigs
+
+
+def get_etl_file_paths() -> List[str]:
+    """
+    Get a list of ETL file paths from the data folder.
+
+    Only the plan task lists the folder, once per DAG run, so parsing the DAG never does.
+
+    Returns:
+        List[str]: A list of file paths for ETL files found in the data folder.
+    """
+    return [
+        f'{AppConfigs.DATA_FOLDER}/{file_name}'
+        for file_name in sorted(os.listdir(AppConfigs.DATA_FOLDER))
+        if file_name.endswith('.csv')
+    ]
+
+
+def plan_etl_tasks(run_id: str) -> List[Dict]:
+    """
+    Plan the ETL tasks of the files in the data folder by their size.
+
+    Args:
+        run_id (str): The id of the DAG run, passed on to every task.
+
+    Returns:
+        List[Dict]: The App.run keyword arguments of every task.
+    """
+    from src.models.shard_planner import ShardPlanner  # pylint: disable=import-outside-toplevel
+
+    planner = ShardPlanner(
+        target_bytes=AppConfigs.SHARD_TARGET_BYTES,
+        small_file_bytes=AppConfigs.SMALL_FILE_BYTES,
+    )
+    return [{**task, 'run_id': run_id} for task in planner.plan(get_etl_file_paths())]
+
+
+def run_etl_task(
+        file_paths: List[str], run_id: str, byte_range: Optional[List[int]] = None
+) -> Dict:
+    """
+    Run a planned ETL task, importing the ETL application only when the task runs.
+
+    The arguments are named explicitly because Airflow passes the whole task context to
+    callables that accept arbitrary keyword arguments.
+
+    Args:
+        file_paths (List[str]): The paths of the files of the task.
+        run_id (str): The id of the DAG run.
+        byte_range (Optional[List[int]]): The byte range of a shard of a split file.
+
+    Returns:
+        Dict: The pipeline metrics summary of the task.
+    """
+    from src.app import App  # pylint: disable=import-outside-toplevel
+
+    return App.run(file_paths, run_id=run_id, byte_range=byte_range)
+
+
+dag = DAG(
+    AppConfigs.NAME,
+    default_args=AirflowConfigs.default_args,
+    description=AppConfigs.DESCRIPTION,
+    schedule_interval=AppConfigs.SCHEDULE_INTERVAL,
+    start_date=days_ago(0, minute=1),
+    catchup=False,
+)
+
+start = EmptyOperator(task_id="start")
+finish = EmptyOperator(task_id="finish")
+
+plan = PythonOperator(
+    task_id='plan',
+    python_callable=plan_etl_tasks,
+    op_kwargs={'run_id': '{{ run_id }}'},
+    dag=dag,
+)
+etl = PythonOperator.partial(
+    task_id='etl',
+    python_callable=run_etl_task,
+    dag=dag,
+).expand(op_kwargs=plan.output)
+
+start >> plan >> etl >> finish  # pylint: disable=pointless-statement
@@ -0,0 +1,116 @@
+"""
+Query result cache for the search tool.
+
+Entries are evicted least recently used first once the cache is full, and expire after a
+time to live. Every entry records the ETL load generation it was computed at, so results
+computed before a newer load are never served. The cache is safe to share between threads
+and can be persisted to a JSON file to survive separate CLI runs. The file is written when
+the process exits or flush is called, not on every stored query.
+"""
+import atexit
+import copy
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+from bson import json_util
+
+
+class QueryCache:
+    """
+    This class stores search results by normalized query with LRU and TTL eviction.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, path: Optional[str] = None) -> None:
+        """
+        Constructor that loads the persisted entries if a path is given.
+
+        :param max_entries: The maximum number of cached queries.
+        :param ttl_seconds: The number of seconds an entry is served for.
+        :param path: The JSON file the cache is persisted to, None keeps it in memory only.
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.path = path
+        self.entries: OrderedDict = OrderedDict()
+        self.lock = threading.Lock()
+        self.changed = False
+        if path is not None:
+            if os.path.exists(path):
+                with open(path, encoding='utf-8') as cache_file:
+                    self.entries = OrderedDict(json_util.loads(cache_file.read()))
+            atexit.register(self.flush)
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        """
+        Normalizes a query so that queries differing in case or spacing share an entry.
+
+        :param query: The search query string.
+        :return: The normalized query.
+        """
+        return ' '.join(query.lower().split())
+
+    def get(self, key: str, generation: int) -> Optional[Any]:
+        """
+        Returns the cached results of a key if they are fresh and of the given generation.
+
+        :param key: The cache key of the query.
+        :param generation: The current load generation.
+        :return: A copy of the cached results, or None on a miss.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if (
+                    entry['generation'] != generation
+                    or time.time() - entry['stored_at'] > self.ttl_seconds
+            ):
+                del self.entries[key]
+                return None
+
+            self.entries.move_to_end(key)
+            return copy.deepcopy(entry['results'])
+
+    def put(self, key: str, generation: int, results: Any) -> None:
+        """
+        Stores the results of a key and evicts the least recently used entries.
+
+        :param key: The cache key of the query.
+        :param generation: The load generation the results were computed at.
+        :param results: The search results.
+        """
+        with self.lock:
+            self.entries[key] = {
+                'generation': generation,
+                'stored_at': time.time(),
+                'results': copy.deepcopy(results),
+            }
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            self.changed = True
+
+    def flush(self) -> None:
+        """
+        Writes the entries to the cache file, if one is configured and they changed.
+
+        Called when the process exits. The entries are serialized under the lock and written
+        after releasing it, so searches are not blocked by the file write.
+        """
+        if self.path is None:
+            return
+        with self.lock:
+            if not self.changed:
+                return
+            content = json_util.dumps(list(self.entries.items()))
+            self.changed = False
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary_path = f'{self.path}.{os.getpid()}.tmp'
+        with open(temporary_path, 'w', encoding='utf-8') as cache_file:
+            cache_file.write(content)
+        os.replace(temporary_path, self.path)
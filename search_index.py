@@ -0,0 +1,422 @@
+"""
+Local BM25 inverted index for the search tool.
+
+The index is built from a snapshot of the searched MongoDB collections. Every build writes a
+new generation folder inside the index folder and then replaces the CURRENT file, which names
+the generation to read, so a reader always opens the files of a single generation:
+
+    CURRENT               name of the current generation folder
+    <generation>/
+        terms.json        term -> [posting offset, posting length, document frequency]
+        postings.bin      posting lists of (document number delta, term frequency) varint pairs
+        doc_lengths.bin   number of tokens of every document as uint32
+        length_norms.bin  BM25 length normalization of every document as float64
+        documents.json    collection name and _id of every document number
+        meta.json         document count, average document length and last indexed write time
+
+postings.bin, doc_lengths.bin and length_norms.bin are memory-mapped, so a query only reads
+the posting lists of its own terms and the norms of the documents containing them.
+
+The ETL does not update the index. After a load it is stale until the search tool's
+--update-index or --build-index is run again, and a BM25Index keeps the generation it was
+opened at, so a running search server serves the new generation once it is restarted.
+"""
+import json
+import math
+import os
+import re
+import shutil
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import numpy as np
+from bson import json_util
+
+TOKEN_PATTERN = re.compile(r'\w+')
+CURRENT_FILE = 'CURRENT'
+GENERATION_PREFIX = 'generation-'
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Splits a text into lowercase word tokens.
+
+    :param text: The text to tokenize.
+    :return: The tokens of the text.
+    """
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def encode_varints(values: Iterable[int]) -> bytes:
+    """
+    Encodes non-negative integers as LEB128 varints.
+
+    :param values: The integers to encode.
+    :return: The encoded bytes.
+    """
+    encoded = bytearray()
+    for value in values:
+        while value >= 0x80:
+            encoded.append((value & 0x7F) | 0x80)
+            value >>= 7
+        encoded.append(value)
+    return bytes(encoded)
+
+
+def decode_varints(buffer: np.ndarray) -> np.ndarray:
+    """
+    Decodes LEB128 varints with vectorized numpy operations.
+
+    :param buffer: The encoded bytes as a uint8 array.
+    :return: The decoded integers as a uint64 array.
+    """
+    if len(buffer) == 0:
+        return np.zeros(0, dtype=np.uint64)
+    ends = np.flatnonzero(buffer < 0x80)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    byte_positions = np.arange(len(buffer)) - np.repeat(starts, ends - starts + 1)
+    shifted = (buffer & 0x7F).astype(np.uint64) << (7 * byte_positions).astype(np.uint64)
+    return np.add.reduceat(shifted, starts)
+
+
+def length_norms(doc_lengths: np.ndarray, average_length: float) -> np.ndarray:
+    """
+    Computes the BM25 length normalization of every document, the denominator term that
+    does not depend on the query.
+
+    :param doc_lengths: The number of tokens of every document.
+    :param average_length: The average number of tokens of the documents.
+    :return: The length norms as a float64 array.
+    """
+    return BM25_K1 * (
+        1 - BM25_B + BM25_B * np.asarray(doc_lengths, dtype=np.float64)
+        / max(average_length, 1e-9)
+    )
+
+
+class BM25Index:  # pylint: disable=too-many-instance-attributes
+    """
+    This class answers top-k BM25 queries from a memory-mapped inverted index folder.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Constructor that opens the index folder at the given path.
+
+        :param path: The folder of the index.
+        """
+        self.path = path
+        self.generation_path = os.path.join(path, self.current_generation(path))
+        with open(self._file_path('meta.json'), encoding='utf-8') as meta_file:
+            self.meta = json.load(meta_file)
+        with open(self._file_path('terms.json'), encoding='utf-8') as terms_file:
+            self.terms = json.load(terms_file)
+        with open(self._file_path('documents.json'), encoding='utf-8') as documents_file:
+            self.documents = json_util.loads(documents_file.read())
+        self.postings = self._memory_map('postings.bin', np.uint8)
+        self.doc_lengths = self._memory_map('doc_lengths.bin', np.uint32)
+        if os.path.exists(self._file_path('length_norms.bin')):
+            self.length_norms = self._memory_map('length_norms.bin', np.float64)
+        else:  # a generation written before the norms were stored
+            self.length_norms = length_norms(self.doc_lengths, self.meta['average_length'])
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        """
+        Checks whether an index was built at the given path.
+
+        :param path: The folder of the index.
+        :return: True if the index exists.
+        """
+        return os.path.exists(os.path.join(path, CURRENT_FILE))
+
+    @staticmethod
+    def current_generation(path: str) -> str:
+        """
+        Reads the name of the generation folder of the index that readers open.
+
+        :param path: The folder of the index.
+        :return: The name of the current generation folder.
+        """
+        with open(os.path.join(path, CURRENT_FILE), encoding='utf-8') as current_file:
+            return current_file.read().strip()
+
+    def search(self, query: str, limit: int) -> List[Tuple[float, str, object]]:
+        """
+        Scores the documents containing any query term with BM25 and returns the top ones.
+
+        :param query: The search query string.
+        :param limit: The maximum number of results.
+        :return: A list of (score, collection name, _id) tuples sorted by score.
+        """
+        document_count = self.meta['document_count']
+        if document_count == 0:
+            return []
+
+        scores = np.zeros(document_count, dtype=np.float64)
+        for term, term_count in Counter(tokenize(query)).items():
+            if term not in self.terms:
+                continue
+            offset, length, doc_frequency = self.terms[term]
+            values = decode_varints(self.postings[offset:offset + length])
+            doc_numbers = np.cumsum(values[0::2]).astype(np.int64)
+            term_frequencies = values[1::2].astype(np.float64)
+
+            idf = math.log(1 + (document_count - doc_frequency + 0.5) / (doc_frequency + 0.5))
+            scores[doc_numbers] += term_count * idf * term_frequencies * (BM25_K1 + 1) / (
+                term_frequencies + self.length_norms[doc_numbers]
+            )
+
+        matched = np.flatnonzero(scores)
+        if len(matched) > limit:
+            matched = matched[np.argpartition(-scores[matched], limit - 1)[:limit]]
+        matched = matched[np.argsort(-scores[matched], kind='stable')]
+        return [
+            (float(scores[doc_number]), *self.documents[doc_number])
+            for doc_number in matched
+        ]
+
+    def _file_path(self, file_name: str) -> str:
+        """
+        The path of a file of the generation the index was opened at.
+        """
+        return os.path.join(self.generation_path, file_name)
+
+    def _memory_map(self, file_name: str, dtype: type) -> np.ndarray:
+        """
+        Memory-maps a binary file of the index, an empty file gives an empty array.
+        """
+        file_path = self._file_path(file_name)
+        if os.path.getsize(file_path) == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(file_path, dtype=dtype, mode='r')
+
+
+class BM25IndexBuilder:  # pylint: disable=too-many-instance-attributes
+    """
+    This class builds or incrementally updates a BM25 index folder from MongoDB collections.
+    """
+
+    def __init__(
+            self, path: str, search_column: str, loaded_at_field: str = '_loaded_at',
+    ) -> None:
+        """
+        Constructor of the builder of the index at the given path.
+
+        :param path: The folder of the index.
+        :param search_column: The text field of the documents that is indexed.
+        :param loaded_at_field: The field the ETL stamps every written document with the
+            time of its write in.
+        """
+        self.path = path
+        self.search_column = search_column
+        self.loaded_at_field = loaded_at_field
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        self.doc_lengths: List[int] = []
+        self.documents: List[Tuple[str, object]] = []
+        self.doc_numbers: Dict[Tuple[str, object], int] = {}
+        self.replaced: Set[int] = set()
+        self.last_loaded_at: Dict[str, object] = {}
+
+    def build(self, collections: Iterable) -> int:
+        """
+        Builds the index from a full snapshot of the collections.
+
+        :param collections: The MongoDB collections to index.
+        :return: The number of indexed documents.
+        """
+        for collection in collections:
+            self._add_documents(collection)
+        self._write()
+        return len(self.documents)
+
+    def update(self, collections: Iterable) -> int:
+        """
+        Adds the documents written since the last build or update to the index.
+
+        The documents are selected by the write time the ETL stamps them with, so new
+        documents and documents replaced by an upsert load are both read, whatever their
+        _id. A document indexed before replaces its previous version. Deleted documents are
+        only reflected by a full build, and so are documents written by a load that ran
+        while the previous update read the collection.
+
+        :param collections: The MongoDB collections to index.
+        :return: The number of documents added or replaced in the index.
+        """
+        if not BM25Index.exists(self.path):
+            return self.build(collections)
+
+        self._read()
+        added_count = 0
+        for collection in collections:
+            added_count += self._add_documents(
+                collection, self.last_loaded_at.get(collection.name)
+            )
+        self._write()
+        return added_count
+
+    def _add_documents(self, collection, loaded_since: Optional[object] = None) -> int:
+        """
+        Tokenizes the documents of a collection written since a time, all by default, and
+        appends them to the postings. The documents written exactly at that time that are
+        already indexed are skipped.
+
+        :return: The number of documents added or replaced.
+        """
+        added_count = 0
+        query = {self.search_column: {'$type': 'string'}}
+        if loaded_since is not None:
+            query[self.loaded_at_field] = {'$gte': loaded_since}
+        cursor = collection.find(
+            query, {self.search_column: 1, self.loaded_at_field: 1},
+        ).sort('_id', 1)
+        for document in cursor:
+            doc_number = len(self.documents)
+            document_key = (collection.name, document['_id'])
+            loaded_at = document.get(self.loaded_at_field)
+            if document_key in self.doc_numbers:
+                if loaded_since is not None and loaded_at == loaded_since:
+                    continue
+                self.replaced.add(self.doc_numbers[document_key])
+            self.doc_numbers[document_key] = doc_number
+            tokens = tokenize(document[self.search_column])
+            for term, term_frequency in Counter(tokens).items():
+                self.postings.setdefault(term, []).append((doc_number, term_frequency))
+            self.doc_lengths.append(len(tokens))
+            self.documents.append(document_key)
+            last_loaded_at = self.last_loaded_at.get(collection.name)
+            if loaded_at is not None and (last_loaded_at is None or loaded_at > last_loaded_at):
+                self.last_loaded_at[collection.name] = loaded_at
+            added_count += 1
+        return added_count
+
+    def _drop_replaced(self) -> None:
+        """
+        Removes the previous versions of the replaced documents and renumbers the others.
+        """
+        if not self.replaced:
+            return
+        new_numbers = np.cumsum(
+            [doc_number not in self.replaced for doc_number in range(len(self.documents))]
+        ) - 1
+        for term in list(self.postings):
+            postings = [
+                (int(new_numbers[doc_number]), term_frequency)
+                for doc_number, term_frequency in self.postings[term]
+                if doc_number not in self.replaced
+            ]
+            if postings:
+                self.postings[term] = postings
+            else:
+                del self.postings[term]
+        self.doc_lengths = [
+            length for doc_number, length in enumerate(self.doc_lengths)
+            if doc_number not in self.replaced
+        ]
+        self.documents = [
+            document for doc_number, document in enumerate(self.documents)
+            if doc_number not in self.replaced
+        ]
+        self.doc_numbers = {
+            document: doc_number for doc_number, document in enumerate(self.documents)
+        }
+        self.replaced = set()
+
+    def _write(self) -> None:  # pylint: disable=too-many-locals
+        """
+        Writes the index files into a new generation folder and makes it the current one.
+
+        The CURRENT file is replaced in a single step, so readers open either the previous
+        or the new generation, never a mix of both. The generations older than the previous
+        one are removed.
+        """
+        self._drop_replaced()
+        os.makedirs(self.path, exist_ok=True)
+        previous_generation = self._previous_generation()
+        generation = f'{GENERATION_PREFIX}{self._generation_number(previous_generation) + 1:06d}'
+        generation_path = os.path.join(self.path, generation)
+        shutil.rmtree(generation_path, ignore_errors=True)
+        os.makedirs(generation_path)
+
+        terms = {}
+        with open(os.path.join(generation_path, 'postings.bin'), 'wb') as postings_file:
+            offset = 0
+            for term, postings in self.postings.items():
+                previous_doc_number = 0
+                values = []
+                for doc_number, term_frequency in postings:
+                    values.extend((doc_number - previous_doc_number, term_frequency))
+                    previous_doc_number = doc_number
+                encoded = encode_varints(values)
+                postings_file.write(encoded)
+                terms[term] = [offset, len(encoded), len(postings)]
+                offset += len(encoded)
+
+        meta = {
+            'document_count': len(self.documents),
+            'average_length': (
+                sum(self.doc_lengths) / len(self.doc_lengths) if self.doc_lengths else 0.0
+            ),
+            'last_loaded_at': json_util.dumps(self.last_loaded_at),
+        }
+        with open(os.path.join(generation_path, 'doc_lengths.bin'), 'wb') as lengths_file:
+            lengths_file.write(np.asarray(self.doc_lengths, dtype=np.uint32).tobytes())
+        with open(os.path.join(generation_path, 'length_norms.bin'), 'wb') as norms_file:
+            norms_file.write(
+                length_norms(self.doc_lengths, meta['average_length']).tobytes()
+            )
+        self._write_file(os.path.join(generation, 'terms.json'), json.dumps(terms))
+        self._write_file(
+            os.path.join(generation, 'documents.json'), json_util.dumps(self.documents)
+        )
+        self._write_file(os.path.join(generation, 'meta.json'), json.dumps(meta))
+        self._write_file(f'{CURRENT_FILE}.tmp', generation)
+        os.replace(
+            os.path.join(self.path, f'{CURRENT_FILE}.tmp'), os.path.join(self.path, CURRENT_FILE)
+        )
+
+        for file_name in os.listdir(self.path):
+            if (
+                    file_name.startswith(GENERATION_PREFIX)
+                    and file_name not in (generation, previous_generation)
+            ):
+                shutil.rmtree(os.path.join(self.path, file_name), ignore_errors=True)
+
+    def _previous_generation(self) -> Optional[str]:
+        """
+        The name of the current generation folder, None before the first build.
+        """
+        if not BM25Index.exists(self.path):
+            return None
+        return BM25Index.current_generation(self.path)
+
+    @staticmethod
+    def _generation_number(generation: Optional[str]) -> int:
+        """
+        The number of a generation folder, 0 before the first build.
+        """
+        return int(generation[len(GENERATION_PREFIX):]) if generation else 0
+
+    def _read(self) -> None:
+        """
+        Loads an existing index back into postings lists for an incremental update.
+        """
+        index = BM25Index(self.path)
+        for term, (offset, length, _) in index.terms.items():
+            values = decode_varints(index.postings[offset:offset + length])
+            doc_numbers = np.cumsum(values[0::2]).tolist()
+            self.postings[term] = list(zip(doc_numbers, values[1::2].tolist()))
+        self.doc_lengths = index.doc_lengths.tolist()
+        self.documents = [tuple(document) for document in index.documents]
+        self.doc_numbers = {
+            document: doc_number for doc_number, document in enumerate(self.documents)
+        }
+        self.last_loaded_at = json_util.loads(index.meta.get('last_loaded_at', '{}'))
+
+    def _write_file(self, file_name: str, content: str) -> None:
+        """
+        Writes a text file of the index.
+        """
+        with open(os.path.join(self.path, file_name), 'w', encoding='utf-8') as text_file:
+            text_file.write(content)
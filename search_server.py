@@ -0,0 +1,302 @@
+"""
+Long-lived asyncio HTTP server for the search tool.
+
+The server keeps one SearchTool, and so one pooled MongoClient, for its whole lifetime, so
+a query only pays for the query itself instead of connecting and authenticating first.
+It listens on a local TCP port or a Unix socket and answers:
+
+    GET  /search?q=<query>          {"query": ..., "results": [...], "next_cursor": ...}
+         &page_size=<n>&cursor=<token>&fields=<a,b>
+    POST /batch  {"queries": [...]} {"results": [{"query": ..., "results": [...]}, ...]}
+    GET  /health                    {"status": "ok"}
+
+Queries run in worker threads, at most ServerConfigs.MAX_CONCURRENT_QUERIES at once, and
+the queries of a batch run in parallel. Request bodies are limited to
+ServerConfigs.MAX_BODY_BYTES, and unexpected errors are answered with a 500 response.
+"""
+import argparse
+import asyncio
+import json
+import os
+import traceback
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from search_tool import Configs, SearchTool, add_backend_argument
+
+MAX_REQUEST_LINE_BYTES = 64 * 1024
+REASONS = {
+    200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+    413: "Content Too Large", 500: "Internal Server Error",
+}
+
+
+class ServerConfigs:  # pylint: disable=too-few-public-methods
+    """
+    A class to handle the configuration constants of the search server.
+    """
+    HOST = os.environ.get('SEARCH_SERVER_HOST', '127.0.0.1')
+    PORT = int(os.environ.get('SEARCH_SERVER_PORT', 8765))
+    UNIX_SOCKET = os.environ.get('SEARCH_SERVER_SOCKET')  # listens on TCP when unset
+    MAX_CONCURRENT_QUERIES = int(os.environ.get('SEARCH_MAX_CONCURRENT_QUERIES', 16))
+    MAX_BATCH_SIZE = int(os.environ.get('SEARCH_MAX_BATCH_SIZE', 1000))
+    MAX_BODY_BYTES = int(os.environ.get('SEARCH_MAX_BODY_BYTES', 1024 * 1024))
+
+
+class SearchServer:
+    """
+    This class serves search requests over HTTP/1.1 with a shared SearchTool.
+    """
+
+    def __init__(
+            self, search_tool: SearchTool,
+            max_concurrent_queries: int = ServerConfigs.MAX_CONCURRENT_QUERIES,
+    ) -> None:
+        """
+        Constructor of the server around a connected search tool.
+
+        :param search_tool: The search tool shared by every request.
+        :param max_concurrent_queries: The maximum number of queries running at once.
+        """
+        self.search_tool = search_tool
+        self.max_concurrent_queries = max_concurrent_queries
+        self.semaphore: Optional[asyncio.Semaphore] = None
+
+    async def search(self, query: str) -> List[Dict]:
+        """
+        Runs a query in a worker thread once a concurrency slot is free.
+
+        :param query: The search query string.
+        :return: The search results.
+        """
+        return await self.run_limited(self.search_tool.search, query)
+
+    async def search_page(self, query: str, parameters: Dict[str, List[str]]) -> Dict:
+        """
+        Runs a paged query in a worker thread once a concurrency slot is free.
+
+        :param query: The search query string.
+        :param parameters: The page_size, cursor and fields query parameters.
+        :return: The page of results and the next_cursor.
+        """
+        fields = parameters.get("fields", [""])[0]
+        return await self.run_limited(
+            self.search_tool.search_page,
+            query,
+            int(parameters.get("page_size", [Configs.DOCUMENT_LIMIT])[0]),
+            parameters.get("cursor", [None])[0],
+            fields.split(",") if fields else None,
+        )
+
+    async def run_limited(self, function, *args):
+        """
+        Runs a search function in a worker thread while holding a concurrency slot.
+        """
+        if self.semaphore is None:
+            self.semaphore = asyncio.Semaphore(self.max_concurrent_queries)
+        async with self.semaphore:
+            return await asyncio.to_thread(function, *args)
+
+    async def search_batch(self, queries: List[str]) -> List[Dict]:
+        """
+        Runs the queries of a batch in parallel.
+
+        :param queries: The search query strings.
+        :return: The results of every query, in the order of the queries.
+        """
+        results = await asyncio.gather(*(self.search(query) for query in queries))
+        return [
+            {"query": query, "results": query_results}
+            for query, query_results in zip(queries, results)
+        ]
+
+    async def handle_request(self, method: str, target: str, body: bytes) -> Tuple[int, Dict]:
+        """
+        Routes a request to its endpoint, answering unexpected errors with a 500 response.
+
+        :param method: The HTTP method.
+        :param target: The request target, the path and the query string.
+        :param body: The request body.
+        :return: The status code and the JSON response.
+        """
+        try:
+            return await self.route(method, target, body)
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            traceback.print_exc()
+            return 500, {"error": f"internal error: {error}"}
+
+    async def route(  # pylint: disable=too-many-return-statements
+            self, method: str, target: str, body: bytes
+    ) -> Tuple[int, Dict]:
+        """
+        Answers a request with the endpoint of its path.
+
+        :param method: The HTTP method.
+        :param target: The request target, the path and the query string.
+        :param body: The request body.
+        :return: The status code and the JSON response.
+        """
+        url = urlsplit(target)
+        if url.path == "/health":
+            return 200, {"status": "ok"}
+
+        if url.path == "/search":
+            if method != "GET":
+                return 405, {"error": "use GET"}
+            parameters = parse_qs(url.query)
+            query = parameters.get("q", [""])[0]
+            try:
+                page = await self.search_page(query, parameters)
+            except ValueError as error:
+                return 400, {"error": str(error)}
+            return 200, {"query": query, **page}
+
+        if url.path == "/batch":
+            if method != "POST":
+                return 405, {"error": "use POST"}
+            try:
+                queries = json.loads(body or b"{}").get("queries")
+            except (ValueError, AttributeError):
+                queries = None
+            if not isinstance(queries, list) or not all(isinstance(q, str) for q in queries):
+                return 400, {"error": "expected a JSON object with a list of query strings"}
+            if len(queries) > ServerConfigs.MAX_BATCH_SIZE:
+                return 400, {"error": f"at most {ServerConfigs.MAX_BATCH_SIZE} queries"}
+            return 200, {"results": await self.search_batch(queries)}
+
+        return 404, {"error": f"unknown path {url.path}"}
+
+    async def handle_connection(
+            self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """
+        Serves the requests of a keep-alive connection until the client closes it.
+
+        The stream reader limits the request and header lines to its limit, which serve sets
+        to MAX_REQUEST_LINE_BYTES. Invalid requests are answered with a 400 or 413 response
+        and close the connection.
+        """
+        try:
+            while True:
+                try:
+                    request_line = await reader.readline()
+                except ValueError:
+                    await self.write_response(writer, 400, {"error": "line too long"})
+                    break
+                if not request_line:
+                    break
+                try:
+                    method, target, _ = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self.write_response(writer, 400, {"error": "malformed request"})
+                    break
+
+                try:
+                    headers = await self.read_headers(reader)
+                except ValueError:
+                    await self.write_response(writer, 400, {"error": "line too long"})
+                    break
+                content_length = headers.get("content-length", "0")
+                if not content_length.isdigit():
+                    await self.write_response(writer, 400, {"error": "invalid content-length"})
+                    break
+                if int(content_length) > ServerConfigs.MAX_BODY_BYTES:
+                    await self.write_response(
+                        writer, 413,
+                        {"error": f"the body is limited to {ServerConfigs.MAX_BODY_BYTES} bytes"},
+                    )
+                    break
+                body = await reader.readexactly(int(content_length))
+
+                status, response = await self.handle_request(method.upper(), target, body)
+                await self.write_response(writer, status, response)
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def read_headers(reader: asyncio.StreamReader) -> Dict[str, str]:
+        """
+        Reads the headers of a request, with lowercase names.
+
+        :raises ValueError: A header line is longer than the limit of the reader.
+        """
+        headers = {}
+        while True:
+            header_line = await reader.readline()
+            if header_line in (b"\r\n", b"\n", b""):
+                return headers
+            name, _, value = header_line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+    @staticmethod
+    async def write_response(writer: asyncio.StreamWriter, status: int, response: Dict) -> None:
+        """
+        Writes a JSON response.
+        """
+        body = json.dumps(response, default=str).encode()
+        writer.write(
+            f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body
+        )
+        await writer.drain()
+
+    async def serve(
+            self, host: str = ServerConfigs.HOST, port: int = ServerConfigs.PORT,
+            unix_socket: Optional[str] = ServerConfigs.UNIX_SOCKET,
+    ) -> None:
+        """
+        Listens on the Unix socket if one is given, on the TCP host and port otherwise.
+        """
+        if unix_socket:
+            server = await asyncio.start_unix_server(
+                self.handle_connection, path=unix_socket, limit=MAX_REQUEST_LINE_BYTES
+            )
+            address = unix_socket
+        else:
+            server = await asyncio.start_server(
+                self.handle_connection, host=host, port=port, limit=MAX_REQUEST_LINE_BYTES
+            )
+            address = f"http://{host}:{port}"
+        print(f"Serving searches on {address}.")
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    """
+    The main function that parses command-line arguments and runs the search server.
+    """
+    parser = argparse.ArgumentParser(description="Long-lived search server.")
+    parser.add_argument("--host", default=ServerConfigs.HOST, help="TCP host to listen on.")
+    parser.add_argument("--port", type=int, default=ServerConfigs.PORT, help="TCP port.")
+    parser.add_argument(
+        "--unix-socket",
+        default=ServerConfigs.UNIX_SOCKET,
+        help="Unix socket path to listen on instead of TCP."
+    )
+    add_backend_argument(parser)
+    parser.add_argument(
+        "--max-concurrent-queries",
+        type=int,
+        default=ServerConfigs.MAX_CONCURRENT_QUERIES,
+        help="Maximum number of queries running at once."
+    )
+    args = parser.parse_args()
+
+    server = SearchServer(
+        SearchTool(backend=args.backend),
+        max_concurrent_queries=args.max_concurrent_queries,
+    )
+    try:
+        asyncio.run(server.serve(args.host, args.port, args.unix_socket))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
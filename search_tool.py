@@ -1,131 +1,746 @@
-"""
-Python CLI tool for search functionality
-"""
-import os
-import argparse
-import json
-from typing import Dict, List
-from pymongo import MongoClient
-
-
-class Configs:  # pylint: disable=too-few-public-methods
-    """
-    A class to handle the configuration constants. 
-    This includes settings related to the MongoDB connection and search functionality.
-    """
-    SEARCH_QUERY_COLUMN = 'source_description'
-    HOST = os.environ.get('HOST', 'localhost')
-    PORT = os.environ.get('PORT', 27017)
-    USERNAME = os.environ.get('USER', 'root')
-    PASSWORD = os.environ.get('PASSWORD', 'example')
-    MONGO_DATABASE = 'startup'
-    INVESTMENT_COLLECTION = 'investment'
-    DOCUMENT_LIMIT = 10
-
-
-class SearchTool:
-    """
-    This class handles the connection to the MongoDB and provides search functionality.
-    """
-
-    def __init__(self) -> None:
-        """
-        Constructor that initializes the MongoDB client with given host,
-        port, username, and password.
-        """
-        self.client = MongoClient(
-            host=Configs.HOST,
-            port=Configs.PORT,
-            username=Configs.USERNAME,
-            password=Configs.PASSWORD,
-        )
-        self.database = self.client[Configs.MONGO_DATABASE]
-        self.collection = self.database[Configs.INVESTMENT_COLLECTION]
-
-    def sort_search_results(self, match_score_mapping: Dict) -> List[str]:
-        """
-        Sorts the search results based on the match score and returns the 
-        top results as per the DOCUMENT_LIMIT.
-
-        :param match_score_mapping: A dictionary containing document ids and their match scores.
-        :return: A list of sorted document ids as per match score.
-        """
-        sorted_results = [
-            document_id
-            for document_id, _
-            in sorted(match_score_mapping.items(), key=lambda item: item[1], reverse=True)
-        ]
-        return sorted_results[:Configs.DOCUMENT_LIMIT]
-
-    def search(self, query: str) -> List[Dict]:
-        """
-        Performs a search on the MongoDB collection based on the query string.
-
-        :param query: The search query string.
-        :return: A list of search results sorted by match score.
-        """
-        query_words = query.split()
-
-        match_score_mapping = {}
-        document_id_to_document_mapping = {}
-        for word in query_words:
-            word_results = self.search_word(word)
-
-            for result in word_results:
-                document_id = result.get("_id")
-                match_score_mapping.setdefault(document_id, 0)
-                match_score_mapping[document_id] += 1
-                document_id_to_document_mapping[document_id] = result
-
-        sorted_result_ids = self.sort_search_results(match_score_mapping)
-        sorted_documents = [
-            {
-                **document_id_to_document_mapping[result_id],
-                "match_score": match_score_mapping[result_id]
-            }
-            for result_id in sorted_result_ids
-        ]
-        return sorted_documents
-
-    def search_word(self, word: str):
-        """
-        Performs a search on the MongoDB collection for a single word.
-
-        :param word: The word to search for.
-        :return: A list of search results that contain the word.
-        """
-        query = {"$text": {"$search": f"\"{word}\""}}
-        sort_order = [("score", {"$meta": "textScore"})]
-        cursor = self.collection.find(
-            query
-        ).sort(sort_order)
-        results = list(cursor)
-        return results
-
-
-def main():
-    """
-    The main function that parses command-line arguments and performs search operations.
-    """
-    parser = argparse.ArgumentParser(
-        description="Search tool for source_description column in MongoDB."
-    )
-    parser.add_argument(
-        "query",
-        type=str,
-        help="Keyword to search in source_description column."
-    )
-    args = parser.parse_args()
-
-    search_tool = SearchTool()
-
-    results = search_tool.search(args.query)
-    if not results:
-        print("No results found.")
-    else:
-        json_results = json.dumps(results, indent=4, default=str)
-        print(json_results)
-
-
-if __name__ == "__main__":
-    main()
+"""
+Python CLI tool for search functionality
+"""
+import math
+import os
+import re
+import sys
+import time
+import argparse
+import base64
+import heapq
+import json
+import unicodedata
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from datetime import datetime
+from typing import Any, Dict, IO, Iterable, List, Optional, Tuple
+from bson import ObjectId, json_util
+from pymongo import MongoClient
+
+from search_cache import QueryCache
+from search_index import BM25Index, BM25IndexBuilder
+
+
+class Configs:  # pylint: disable=too-few-public-methods
+    """
+    A class to handle the configuration constants. 
+    This includes settings related to the MongoDB connection and search functionality.
+    """
+    SEARCH_QUERY_COLUMN = 'source_description'
+    HOST = os.environ.get('HOST', 'localhost')
+    PORT = os.environ.get('PORT', 27017)
+    USERNAME = os.environ.get('USER', 'root')
+    PASSWORD = os.environ.get('PASSWORD', 'example')
+    MONGO_DATABASE = 'startup'
+    INVESTMENT_COLLECTION = 'investment'
+    SEARCH_COLLECTIONS = os.environ.get('SEARCH_COLLECTIONS', INVESTMENT_COLLECTION).split(',')
+    DOCUMENT_LIMIT = 10
+    TEXT_SCORE_FIELD = '_text_score'
+    SEARCH_BACKEND = os.environ.get('SEARCH_BACKEND', 'mongo')  # mongo or bm25
+    INDEX_PATH = os.environ.get('SEARCH_INDEX_PATH', 'data/search-index')
+    META_COLLECTION = os.environ.get('MONGO_META_COLLECTION', 'etl_meta')
+    LOAD_GENERATION_ID = 'load_generation'
+    LOADED_AT_FIELD = '_loaded_at'
+    FIELD_ALIASES_ID = 'field_aliases'  # followed by ':<collection>'
+    CACHE_ENABLED = os.environ.get('SEARCH_CACHE_ENABLED', 'true').lower() == 'true'
+    CACHE_MAX_ENTRIES = int(os.environ.get('SEARCH_CACHE_MAX_ENTRIES', 1024))
+    CACHE_TTL_SECONDS = float(os.environ.get('SEARCH_CACHE_TTL_SECONDS', 3600))
+    CACHE_PATH = os.environ.get('SEARCH_CACHE_PATH')  # JSON file, unset keeps it in memory
+    LOAD_GENERATION_CHECK_SECONDS = float(os.environ.get('LOAD_GENERATION_CHECK_SECONDS', 5))
+    MAX_POOL_SIZE = int(os.environ.get('SEARCH_MAX_POOL_SIZE', 100))
+    CONNECT_TIMEOUT_MS = int(os.environ.get('MONGO_CONNECT_TIMEOUT_MS', 0)) or None
+    SERVER_SELECTION_TIMEOUT_MS = int(
+        os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', 0)
+    ) or None
+    COMPRESSORS = os.environ.get('MONGO_COMPRESSORS')  # e.g. zstd,snappy,zlib
+    BATCH_CONCURRENCY = int(os.environ.get('SEARCH_BATCH_CONCURRENCY', 8))
+
+
+def strip_diacritics(text: str) -> str:
+    """
+    Removes the diacritical marks of a text, so 'Café' becomes 'Cafe'.
+
+    :param text: The text.
+    :return: The text without diacritical marks.
+    """
+    return "".join(
+        char for char in unicodedata.normalize("NFKD", text)
+        if not unicodedata.combining(char)
+    )
+
+
+def _letter_variants() -> Dict[str, str]:
+    """
+    Collects the accented Latin letters of every ASCII letter, in both cases.
+
+    :return: The characters matching each lower case ASCII letter.
+    """
+    variants = {}
+    for code_point in range(0xC0, 0x250):
+        char = chr(code_point)
+        base = strip_diacritics(char).lower()
+        if len(base) == 1 and base.isascii() and base.isalpha() and char.lower() != base:
+            variants.setdefault(base, base + base.upper())
+            variants[base] += char
+    return variants
+
+
+LETTER_VARIANTS = _letter_variants()
+# \w only holds ASCII word characters in MongoDB's regexes, so the accented Latin letters
+# are added to the characters a query word must not be preceded or followed by
+WORD_CHARACTERS = "[\\w\u00c0-\u024f]"
+
+
+def bson_sort_key(value: Any) -> Tuple[int, Any]:  # pylint: disable=too-many-return-statements
+    """
+    Orders values of different types like MongoDB sorts them: null, numbers, strings,
+    other values, ObjectIds, booleans and dates. Values of the same type compare by value,
+    so _ids of mixed types never raise a TypeError.
+
+    :param value: The value, such as an _id.
+    :return: The sort key of the value.
+    """
+    if value is None:
+        return 0, 0
+    if isinstance(value, bool):
+        return 5, value
+    if isinstance(value, (int, float)):
+        return 1, value
+    if isinstance(value, str):
+        return 2, value
+    if isinstance(value, ObjectId):
+        return 4, value
+    if isinstance(value, datetime):
+        return 6, value
+    return 3, str(value)
+
+
+def word_regex(word: str) -> str:
+    """
+    Builds the regex matching a word literally as a whole word, ignoring its diacritical
+    marks and those of the searched text, like MongoDB's text search does. So 'art' does
+    not match 'startup'.
+
+    :param word: The query word.
+    :return: The regex of the word.
+    """
+    letters = "".join(
+        f"[{LETTER_VARIANTS[char.lower()]}]" if char.lower() in LETTER_VARIANTS
+        else re.escape(char)
+        for char in strip_diacritics(word)
+    )
+    return f"(?<!{WORD_CHARACTERS}){letters}(?!{WORD_CHARACTERS})"
+
+
+class SearchTool:  # pylint: disable=too-many-instance-attributes
+    """
+    This class handles the connection to the MongoDB and provides search functionality.
+    """
+
+    def __init__(
+            self, backend: str = Configs.SEARCH_BACKEND,
+            use_cache: bool = Configs.CACHE_ENABLED,
+    ) -> None:
+        """
+        Constructor that initializes the MongoDB client with given host,
+        port, username, and password. The client keeps a pool of up to
+        Configs.MAX_POOL_SIZE connections, which threads searching at once share.
+        Timeouts and compressors left unset keep the pymongo defaults.
+
+        :param backend: 'mongo' scores with MongoDB's text search, 'bm25' scores with the
+            local BM25 index at Configs.INDEX_PATH.
+        :param use_cache: Whether to serve repeated queries from the query result cache.
+        """
+        client_options = {
+            'connectTimeoutMS': Configs.CONNECT_TIMEOUT_MS,
+            'serverSelectionTimeoutMS': Configs.SERVER_SELECTION_TIMEOUT_MS,
+            'compressors': Configs.COMPRESSORS,
+        }
+        self.client = MongoClient(
+            host=Configs.HOST,
+            port=Configs.PORT,
+            username=Configs.USERNAME,
+            password=Configs.PASSWORD,
+            maxPoolSize=Configs.MAX_POOL_SIZE,
+            **{option: value for option, value in client_options.items() if value is not None},
+        )
+        self.database = self.client[Configs.MONGO_DATABASE]
+        self.collections = [
+            self.database[collection_name]
+            for collection_name in Configs.SEARCH_COLLECTIONS
+        ]
+        self.backend = backend
+        self.index = None
+        if backend == 'bm25':
+            if not BM25Index.exists(Configs.INDEX_PATH):
+                raise FileNotFoundError(
+                    f'No search index at {Configs.INDEX_PATH}, build it with --build-index.'
+                )
+            self.index = BM25Index(Configs.INDEX_PATH)
+        self.cache = None
+        if use_cache:
+            self.cache = QueryCache(
+                max_entries=Configs.CACHE_MAX_ENTRIES,
+                ttl_seconds=Configs.CACHE_TTL_SECONDS,
+                path=Configs.CACHE_PATH,
+            )
+        self.load_generation_checked_at = None
+        self.current_load_generation = None
+        self.aliases_by_collection = {}
+        self.aliases_load_generation = None
+
+    def search(self, query: str) -> List[Dict]:
+        """
+        Performs a search on the MongoDB collections based on the query string.
+
+        :param query: The search query string.
+        :return: The first page of search results sorted by match score.
+        """
+        return self.search_page(query)["results"]
+
+    def sort_search_results(self, match_score_mapping: Dict) -> List[str]:
+        """
+        Sorts the search results based on the match score and returns the
+        top results as per the DOCUMENT_LIMIT.
+
+        Kept for callers of the word by word search, search() scores on the server.
+
+        :param match_score_mapping: A dictionary containing document ids and their match scores.
+        :return: A list of sorted document ids as per match score.
+        """
+        sorted_results = [
+            document_id
+            for document_id, _
+            in sorted(match_score_mapping.items(), key=lambda item: item[1], reverse=True)
+        ]
+        return sorted_results[:Configs.DOCUMENT_LIMIT]
+
+    def search_word(self, word: str) -> List[Dict]:
+        """
+        Performs a search on the MongoDB collections for a single word.
+
+        Kept for callers of the word by word search, search() matches all words at once.
+
+        :param word: The word to search for.
+        :return: A list of search results that contain the word.
+        """
+        query = {"$text": {"$search": f"\"{word}\""}}
+        sort_order = [("score", {"$meta": "textScore"})]
+        results = []
+        for collection in self.collections:
+            results.extend(collection.find(query).sort(sort_order))
+        return results
+
+    def search_page(
+            self, query: str, page_size: int = Configs.DOCUMENT_LIMIT,
+            cursor: Optional[str] = None, fields: Optional[List[str]] = None,
+    ) -> Dict:
+        """
+        Returns a page of search results and the cursor of the next page.
+
+        Results are served from the query result cache while no newer ETL load has
+        completed. Otherwise each collection answers with a single aggregation that
+        matches, scores, projects, sorts and limits the documents on the server, so at most
+        page_size documents per collection are transferred. With the bm25 backend the
+        documents are ranked by the local index instead.
+
+        :param query: The search query string.
+        :param page_size: The maximum number of results of the page.
+        :param cursor: The next_cursor of the previous page, None for the first page.
+        :param fields: The fields of the returned documents, None returns whole documents.
+        :return: A dict with the results sorted by match score and the next_cursor, which
+            is None on the last page.
+        """
+        if self.cache is None:
+            return self.search_uncached(query, page_size, cursor, fields)
+
+        cache_key = "|".join([
+            self.backend,
+            ",".join(Configs.SEARCH_COLLECTIONS),
+            str(page_size),
+            cursor or "",
+            ",".join(fields or []),
+            QueryCache.normalize(query),
+        ])
+        load_generation = self.load_generation()
+        page = self.cache.get(cache_key, load_generation)
+        if page is None:
+            page = self.search_uncached(query, page_size, cursor, fields)
+            self.cache.put(cache_key, load_generation, page)
+        return page
+
+    def load_generation(self) -> int:
+        """
+        Reads the load generation counter that the ETL bumps after each successful load.
+
+        The counter is read at most once per Configs.LOAD_GENERATION_CHECK_SECONDS.
+
+        :return: The current load generation.
+        """
+        now = time.monotonic()
+        if (
+                self.load_generation_checked_at is None
+                or now - self.load_generation_checked_at > Configs.LOAD_GENERATION_CHECK_SECONDS
+        ):
+            document = self.database[Configs.META_COLLECTION].find_one(
+                {"_id": Configs.LOAD_GENERATION_ID}
+            )
+            self.current_load_generation = document.get("value", 0) if document else 0
+            self.load_generation_checked_at = now
+        return self.current_load_generation
+
+    def field_aliases(self, collection_name: str) -> Dict[str, str]:
+        """
+        Reads the short names the ETL stored the fields of a collection under.
+
+        The aliases are read once per collection and load generation, since only a load
+        can change them.
+
+        :param collection_name: The name of the collection.
+        :return: The alias of every aliased field, empty when the fields are not aliased.
+        """
+        load_generation = self.load_generation()
+        if load_generation != self.aliases_load_generation:
+            self.aliases_by_collection = {}
+            self.aliases_load_generation = load_generation
+        if collection_name not in self.aliases_by_collection:
+            document = self.database[Configs.META_COLLECTION].find_one(
+                {"_id": f"{Configs.FIELD_ALIASES_ID}:{collection_name}"}
+            )
+            self.aliases_by_collection[collection_name] = dict(
+                document.get("aliases", {}) if document else {}
+            )
+        return self.aliases_by_collection[collection_name]
+
+    @staticmethod
+    def expand_fields(document: Dict, field_aliases: Dict[str, str]) -> Dict:
+        """
+        Renames the aliased fields of a stored document back to their full names.
+
+        :param document: The stored document.
+        :param field_aliases: The alias of every aliased field of its collection.
+        :return: The document with the full field names.
+        """
+        if not field_aliases:
+            return document
+        field_names = {alias: field for field, alias in field_aliases.items()}
+        return {field_names.get(field, field): value for field, value in document.items()}
+
+    def search_uncached(  # pylint: disable=too-many-locals
+            self, query: str, page_size: int = Configs.DOCUMENT_LIMIT,
+            cursor: Optional[str] = None, fields: Optional[List[str]] = None,
+    ) -> Dict:
+        """
+        Returns a page of search results without the query result cache.
+
+        The pages of the mongo backend are sorted by match score, text score, collection
+        name and _id, and a cursor holds these keys of the last result of its page, so the
+        next page continues after it even if more documents were inserted in between. The
+        pages of the bm25 backend are addressed by their offset in the ranking. One result
+        more than the page size is fetched, so next_cursor is only set when another page
+        has results.
+
+        :param query: The search query string.
+        :param page_size: The maximum number of results of the page.
+        :param cursor: The next_cursor of the previous page, None for the first page.
+        :param fields: The fields of the returned documents, None returns whole documents.
+        :return: A dict with the results sorted by match score and the next_cursor.
+        """
+        position = decode_cursor(cursor) if cursor else {}
+        if self.index is not None:
+            return self.search_index(query, page_size, position.get("offset", 0), fields)
+
+        query_words = query.split()
+        if not query_words:
+            return {"results": [], "next_cursor": None}
+
+        candidates = []
+        for collection in self.collections:
+            field_aliases = self.field_aliases(collection.name)
+            pipeline = self.build_search_pipeline(
+                query_words, page_size + 1,
+                [field_aliases.get(field, field) for field in fields] if fields else None,
+                position.get("after"), collection.name,
+            )
+            candidates.extend(
+                ((-document["match_score"], -document[Configs.TEXT_SCORE_FIELD],
+                  collection.name, bson_sort_key(document["_id"])),
+                 self.expand_fields(document, field_aliases))
+                for document in collection.aggregate(pipeline)
+            )
+
+        top_candidates = heapq.nsmallest(
+            page_size + 1, candidates, key=lambda candidate: candidate[0]
+        )
+        next_cursor = None
+        if len(top_candidates) > page_size:
+            top_candidates = top_candidates[:page_size]
+            (match_score, text_score, collection_name, _), document = top_candidates[-1]
+            next_cursor = encode_cursor(
+                {"after": [-match_score, -text_score, collection_name, document["_id"]]}
+            )
+        results = [document for _, document in top_candidates]
+        for document in results:
+            del document[Configs.TEXT_SCORE_FIELD]
+        return {"results": results, "next_cursor": next_cursor}
+
+    def search_index(  # pylint: disable=too-many-locals
+            self, query: str, page_size: int = Configs.DOCUMENT_LIMIT, offset: int = 0,
+            fields: Optional[List[str]] = None,
+    ) -> Dict:
+        """
+        Ranks the documents with the local BM25 index and fetches the page by _id.
+
+        :param query: The search query string.
+        :param page_size: The maximum number of results of the page.
+        :param offset: The rank of the first result of the page.
+        :param fields: The fields of the returned documents, None returns whole documents.
+        :return: A dict with the results sorted by BM25 score, as match_score, and the
+            next_cursor.
+        """
+        ranked_documents = self.index.search(query, offset + page_size + 1)[offset:]
+        has_next_page = len(ranked_documents) > page_size
+        ranked_documents = ranked_documents[:page_size]
+
+        document_ids_by_collection = {}
+        for _, collection_name, document_id in ranked_documents:
+            document_ids_by_collection.setdefault(collection_name, []).append(document_id)
+
+        documents = {}
+        for collection_name, document_ids in document_ids_by_collection.items():
+            field_aliases = self.field_aliases(collection_name)
+            projection = None
+            if fields:
+                projection = dict.fromkeys(
+                    (field_aliases.get(field, field) for field in fields), 1
+                )
+            for document in self.database[collection_name].find(
+                    {"_id": {"$in": document_ids}}, projection
+            ):
+                documents[(collection_name, document["_id"])] = self.expand_fields(
+                    document, field_aliases
+                )
+
+        results = [
+            {**documents[(collection_name, document_id)], "match_score": score}
+            for score, collection_name, document_id in ranked_documents
+            if (collection_name, document_id) in documents
+        ]
+        next_cursor = None
+        if has_next_page:
+            next_cursor = encode_cursor({"offset": offset + page_size})
+        return {"results": results, "next_cursor": next_cursor}
+
+    def build_index(self, incremental: bool = False) -> int:
+        """
+        Builds the local BM25 index from the searched collections.
+
+        :param incremental: Only add the documents written since the last build.
+        :return: The number of documents added to the index.
+        """
+        builder = BM25IndexBuilder(
+            Configs.INDEX_PATH, Configs.SEARCH_QUERY_COLUMN, Configs.LOADED_AT_FIELD
+        )
+        if incremental:
+            return builder.update(self.collections)
+        return builder.build(self.collections)
+
+    @staticmethod
+    def build_search_pipeline(
+            query_words: List[str], limit: int = Configs.DOCUMENT_LIMIT,
+            fields: Optional[List[str]] = None, after: Optional[List] = None,
+            collection_name: Optional[str] = None,
+    ) -> List[Dict]:
+        """
+        Builds the aggregation pipeline of a search.
+
+        The $text stage selects the documents containing any of the words. The match score
+        counts the query words that occur as whole words in the search column, case and
+        diacritic insensitively. The documents
+        after the cursor position are then projected to the requested fields, sorted by match
+        score, text score and _id, and limited to the page size. The _id of the cursor is
+        compared with $expr, which orders _ids of different types like the sort does.
+
+        :param query_words: The words of the search query.
+        :param limit: The maximum number of documents.
+        :param fields: The fields of the returned documents, None returns whole documents.
+        :param after: The match score, text score, collection name and _id of the last
+            result of the previous page.
+        :param collection_name: The name of the searched collection, required with after.
+        :return: The aggregation pipeline.
+        """
+        word_matches = [
+            {
+                "$cond": [
+                    {
+                        "$regexMatch": {
+                            "input": f"${Configs.SEARCH_QUERY_COLUMN}",
+                            "regex": word_regex(word),
+                            "options": "i",
+                        }
+                    },
+                    1,
+                    0,
+                ]
+            }
+            for word in query_words
+        ]
+        score_match = {"match_score": {"$gt": 0}}
+        if after is not None:
+            match_score, text_score, after_collection_name, document_id = after
+            later_positions = [
+                {"match_score": {"$lt": match_score}},
+                {"match_score": match_score, Configs.TEXT_SCORE_FIELD: {"$lt": text_score}},
+            ]
+            if collection_name > after_collection_name:
+                later_positions.append(
+                    {"match_score": match_score, Configs.TEXT_SCORE_FIELD: text_score}
+                )
+            elif collection_name == after_collection_name:
+                later_positions.append({
+                    "match_score": match_score,
+                    Configs.TEXT_SCORE_FIELD: text_score,
+                    "$expr": {"$gt": ["$_id", document_id]},
+                })
+            score_match = {"$and": [score_match, {"$or": later_positions}]}
+
+        pipeline = [
+            {"$match": {"$text": {"$search": " ".join(query_words)}}},
+            {
+                "$addFields": {
+                    "match_score": {"$add": word_matches},
+                    Configs.TEXT_SCORE_FIELD: {"$meta": "textScore"},
+                }
+            },
+            {"$match": score_match},
+        ]
+        if fields:
+            pipeline.append({
+                "$project": {
+                    **dict.fromkeys(fields, 1), "match_score": 1, Configs.TEXT_SCORE_FIELD: 1,
+                }
+            })
+        pipeline.extend([
+            {"$sort": {"match_score": -1, Configs.TEXT_SCORE_FIELD: -1, "_id": 1}},
+            {"$limit": limit},
+        ])
+        return pipeline
+
+
+def encode_cursor(position: Dict) -> str:
+    """
+    Encodes a page position as an opaque URL-safe cursor token.
+
+    :param position: The position of the next page.
+    :return: The cursor token.
+    """
+    return base64.urlsafe_b64encode(json_util.dumps(position).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Dict:
+    """
+    Decodes a cursor token into the position of its page.
+
+    :param cursor: The cursor token.
+    :return: The position of the page.
+    """
+    try:
+        return json_util.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError) as error:
+        raise ValueError(f"Invalid cursor {cursor!r}.") from error
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """
+    Returns the nearest-rank percentile of sorted values.
+
+    :param sorted_values: The values in ascending order.
+    :param fraction: The percentile as a fraction, such as 0.95.
+    :return: The percentile, or 0.0 without values.
+    """
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(fraction * len(sorted_values))
+    return sorted_values[min(max(rank, 1), len(sorted_values)) - 1]
+
+
+def run_batch(  # pylint: disable=too-many-locals
+        search_tool: SearchTool, input_lines: Iterable[str], output: IO[str],
+        concurrency: int = Configs.BATCH_CONCURRENCY,
+) -> Dict:
+    """
+    Runs the queries of JSONL input concurrently and writes each result line as it finishes.
+
+    Every input line is a JSON object with a "query" field, or a JSON string. The other
+    fields of an object, such as an id, are copied to its output line together with the
+    results, the latency in milliseconds and, when the query failed, the error. A line
+    that is not valid JSON or has no query string gets an output line with its line number
+    and the error, and the batch goes on. Output lines are written as soon as their query
+    finished, in completion order. At most twice the concurrency of queries are read ahead,
+    so the input can be larger than memory.
+
+    :param search_tool: The search tool whose connection pool is shared by the queries.
+    :param input_lines: The JSONL input lines.
+    :param output: The stream the JSONL results are written to.
+    :param concurrency: The number of queries running at once.
+    :return: The throughput and latency summary of the batch.
+    """
+    def run(request: Dict) -> Dict:
+        started_at = time.perf_counter()
+        try:
+            result = {**request, "results": search_tool.search(request["query"])}
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            result = {**request, "error": str(error)}
+        result["latency_ms"] = (time.perf_counter() - started_at) * 1000
+        return result
+
+    def write(result: Dict) -> None:
+        if "latency_ms" in result:
+            latencies.append(result["latency_ms"])
+        if "error" in result:
+            errors[0] += 1
+        output.write(json.dumps(result, default=str) + "\n")
+        output.flush()
+
+    def parse(line_number: int, line: str) -> Dict:
+        try:
+            request = json.loads(line)
+        except ValueError as error:
+            return {"line": line_number, "error": f"invalid JSON: {error}"}
+        if not isinstance(request, dict):
+            request = {"query": request}
+        if not isinstance(request.get("query"), str):
+            return {"line": line_number, **request, "error": "expected a query string"}
+        return request
+
+    latencies: List[float] = []
+    errors = [0]
+    started_at = time.perf_counter()
+    pending = set()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="search-batch") as pool:
+        for line_number, line in enumerate(input_lines, start=1):
+            if line.strip():
+                request = parse(line_number, line)
+                if "error" in request:
+                    write(request)
+                else:
+                    pending.add(pool.submit(run, request))
+            done, pending = wait(
+                pending, timeout=None if len(pending) >= 2 * concurrency else 0,
+                return_when=FIRST_COMPLETED,
+            )
+            for future in done:
+                write(future.result())
+        for future in as_completed(pending):
+            write(future.result())
+
+    elapsed = time.perf_counter() - started_at
+    latencies.sort()
+    return {
+        "queries": len(latencies),
+        "errors": errors[0],
+        "seconds": round(elapsed, 3),
+        "qps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50), 2),
+        "p95_ms": round(percentile(latencies, 0.95), 2),
+        "p99_ms": round(percentile(latencies, 0.99), 2),
+    }
+
+
+def add_backend_argument(parser: argparse.ArgumentParser) -> None:
+    """
+    Adds the --backend option of the search tool and the search server to a parser.
+
+    :param parser: The command-line argument parser.
+    """
+    parser.add_argument(
+        "--backend",
+        choices=["mongo", "bm25"],
+        default=Configs.SEARCH_BACKEND,
+        help="Search with MongoDB's text index or with the local BM25 index."
+    )
+
+
+def main():
+    """
+    The main function that parses command-line arguments and performs search operations.
+    """
+    parser = argparse.ArgumentParser(
+        description="Search tool for source_description column in MongoDB."
+    )
+    parser.add_argument(
+        "query",
+        type=str,
+        nargs="?",
+        help="Keyword to search in source_description column."
+    )
+    add_backend_argument(parser)
+    parser.add_argument(
+        "--build-index",
+        action="store_true",
+        help="Build the local BM25 index from the searched collections."
+    )
+    parser.add_argument(
+        "--update-index",
+        action="store_true",
+        help="Add the documents inserted since the last build to the local BM25 index."
+    )
+    parser.add_argument(
+        "--batch",
+        metavar="FILE",
+        help="Run the queries of a JSONL file, or of stdin with -, and write JSONL results."
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=Configs.BATCH_CONCURRENCY,
+        help="Number of queries of a batch running at once."
+    )
+    parser.add_argument(
+        "--fields",
+        type=lambda fields: fields.split(","),
+        help="Comma separated fields of the returned documents, all fields by default."
+    )
+    parser.add_argument(
+        "--page-size",
+        type=int,
+        default=Configs.DOCUMENT_LIMIT,
+        help="Number of results per page."
+    )
+    parser.add_argument(
+        "--cursor",
+        help="The next page cursor printed by the previous page."
+    )
+    args = parser.parse_args()
+
+    if args.build_index or args.update_index:
+        indexed_count = SearchTool(backend="mongo").build_index(incremental=args.update_index)
+        print(f"Indexed {indexed_count} documents at {Configs.INDEX_PATH}.")
+        return
+    if args.batch is not None:
+        search_tool = SearchTool(backend=args.backend)
+        if args.batch == "-":
+            summary = run_batch(search_tool, sys.stdin, sys.stdout, args.concurrency)
+        else:
+            with open(args.batch, encoding="utf-8") as batch_file:
+                summary = run_batch(search_tool, batch_file, sys.stdout, args.concurrency)
+        print(json.dumps(summary), file=sys.stderr)
+        return
+    if args.query is None:
+        parser.error("the query argument is required")
+
+    search_tool = SearchTool(backend=args.backend)
+
+    page = search_tool.search_page(args.query, args.page_size, args.cursor, args.fields)
+    results = page["results"]
+    if not results:
+        print("No results found.")
+    else:
+        json_results = json.dumps(results, indent=4, default=str)
+        print(json_results)
+    if page["next_cursor"]:
+        print(f"Next page: --cursor {page['next_cursor']}", file=sys.stderr)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
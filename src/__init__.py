@@ -1,9 +1,21 @@
-'''
-This module provides access to the 'App' class from the 'src.app' module.
-'''
-
-from src.app import App
-
-__all__ = [
-  'App',
-]
+'''
+This module provides access to the 'App' class from the 'src.app' module.
+
+The class is imported on first access, so importing the configurations of the package, as
+the DAG file does on every parse, does not import pandas and pymongo.
+'''
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from src.app import App
+
+__all__ = [
+  'App',
+]
+
+
+def __getattr__(name):
+    if name == 'App':
+        from src.app import App  # pylint: disable=import-outside-toplevel
+        return App
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
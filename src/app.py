@@ -1,58 +1,562 @@
-"""
-App class' module
-"""
-
-from typing import List
-from loguru import logger
-
-from src.models.csv_file_source import CsvFileSource
-from src.models.csv_file_extractor import CsvFileExtractor
-from src.models.df_transformer import DataFrameRowDictTransformer
-from src.models.mongodb_loader import MongoDBLoader, MongoDBStorage
-
-
-class App:
-    """
-    App class that contains solution steps.
-    """
-
-    @staticmethod
-    def run(file_paths: List[str]) -> None:
-        """
-        Executes the application logic using the provided list of file paths.
-
-        Args:
-            file_paths (List[str]): A list of file paths for CSV files to process.
-        """
-        logger.info(f'Running for {file_paths}.')
-        csv_file_sources = App.create_csv_file_sources(file_paths)
-
-        extracted_data_iterator = CsvFileExtractor(csv_file_sources).extract()
-        logger.info(f'Extracted from {csv_file_sources}.')
-
-        storage = MongoDBStorage()
-        loader = MongoDBLoader(mongo_storage=storage)
-
-        for index, extracted_data in enumerate(extracted_data_iterator):
-            transformed_data = DataFrameRowDictTransformer(input_df=extracted_data).transform()
-            logger.info(f'Transformed the extracted data part:{index}.')
-
-            loader.load(input_data=transformed_data)
-            logger.info(f'Loaded the transformed data part:{index}')
-
-    @staticmethod
-    def create_csv_file_sources(file_paths: List[str]) -> List[CsvFileSource]:
-        """
-        Creates a list of CsvFileSource objects based on the provided list of file paths.
-
-        Args:
-            file_paths (List[str]): A list of file paths for CSV files.
-
-        Returns:
-            List[CsvFileSource]: A list of CsvFileSource objects created from the file paths.
-        """
-        csv_file_sources = [
-            CsvFileSource(file_path=file_path)
-            for file_path in file_paths
-        ]
-        return csv_file_sources
+"""
+App class' module
+"""
+
+import multiprocessing
+import os
+import re
+from concurrent.futures import Executor, ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Union
+from loguru import logger
+import pandas as pd
+
+from src.models.csv_file_source import CsvFileSource
+from src.models.csv_file_extractor import CsvFileExtractor
+from src.models.df_transformer import DataFrameRowDictTransformer
+from src.models.mongodb_loader import MongoDBLoader, MongoDBStorage
+from src.models.multiprocess_engine import MultiprocessEngine
+from src.models.parse_cache import ParseCache
+from src.models.pipeline_metrics import PipelineMetrics
+from src.models.raw_bson_transformer import RawBsonTransformer
+from src.models.run_profiler import RunProfiler
+from src.models.staged_pipeline import Stage, StagedPipeline
+from src.configs.app import AppConfigs
+from src.configs.csv_schemas import CsvSchemaConfigs
+from src.configs.mongodb import MongoDBConfigs
+
+
+class App:
+    """
+    App class that contains solution steps.
+    """
+
+    @staticmethod
+    def run(  # pylint: disable=too-many-arguments,too-many-positional-arguments
+            file_paths: List[str],
+            chunk_size: Optional[int] = AppConfigs.CSV_CHUNK_SIZE,
+            metrics_name: Optional[str] = None,
+            profile: Optional[bool] = None,
+            run_id: Optional[str] = None,
+            byte_range: Optional[List[int]] = None,
+    ) -> Dict:
+        """
+        Executes the application logic using the provided list of file paths.
+
+        The extract, transform and load steps are measured per file. The measurements are
+        returned, logged and, when AppConfigs.METRICS_DIR is set, exported as a JSON summary
+        and a Prometheus textfile.
+
+        In profiling mode the run is wrapped in a RunProfiler, which writes the cProfile
+        statistics, the top allocation sites and the collapsed stacks of the run to
+        '<AppConfigs.PROFILE_DIR>/<dag name>/<run id>/<file names>.*'.
+
+        Args:
+            file_paths (List[str]): A list of file paths for CSV files to process.
+            chunk_size (Optional[int]): The number of rows streamed through the steps at a time.
+            Default is AppConfigs.CSV_CHUNK_SIZE, None processes whole files.
+            metrics_name (Optional[str]): The base name of the exported metrics files.
+            Default is None, which uses 'etl_' followed by the names of the files.
+            profile (Optional[bool]): Whether to profile the run. Default is None, which
+            uses AppConfigs.PROFILE_ENABLED.
+            run_id (Optional[str]): The id of the DAG run, naming the profiling directory.
+            Default is None, which uses the current UTC time.
+            byte_range (Optional[List[int]]): The start and end byte offsets of the shard of
+            the single file to process, as planned by ShardPlanner. Default is None, which
+            processes the whole files.
+
+        Returns:
+            Dict: The JSON summary of the measurements.
+        """
+        if profile is None:
+            profile = AppConfigs.PROFILE_ENABLED
+        if not profile:
+            return App.run_pipeline(file_paths, chunk_size, metrics_name, byte_range)
+
+        run_id = run_id or datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')
+        with RunProfiler(
+                output_dir=os.path.join(
+                    AppConfigs.PROFILE_DIR, AppConfigs.NAME, re.sub(r'[^\w.-]+', '_', run_id)
+                ),
+                name=App.run_name(file_paths, byte_range),
+                sample_interval=AppConfigs.PROFILE_SAMPLE_INTERVAL,
+        ):
+            return App.run_pipeline(file_paths, chunk_size, metrics_name, byte_range)
+
+    @staticmethod
+    def run_pipeline(
+            file_paths: List[str],
+            chunk_size: Optional[int] = AppConfigs.CSV_CHUNK_SIZE,
+            metrics_name: Optional[str] = None,
+            byte_range: Optional[List[int]] = None,
+    ) -> Dict:
+        """
+        Extracts, transforms and loads the files and measures the steps, see 'run'.
+
+        The steps run one after another in this process, in the threads of a StagedPipeline
+        when AppConfigs.ENGINE is 'staged', or in the processes of a MultiprocessEngine when
+        AppConfigs.ENGINE is 'multiprocess' and documents are inserted, see 'engine'.
+
+        Args:
+            file_paths (List[str]): A list of file paths for CSV files to process.
+            chunk_size (Optional[int]): The number of rows streamed through the steps at a time.
+            metrics_name (Optional[str]): The base name of the exported metrics files.
+            byte_range (Optional[List[int]]): The byte range of the single file to process.
+
+        Returns:
+            Dict: The JSON summary of the measurements.
+        """
+        logger.info(f'Running for {file_paths}.')
+        engine = App.engine()
+        if engine == 'multiprocess':
+            metrics = App.create_engine(chunk_size).run(file_paths, byte_range)
+        elif engine == 'staged':
+            metrics = App.run_staged(file_paths, chunk_size, byte_range)
+        else:
+            metrics = App.run_inline(file_paths, chunk_size, byte_range)
+
+        summary = metrics.summary()
+        logger.info(f'Pipeline metrics: {summary}')
+        if AppConfigs.METRICS_DIR:
+            metrics_name = metrics_name or f'etl_{App.run_name(file_paths, byte_range)}'
+            metrics.export(AppConfigs.METRICS_DIR, metrics_name)
+            logger.info(f'Exported the pipeline metrics to {AppConfigs.METRICS_DIR}.')
+        return summary
+
+    @staticmethod
+    def run_inline(
+            file_paths: List[str], chunk_size: Optional[int] = None,
+            byte_range: Optional[List[int]] = None,
+    ) -> PipelineMetrics:
+        """
+        Extracts, transforms and loads the files in this process.
+
+        Args:
+            file_paths (List[str]): A list of file paths for CSV files to process.
+            chunk_size (Optional[int]): The number of rows streamed through the steps at a time.
+            byte_range (Optional[List[int]]): The byte range of the single file to process.
+
+        Returns:
+            PipelineMetrics: The measurements of the steps.
+        """
+        csv_file_sources = App.create_csv_file_sources(
+            file_paths, chunk_size=chunk_size, byte_range=byte_range
+        )
+
+        extracted_data_iterator = CsvFileExtractor(
+            csv_file_sources,
+            max_workers=AppConfigs.EXTRACT_WORKERS,
+            prefetch=AppConfigs.EXTRACT_PREFETCH,
+        ).extract()
+        logger.info(f'Extracted from {csv_file_sources}.')
+
+        metrics = PipelineMetrics()
+        loaders = {}
+        defer_indexes = App.defer_indexes(byte_range)
+        encode_executor = App.create_encode_executor()
+        failed = True
+        try:
+            for index, extracted_data in enumerate(metrics.track_extract(extracted_data_iterator)):
+                file_name = extracted_data.attrs.get('file_name')
+                if file_name not in loaders:
+                    loaders[file_name] = App.create_loader(
+                        file_name, list(extracted_data.columns), defer_indexes
+                    )
+
+                extracted_bytes = PipelineMetrics.data_frame_bytes(extracted_data)
+                transformed_data = metrics.track_transform(
+                    file_name,
+                    App.create_transformer(extracted_data, encode_executor),
+                    extracted_bytes,
+                )
+                logger.info(f'Transformed the extracted data part:{index}.')
+
+                with metrics.track_load(file_name, extracted_bytes):
+                    loaders[file_name].load(input_data=transformed_data)
+                logger.info(f'Loaded the transformed data part:{index}')
+            failed = False
+        finally:
+            App.close_loaders(loaders, metrics, failed)
+            if encode_executor is not None:
+                encode_executor.shutdown(cancel_futures=True)
+
+        return metrics
+
+    @staticmethod
+    def run_staged(  # pylint: disable=too-many-locals
+            file_paths: List[str], chunk_size: Optional[int] = None,
+            byte_range: Optional[List[int]] = None,
+    ) -> PipelineMetrics:
+        """
+        Extracts, transforms and loads the files in the threads of a StagedPipeline.
+
+        The extracted parts are transformed by AppConfigs.PIPELINE_TRANSFORM_WORKERS threads
+        and loaded by one thread. Parts are extracted only while less than
+        AppConfigs.PIPELINE_MAX_INFLIGHT_BYTES of extracted parts are waiting to be
+        transformed or loaded, so slow writes throttle the parsing. The measurements of the
+        files are the stage reports of the pipeline per file.
+
+        Args:
+            file_paths (List[str]): A list of file paths for CSV files to process.
+            chunk_size (Optional[int]): The number of rows streamed through the steps at a time.
+            byte_range (Optional[List[int]]): The byte range of the single file to process.
+
+        Returns:
+            PipelineMetrics: The measurements of the steps. The transform times are summed
+            over the transform threads.
+        """
+        csv_file_sources = App.create_csv_file_sources(
+            file_paths, chunk_size=chunk_size, byte_range=byte_range
+        )
+        extracted_data_iterator = CsvFileExtractor(
+            csv_file_sources,
+            max_workers=AppConfigs.EXTRACT_WORKERS,
+            prefetch=AppConfigs.EXTRACT_PREFETCH,
+        ).extract()
+
+        metrics = PipelineMetrics()
+        loaders = {}
+        defer_indexes = App.defer_indexes(byte_range)
+        encode_executor = App.create_encode_executor()
+        loaded_rows: Dict[Optional[str], int] = {}
+
+        def transform(extracted_data: pd.DataFrame):
+            documents = list(App.create_transformer(extracted_data, encode_executor).transform())
+            yield extracted_data.attrs.get('file_name'), list(extracted_data.columns), documents
+
+        def load(transformed_data) -> None:
+            file_name, columns, documents = transformed_data
+            if file_name not in loaders:
+                loaders[file_name] = App.create_loader(file_name, columns, defer_indexes)
+            loaders[file_name].load(input_data=documents)
+            loaded_rows[file_name] = loaded_rows.get(file_name, 0) + len(documents)
+
+        pipeline = StagedPipeline(
+            stages=[
+                Stage('transform', transform, workers=AppConfigs.PIPELINE_TRANSFORM_WORKERS,
+                      queue_size=AppConfigs.PIPELINE_QUEUE_SIZE),
+                Stage('load', load, queue_size=AppConfigs.PIPELINE_QUEUE_SIZE),
+            ],
+            max_inflight_bytes=AppConfigs.PIPELINE_MAX_INFLIGHT_BYTES,
+            size_of=PipelineMetrics.data_frame_bytes,
+            key_of=lambda extracted_data: extracted_data.attrs.get('file_name'),
+        )
+        failed = True
+        try:
+            pipeline.run(extracted_data_iterator)
+            failed = False
+            for file_name, reports in pipeline.reports_by_key.items():
+                metrics.record_stage_reports(file_name, reports, loaded_rows.get(file_name, 0))
+        finally:
+            App.close_loaders(loaders, metrics, failed)
+            if encode_executor is not None:
+                encode_executor.shutdown(cancel_futures=True)
+        return metrics
+
+    @staticmethod
+    def close_loaders(
+            loaders: Dict[Optional[str], MongoDBLoader], metrics: PipelineMetrics, failed: bool
+    ) -> None:
+        """
+        Closes the loaders of a run, measuring the wait for their writes.
+
+        Every loader is closed, even after one of them raised. When the run already failed
+        the errors of the loaders are only logged, so they do not replace the error of the
+        run.
+
+        Args:
+            loaders (Dict[Optional[str], MongoDBLoader]): The loaders by source file name.
+            metrics (PipelineMetrics): The measurements of the run.
+            failed (bool): Whether the run is failing with an error in flight.
+
+        Raises:
+            Exception: The first error raised by a loader of a successful run.
+        """
+        close_error = None
+        for file_name, loader in loaders.items():
+            try:
+                with metrics.track_load(file_name, chunks=0):
+                    loader.close()
+            except Exception as error:  # pylint: disable=broad-exception-caught
+                if failed:
+                    logger.error(f'Could not close the loader of {file_name}: {error!r}')
+                else:
+                    close_error = close_error or error
+        if close_error is not None:
+            raise close_error
+
+    @staticmethod
+    def create_engine(chunk_size: Optional[int] = None) -> MultiprocessEngine:
+        """
+        Creates the engine running the steps in parse and writer processes.
+
+        Only used in insert mode, since the parse workers hand the writers BSON documents
+        encoded with a new '_id', which cannot be upserted by their natural key.
+
+        Args:
+            chunk_size (Optional[int]): The number of rows read from a shard at a time.
+
+        Returns:
+            MultiprocessEngine: An engine of AppConfigs.ENGINE_PARSE_WORKERS parse processes
+            and AppConfigs.ENGINE_WRITER_PROCESSES writer processes.
+        """
+        return MultiprocessEngine(
+            source_factory=App.create_csv_file_sources,
+            loader_factory=App.create_loader,
+            parse_workers=AppConfigs.ENGINE_PARSE_WORKERS,
+            writer_processes=AppConfigs.ENGINE_WRITER_PROCESSES,
+            shard_bytes=AppConfigs.SHARD_TARGET_BYTES,
+            chunk_size=chunk_size,
+            batch_size=AppConfigs.TRANSFORM_BATCH_SIZE,
+            compact=AppConfigs.COMPACT_DOCUMENTS,
+            field_aliases={
+                file_name: schema.field_aliases
+                for file_name, schema in CsvSchemaConfigs.SCHEMAS.items()
+            } if AppConfigs.FIELD_ALIASES else None,
+            integer_columns={
+                file_name: schema.integer_columns
+                for file_name, schema in CsvSchemaConfigs.SCHEMAS.items()
+            },
+        )
+
+    @staticmethod
+    def run_name(file_paths: List[str], byte_range: Optional[List[int]] = None) -> str:
+        """
+        Names a run after its files and its byte range.
+
+        Args:
+            file_paths (List[str]): A list of file paths for CSV files to process.
+            byte_range (Optional[List[int]]): The byte range of the single file to process.
+
+        Returns:
+            str: The names of the files without extension joined by underscores, followed
+            by the byte range of a shard.
+        """
+        run_name = '_'.join(
+            os.path.splitext(os.path.basename(file_path))[0] for file_path in file_paths
+        )
+        if byte_range is not None:
+            run_name += f'_{byte_range[0]}-{byte_range[1]}'
+        return run_name
+
+    @staticmethod
+    def engine() -> str:
+        """
+        The engine that runs the steps.
+
+        The writers of a MultiprocessEngine only insert documents, so with any other
+        MONGO_WRITE_MODE the 'multiprocess' engine is replaced by the inline one with a
+        warning.
+
+        Returns:
+            str: AppConfigs.ENGINE, or 'inline' when the multiprocess engine cannot be used.
+        """
+        if AppConfigs.ENGINE == 'multiprocess' and MongoDBConfigs.WRITE_MODE != 'insert':
+            logger.warning(
+                f'Running inline instead of ETL_ENGINE=multiprocess, since its writers only '
+                f'insert documents and MONGO_WRITE_MODE is {MongoDBConfigs.WRITE_MODE}.'
+            )
+            return 'inline'
+        return AppConfigs.ENGINE
+
+    @staticmethod
+    def defer_indexes(byte_range: Optional[List[int]] = None) -> bool:
+        """
+        Whether the task may drop the indexes of its collections and build them after the load.
+
+        Dropping the indexes is only safe when no other task loads into the same collection
+        at the same time, since a concurrent task would drop the indexes another task is
+        building. That holds when every file has its own collection and the task processes
+        whole files in this process. Otherwise MONGO_DEFER_INDEXES is ignored with a warning
+        and the indexes are maintained by the inserts.
+
+        Args:
+            byte_range (Optional[List[int]]): The byte range of the single file to process.
+
+        Returns:
+            bool: True if MongoDBConfigs.DEFER_INDEXES is set and the task owns its collections.
+        """
+        if not MongoDBConfigs.DEFER_INDEXES:
+            return False
+        if not MongoDBConfigs.ROUTE_BY_SOURCE or byte_range is not None:
+            logger.warning(
+                'Ignoring MONGO_DEFER_INDEXES, since other tasks load into the same collection. '
+                'Deferred indexes require MONGO_ROUTE_BY_SOURCE and unsharded files.'
+            )
+            return False
+        return True
+
+    @staticmethod
+    def create_loader(
+            file_name: Optional[str], columns: List[str], defer_indexes: bool = False
+    ) -> MongoDBLoader:
+        """
+        Creates the MongoDBLoader of the data extracted from a source file.
+
+        In upsert mode the documents are identified by the natural key registered for the
+        file name in CsvSchemaConfigs. When MongoDBConfigs.ROUTE_BY_SOURCE is set, the data
+        is stored in a collection named after the file, with a text index only if the file
+        has the search column and the secondary indexes registered for the file.
+        When AppConfigs.FIELD_ALIASES is set, the columns with an alias in the schema of the
+        file are stored under it. Compact documents get sparse secondary indexes.
+
+        Args:
+            file_name (Optional[str]): The name of the source file of the data.
+            columns (List[str]): The columns of the data extracted from the source file.
+            defer_indexes (bool, optional): Whether to drop the indexes of the collection and
+            build them after the load, see 'defer_indexes'. Default is False.
+
+        Returns:
+            MongoDBLoader: The loader of the data of the source file.
+        """
+        schema = CsvSchemaConfigs.get(file_name) if file_name else None
+        source_name = os.path.splitext(file_name)[0] if file_name else ''
+
+        index_profile = {}
+        if MongoDBConfigs.ROUTE_BY_SOURCE and source_name:
+            index_profile = {
+                'collection_name': source_name,
+                'text_index': MongoDBConfigs.SEARCH_QUERY_COLUMN in columns,
+                'secondary_indexes': [
+                    column
+                    for column in (schema.indexes if schema is not None else ())
+                    if column in columns
+                ],
+            }
+
+        storage = MongoDBStorage(
+            ordered=MongoDBConfigs.WRITER_THREADS <= 0,
+            natural_key=schema.natural_key if schema is not None else (),
+            key_prefix=source_name,
+            field_aliases=App.field_aliases(file_name, columns),
+            sparse_indexes=AppConfigs.COMPACT_DOCUMENTS,
+            defer_indexes=defer_indexes,
+            **index_profile,
+        )
+        return MongoDBLoader(
+            mongo_storage=storage,
+            writer_threads=MongoDBConfigs.WRITER_THREADS,
+            queue_size=MongoDBConfigs.WRITER_QUEUE_SIZE,
+        )
+
+    @staticmethod
+    def create_encode_executor() -> Optional[Executor]:
+        """
+        Creates the process pool encoding the documents into BSON, if it is enabled.
+
+        The pool is only used in insert mode, since upserts hash and identify the documents
+        as dictionaries. Its workers are spawned, because forking a process with running
+        writer and extract threads is not safe.
+
+        Returns:
+            Optional[Executor]: A pool of AppConfigs.BSON_ENCODE_WORKERS processes, or None
+            when the documents are encoded by pymongo on insert.
+        """
+        if AppConfigs.BSON_ENCODE_WORKERS <= 0 or MongoDBConfigs.WRITE_MODE != 'insert':
+            return None
+        return ProcessPoolExecutor(
+            max_workers=AppConfigs.BSON_ENCODE_WORKERS,
+            mp_context=multiprocessing.get_context('spawn'),
+        )
+
+    @staticmethod
+    def create_transformer(
+            data_frame: pd.DataFrame, encode_executor: Optional[Executor] = None
+    ) -> Union[DataFrameRowDictTransformer, RawBsonTransformer]:
+        """
+        Creates the transformer of an extracted DataFrame part.
+
+        The field aliases and the integer columns come from the schema of the file named in
+        the 'file_name' entry of DataFrame.attrs.
+
+        Args:
+            data_frame (pd.DataFrame): The extracted part.
+            encode_executor (Optional[Executor]): The pool encoding the documents into BSON.
+            Default is None, which transforms the part into dictionaries.
+
+        Returns:
+            Union[DataFrameRowDictTransformer, RawBsonTransformer]: The transformer of the part.
+        """
+        file_name = data_frame.attrs.get('file_name')
+        schema = CsvSchemaConfigs.get(file_name) if file_name else None
+        field_aliases = App.field_aliases(file_name, list(data_frame.columns))
+        integer_columns = schema.integer_columns if schema is not None else ()
+        if encode_executor is not None:
+            return RawBsonTransformer(
+                input_df=data_frame,
+                executor=encode_executor,
+                batch_size=AppConfigs.TRANSFORM_BATCH_SIZE,
+                compact=AppConfigs.COMPACT_DOCUMENTS,
+                field_aliases=field_aliases,
+                integer_columns=integer_columns,
+                max_pending=2 * AppConfigs.BSON_ENCODE_WORKERS,
+            )
+        return DataFrameRowDictTransformer(
+            input_df=data_frame,
+            batch_size=AppConfigs.TRANSFORM_BATCH_SIZE,
+            compact=AppConfigs.COMPACT_DOCUMENTS,
+            field_aliases=field_aliases,
+            integer_columns=integer_columns,
+        )
+
+    @staticmethod
+    def field_aliases(file_name: Optional[str], columns: List[str]) -> Dict[str, str]:
+        """
+        The short field names of the columns when AppConfigs.FIELD_ALIASES is set.
+
+        Args:
+            file_name (Optional[str]): The name of the source file of the data.
+            columns (List[str]): The columns of the data extracted from the source file.
+
+        Returns:
+            Dict[str, str]: The aliases registered in the schema of the file for the columns,
+            empty when field aliases are disabled or the file has no schema.
+        """
+        schema = CsvSchemaConfigs.get(file_name) if file_name else None
+        if not AppConfigs.FIELD_ALIASES or schema is None:
+            return {}
+        return {
+            column: alias
+            for column, alias in schema.field_aliases.items()
+            if column in columns
+        }
+
+    @staticmethod
+    def create_csv_file_sources(
+            file_paths: List[str], chunk_size: Optional[int] = None,
+            byte_range: Optional[List[int]] = None,
+    ) -> List[CsvFileSource]:
+        """
+        Creates a list of CsvFileSource objects based on the provided list of file paths.
+
+        Each source gets the schema registered for its file name in CsvSchemaConfigs, and
+        a parse cache unless it is disabled or pyarrow is not installed.
+
+        Args:
+            file_paths (List[str]): A list of file paths for CSV files.
+            chunk_size (Optional[int]): The number of rows per part for streaming sources.
+            Default is None, which loads whole files.
+            byte_range (Optional[List[int]]): The byte range of the single file to load.
+            Default is None, which loads whole files.
+
+        Returns:
+            List[CsvFileSource]: A list of CsvFileSource objects created from the file paths.
+        """
+        parse_cache = None
+        if AppConfigs.PARSE_CACHE_ENABLED and ParseCache.is_available():
+            parse_cache = ParseCache(
+                cache_dir=AppConfigs.PARSE_CACHE_DIR,
+                max_bytes=AppConfigs.PARSE_CACHE_MAX_BYTES,
+            )
+
+        csv_file_sources = [
+            CsvFileSource(
+                file_path=file_path,
+                chunk_size=chunk_size,
+                schema=CsvSchemaConfigs.get(file_path),
+                parse_cache=parse_cache,
+                byte_range=byte_range,
+            )
+            for file_path in file_paths
+        ]
+        return csv_file_sources
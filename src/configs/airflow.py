@@ -1,12 +1,12 @@
-from datetime import timedelta
-
-
-class AirflowConfigs:
-    default_args = {
-        'owner': 'airflow',
-        'depends_on_past': False,
-        'email_on_failure': False,
-        'email_on_retry': False,
-        'retries': 1,
-        'retry_delay': timedelta(minutes=5),
-    }
+from datetime import timedelta
+
+
+class AirflowConfigs:
+    default_args = {
+        'owner': 'airflow',
+        'depends_on_past': False,
+        'email_on_failure': False,
+        'email_on_retry': False,
+        'retries': 1,
+        'retry_delay': timedelta(minutes=5),
+    }
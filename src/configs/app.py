@@ -1,8 +1,35 @@
-from datetime import timedelta
-
-
-class AppConfigs:
-    NAME = 'etl-startup-investments'
-    DESCRIPTION = 'ETL process of startup investments'
-    DATA_FOLDER = 'data/startup-investments'
-    SCHEDULE_INTERVAL = timedelta(days=1)
+import os
+from datetime import timedelta
+
+
+class AppConfigs:
+    NAME = 'etl-startup-investments'
+    DESCRIPTION = 'ETL process of startup investments'
+    DATA_FOLDER = 'data/startup-investments'
+    SCHEDULE_INTERVAL = timedelta(days=1)
+    CSV_CHUNK_SIZE = int(os.environ.get('CSV_CHUNK_SIZE', 0)) or None  # rows, None: whole files
+    EXTRACT_WORKERS = int(os.environ.get('EXTRACT_WORKERS', 1))  # sources parsed at once
+    EXTRACT_PREFETCH = int(os.environ.get('EXTRACT_PREFETCH', 0)) or None  # parsed parts buffered
+    PARSE_CACHE_ENABLED = os.environ.get('PARSE_CACHE_ENABLED', 'false').lower() == 'true'
+    PARSE_CACHE_DIR = os.environ.get('PARSE_CACHE_DIR', 'data/.parse-cache')
+    PARSE_CACHE_MAX_BYTES = int(os.environ.get('PARSE_CACHE_MAX_BYTES', 2 * 1024 ** 3))
+    TRANSFORM_BATCH_SIZE = int(os.environ.get('TRANSFORM_BATCH_SIZE', 0)) or None  # rows
+    COMPACT_DOCUMENTS = os.environ.get('COMPACT_DOCUMENTS', 'false').lower() == 'true'
+    FIELD_ALIASES = os.environ.get('FIELD_ALIASES', 'false').lower() == 'true'  # short names
+    BSON_ENCODE_WORKERS = int(os.environ.get('BSON_ENCODE_WORKERS', 0))  # 0 encodes on insert
+    ENGINE = os.environ.get('ETL_ENGINE', 'inline')  # 'inline', 'staged' or 'multiprocess'
+    ENGINE_PARSE_WORKERS = int(os.environ.get('ENGINE_PARSE_WORKERS', 0)) or os.cpu_count() or 1
+    ENGINE_WRITER_PROCESSES = int(os.environ.get('ENGINE_WRITER_PROCESSES', 2))
+    PIPELINE_TRANSFORM_WORKERS = int(os.environ.get('PIPELINE_TRANSFORM_WORKERS', 2))
+    PIPELINE_QUEUE_SIZE = int(os.environ.get('PIPELINE_QUEUE_SIZE', 4))  # items per stage
+    PIPELINE_MAX_INFLIGHT_BYTES = int(
+        os.environ.get('PIPELINE_MAX_INFLIGHT_BYTES', 512 * 1024 ** 2)
+    )  # extracted parts not yet loaded
+    METRICS_DIR = os.environ.get('METRICS_DIR')  # metrics export folder, None disables it
+    PROFILE_ENABLED = os.environ.get('ETL_PROFILE', 'false').lower() == 'true'
+    PROFILE_DIR = os.environ.get(
+        'ETL_PROFILE_DIR', os.path.join(os.environ.get('AIRFLOW_HOME', '.'), 'logs', 'profiles')
+    )
+    PROFILE_SAMPLE_INTERVAL = float(os.environ.get('ETL_PROFILE_SAMPLE_INTERVAL', 0.005))  # seconds
+    SHARD_TARGET_BYTES = int(os.environ.get('SHARD_TARGET_BYTES', 256 * 1024 ** 2))  # per task
+    SMALL_FILE_BYTES = int(os.environ.get('SMALL_FILE_BYTES', 16 * 1024 ** 2))  # grouped below
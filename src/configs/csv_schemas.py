@@ -0,0 +1,273 @@
+import os
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class CsvSchema:
+    """
+    Parsing options of a CSV file in the startup investments data folder.
+
+    Attributes:
+        dtypes (Dict[str, str]): Column dtypes that replace pandas' type inference.
+        categorical_columns (Tuple[str, ...]): Low cardinality text columns parsed as categories.
+        date_columns (Tuple[str, ...]): Columns parsed as datetimes.
+        integer_columns (Tuple[str, ...]): Columns holding only whole numbers, such as counts,
+            stored as integers in compact documents.
+        usecols (Optional[Tuple[str, ...]]): Columns to read, None reads every column.
+        natural_key (Tuple[str, ...]): Columns that identify a row across loads of the file.
+        indexes (Tuple[str, ...]): Columns with a secondary index in the file's own collection.
+        field_aliases (Dict[str, str]): Short field names of long columns, used when field
+            aliases are enabled.
+    """
+    dtypes: Dict[str, str] = field(default_factory=dict)
+    categorical_columns: Tuple[str, ...] = ()
+    date_columns: Tuple[str, ...] = ()
+    integer_columns: Tuple[str, ...] = ()
+    usecols: Optional[Tuple[str, ...]] = None
+    natural_key: Tuple[str, ...] = ()
+    indexes: Tuple[str, ...] = ()
+    field_aliases: Dict[str, str] = field(default_factory=dict)
+
+
+_TIMESTAMPS = ('created_at', 'updated_at')
+_TIMESTAMP_ALIASES = {'created_at': 'c_at', 'updated_at': 'u_at'}
+
+
+class CsvSchemaConfigs:
+    """
+    Schema registry keyed by the file names in AppConfigs.DATA_FOLDER.
+
+    Columns that are not present in a file are ignored, so a registry entry never fails
+    a parse because of a renamed or missing column. Files without an entry are parsed
+    with pandas' default type inference. The usecols of every file hold all the columns
+    of its header in the dataset, so every stored field is still loaded, and only columns
+    added to a file later are left out.
+
+    The field aliases are keyed by file and so by collection. A column has the same alias
+    in every file, so a collection shared by several files gets consistent aliases. The
+    search column keeps its name, so the text index and the BM25 index find it.
+    """
+    SCHEMAS: Dict[str, CsvSchema] = {
+        'acquisitions.csv': CsvSchema(
+            dtypes={'price_amount': 'float64'},
+            categorical_columns=('term_code', 'price_currency_code'),
+            date_columns=('acquired_at',) + _TIMESTAMPS,
+            usecols=(
+                'id', 'acquisition_id', 'acquiring_object_id', 'acquired_object_id',
+                'term_code', 'price_amount', 'price_currency_code', 'acquired_at',
+                'source_url', 'source_description',
+            ) + _TIMESTAMPS,
+            natural_key=('acquisition_id',),
+            indexes=('acquiring_object_id', 'acquired_object_id'),
+            field_aliases={
+                'acquiring_object_id': 'acq_id', 'acquired_object_id': 'acqd_id',
+                'price_currency_code': 'price_cur', 'source_url': 'src',
+                **_TIMESTAMP_ALIASES,
+            },
+        ),
+        'degrees.csv': CsvSchema(
+            categorical_columns=('degree_type',),
+            date_columns=('graduated_at',) + _TIMESTAMPS,
+            usecols=(
+                'id', 'object_id', 'degree_type', 'subject', 'institution', 'graduated_at',
+            ) + _TIMESTAMPS,
+            natural_key=('id',),
+            indexes=('object_id',),
+            field_aliases={
+                'object_id': 'oid',
+                **_TIMESTAMP_ALIASES,
+            },
+        ),
+        'funding_rounds.csv': CsvSchema(
+            dtypes={
+                'raised_amount_usd': 'float64',
+                'raised_amount': 'float64',
+                'pre_money_valuation_usd': 'float64',
+                'pre_money_valuation': 'float64',
+                'post_money_valuation_usd': 'float64',
+                'post_money_valuation': 'float64',
+                'participants': 'float64',
+            },
+            categorical_columns=(
+                'funding_round_type', 'funding_round_code', 'raised_currency_code',
+                'pre_money_currency_code', 'post_money_currency_code',
+                'is_first_round', 'is_last_round',
+            ),
+            date_columns=('funded_at',) + _TIMESTAMPS,
+            integer_columns=('participants',),
+            usecols=(
+                'id', 'funding_round_id', 'object_id', 'funded_at', 'funding_round_type',
+                'funding_round_code', 'raised_amount_usd', 'raised_amount',
+                'raised_currency_code', 'pre_money_valuation_usd', 'pre_money_valuation',
+                'pre_money_currency_code', 'post_money_valuation_usd', 'post_money_valuation',
+                'post_money_currency_code', 'participants', 'is_first_round', 'is_last_round',
+                'source_url', 'source_description', 'created_by',
+            ) + _TIMESTAMPS,
+            natural_key=('funding_round_id',),
+            indexes=('object_id',),
+            field_aliases={
+                'funding_round_id': 'fr_id', 'object_id': 'oid',
+                'funding_round_type': 'fr_type', 'funding_round_code': 'fr_code',
+                'raised_amount_usd': 'ra_usd', 'raised_amount': 'ra',
+                'raised_currency_code': 'ra_cur', 'pre_money_valuation_usd': 'pre_usd',
+                'pre_money_valuation': 'pre', 'pre_money_currency_code': 'pre_cur',
+                'post_money_valuation_usd': 'post_usd', 'post_money_valuation': 'post',
+                'post_money_currency_code': 'post_cur', 'is_first_round': 'first',
+                'is_last_round': 'last', 'source_url': 'src',
+                **_TIMESTAMP_ALIASES,
+            },
+        ),
+        'funds.csv': CsvSchema(
+            dtypes={'raised_amount': 'float64'},
+            categorical_columns=('raised_currency_code',),
+            date_columns=('funded_at',) + _TIMESTAMPS,
+            usecols=(
+                'id', 'fund_id', 'object_id', 'name', 'funded_at', 'raised_amount',
+                'raised_currency_code', 'source_url', 'source_description',
+            ) + _TIMESTAMPS,
+            natural_key=('fund_id',),
+            indexes=('object_id',),
+            field_aliases={
+                'object_id': 'oid', 'raised_amount': 'ra', 'raised_currency_code': 'ra_cur',
+                'source_url': 'src',
+                **_TIMESTAMP_ALIASES,
+            },
+        ),
+        'investments.csv': CsvSchema(
+            date_columns=_TIMESTAMPS,
+            usecols=(
+                'id', 'funding_round_id', 'funded_object_id', 'investor_object_id',
+            ) + _TIMESTAMPS,
+            natural_key=('id',),
+            indexes=('funding_round_id', 'funded_object_id', 'investor_object_id'),
+            field_aliases={
+                'funding_round_id': 'fr_id', 'funded_object_id': 'fo_id',
+                'investor_object_id': 'io_id',
+                **_TIMESTAMP_ALIASES,
+            },
+        ),
+        'ipos.csv': CsvSchema(
+            dtypes={'valuation_amount': 'float64', 'raised_amount': 'float64'},
+            categorical_columns=('valuation_currency_code', 'raised_currency_code'),
+            date_columns=('public_at',) + _TIMESTAMPS,
+            usecols=(
+                'id', 'ipo_id', 'object_id', 'valuation_amount', 'valuation_currency_code',
+                'raised_amount', 'raised_currency_code', 'public_at', 'stock_symbol',
+                'source_url', 'source_description',
+            ) + _TIMESTAMPS,
+            natural_key=('ipo_id',),
+            indexes=('object_id',),
+            field_aliases={
+                'object_id': 'oid', 'valuation_amount': 'val', 'valuation_currency_code': 'val_cur',
+                'raised_amount': 'ra', 'raised_currency_code': 'ra_cur', 'source_url': 'src',
+                **_TIMESTAMP_ALIASES,
+            },
+        ),
+        'milestones.csv': CsvSchema(
+            categorical_columns=('milestone_code',),
+            date_columns=('milestone_at',) + _TIMESTAMPS,
+            usecols=(
+                'id', 'object_id', 'milestone_at', 'milestone_code', 'description',
+                'source_url', 'source_description',
+            ) + _TIMESTAMPS,
+            natural_key=('id',),
+            indexes=('object_id',),
+            field_aliases={
+                'object_id': 'oid', 'source_url': 'src',
+                **_TIMESTAMP_ALIASES,
+            },
+        ),
+        'objects.csv': CsvSchema(
+            dtypes={
+                'investment_rounds': 'float64',
+                'invested_companies': 'float64',
+                'funding_rounds': 'float64',
+                'funding_total_usd': 'float64',
+                'milestones': 'float64',
+                'relationships': 'float64',
+            },
+            categorical_columns=(
+                'entity_type', 'category_code', 'status', 'country_code', 'state_code',
+                'region',
+            ),
+            date_columns=(
+                'founded_at', 'closed_at', 'first_investment_at', 'last_investment_at',
+                'first_funding_at', 'last_funding_at', 'first_milestone_at',
+                'last_milestone_at',
+            ) + _TIMESTAMPS,
+            integer_columns=(
+                'investment_rounds', 'invested_companies', 'funding_rounds', 'milestones',
+                'relationships',
+            ),
+            usecols=(
+                'id', 'entity_type', 'entity_id', 'parent_id', 'name', 'normalized_name',
+                'permalink', 'category_code', 'status', 'founded_at', 'closed_at', 'domain',
+                'homepage_url', 'twitter_username', 'logo_url', 'logo_width', 'logo_height',
+                'short_description', 'description', 'overview', 'tag_list', 'country_code',
+                'state_code', 'city', 'region', 'first_investment_at', 'last_investment_at',
+                'investment_rounds', 'invested_companies', 'first_funding_at', 'last_funding_at',
+                'funding_rounds', 'funding_total_usd', 'first_milestone_at', 'last_milestone_at',
+                'milestones', 'relationships', 'created_by',
+            ) + _TIMESTAMPS,
+            natural_key=('id',),
+            indexes=('id', 'parent_id'),
+            field_aliases={
+                'normalized_name': 'norm_name', 'short_description': 'short_desc',
+                **_TIMESTAMP_ALIASES,
+            },
+        ),
+        'offices.csv': CsvSchema(
+            dtypes={'latitude': 'float64', 'longitude': 'float64'},
+            categorical_columns=('region', 'state_code', 'country_code'),
+            date_columns=_TIMESTAMPS,
+            usecols=(
+                'id', 'object_id', 'office_id', 'description', 'region', 'address1',
+                'address2', 'city', 'zip_code', 'state_code', 'country_code', 'latitude',
+                'longitude',
+            ) + _TIMESTAMPS,
+            natural_key=('office_id',),
+            indexes=('object_id',),
+            field_aliases={
+                'object_id': 'oid',
+                **_TIMESTAMP_ALIASES,
+            },
+        ),
+        'people.csv': CsvSchema(
+            usecols=(
+                'id', 'object_id', 'first_name', 'last_name', 'birthplace', 'affiliation_name',
+            ),
+            natural_key=('id',),
+            indexes=('object_id',),
+            field_aliases={'object_id': 'oid'},
+        ),
+        'relationships.csv': CsvSchema(
+            dtypes={'sequence': 'float64'},
+            categorical_columns=('is_past',),
+            date_columns=('start_at', 'end_at') + _TIMESTAMPS,
+            integer_columns=('sequence',),
+            usecols=(
+                'id', 'relationship_id', 'person_object_id', 'relationship_object_id',
+                'start_at', 'end_at', 'is_past', 'sequence', 'title',
+            ) + _TIMESTAMPS,
+            natural_key=('relationship_id',),
+            indexes=('person_object_id', 'relationship_object_id'),
+            field_aliases={
+                'person_object_id': 'person_id', 'relationship_object_id': 'rel_obj_id',
+                **_TIMESTAMP_ALIASES,
+            },
+        ),
+    }
+
+    @staticmethod
+    def get(file_path: str) -> Optional[CsvSchema]:
+        """
+        Get the schema registered for the file name of the given path.
+
+        Args:
+            file_path (str): The path of a CSV file.
+
+        Returns:
+            Optional[CsvSchema]: The registered schema, or None when the file is not registered.
+        """
+        return CsvSchemaConfigs.SCHEMAS.get(os.path.basename(file_path))
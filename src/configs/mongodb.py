@@ -1,12 +1,31 @@
-import os
-
-
-class MongoDBConfigs:
-    DEFAULT_CHUNK_SIZE: int = 100000  # records
-    HOST: str = os.environ.get('MONGO_HOST', 'mongo')
-    PORT = os.environ.get('MONGO_PORT', 27017)
-    USERNAME = os.environ.get('USERNAME', 'root')
-    PASSWORD = os.environ.get('PASSWORD', 'example')
-    MONGO_DATABASE = os.environ.get('MONGO_DATABASE', 'startup')
-    INVESTMENT_COLLECTION = os.environ.get('MONGO_INVESTMENT_COLLECTION', 'investment')
-    SEARCH_QUERY_COLUMN = 'source_description'
+import os
+
+
+class MongoDBConfigs:
+    DEFAULT_CHUNK_SIZE: int = 100000  # records
+    HOST: str = os.environ.get('MONGO_HOST', 'mongo')
+    PORT = os.environ.get('MONGO_PORT', 27017)
+    USERNAME = os.environ.get('USERNAME', 'root')
+    PASSWORD = os.environ.get('PASSWORD', 'example')
+    MAX_POOL_SIZE = int(os.environ.get('MONGO_MAX_POOL_SIZE', 0)) or None  # pymongo default 100
+    MIN_POOL_SIZE = int(os.environ.get('MONGO_MIN_POOL_SIZE', 0)) or None  # warm connections
+    CONNECT_TIMEOUT_MS = int(os.environ.get('MONGO_CONNECT_TIMEOUT_MS', 0)) or None
+    SERVER_SELECTION_TIMEOUT_MS = int(
+        os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', 0)
+    ) or None
+    SOCKET_TIMEOUT_MS = int(os.environ.get('MONGO_SOCKET_TIMEOUT_MS', 0)) or None
+    COMPRESSORS = os.environ.get('MONGO_COMPRESSORS')  # e.g. zstd,snappy,zlib
+    MONGO_DATABASE = os.environ.get('MONGO_DATABASE', 'startup')
+    INVESTMENT_COLLECTION = os.environ.get('MONGO_INVESTMENT_COLLECTION', 'investment')
+    SEARCH_QUERY_COLUMN = 'source_description'
+    WRITER_THREADS = int(os.environ.get('MONGO_WRITER_THREADS', 0))  # 0 writes synchronously
+    WRITER_QUEUE_SIZE = int(os.environ.get('MONGO_WRITER_QUEUE_SIZE', 0)) or None  # chunks
+    WRITE_CONCERN_W = os.environ.get('MONGO_WRITE_CONCERN_W')  # e.g. 1 or majority
+    WRITE_MODE = os.environ.get('MONGO_WRITE_MODE', 'insert')  # insert or upsert
+    CONTENT_HASH_FIELD = '_content_hash'
+    LOADED_AT_FIELD = '_loaded_at'  # when the document was last written, for the search index
+    ROUTE_BY_SOURCE = os.environ.get('MONGO_ROUTE_BY_SOURCE', 'false').lower() == 'true'
+    DEFER_INDEXES = os.environ.get('MONGO_DEFER_INDEXES', 'false').lower() == 'true'
+    META_COLLECTION = os.environ.get('MONGO_META_COLLECTION', 'etl_meta')
+    LOAD_GENERATION_ID = 'load_generation'
+    FIELD_ALIASES_ID = 'field_aliases'  # followed by ':<collection>'
@@ -1,34 +1,49 @@
-"""
-Abstract base class for data sources with an abstract method 'load()' to be implemented by
-subclasses for loading data as a pandas DataFrame.
-"""
-from abc import ABC, abstractmethod
-import pandas as pd
-
-
-class DataSource(ABC):
-    """Abstract base class for data sources.
-    
-        This class defines an abstract interface for loading data from different sources.
-        Subclasses should inherit from this class and implement the 'load()' method to
-        provide data loading functionality.
-        
-        Methods:
-            load(): Abstract method to be implemented by subclasses for loading data.
-    """
-
-    @abstractmethod
-    def load(self) -> pd.DataFrame:  # pragma: no cover
-        """
-        Abstract method to be implemented by subclasses for loading data.
-
-        Returns:
-            pd.DataFrame: The loaded data as a pandas DataFrame.
-
-        Raises:
-            NotImplementedError: This method is abstract and must be implemented in subclasses.
-        """
-        raise NotImplementedError()
-
-    def __str__(self):  # pragma: no cover
-        raise NotImplementedError()
+"""
+Abstract base class for data sources with an abstract method 'load()' to be implemented by
+subclasses for loading data as a pandas DataFrame.
+"""
+from abc import ABC, abstractmethod
+from typing import Iterator
+import pandas as pd
+
+
+class DataSource(ABC):
+    """Abstract base class for data sources.
+    
+        This class defines an abstract interface for loading data from different sources.
+        Subclasses should inherit from this class and implement the 'load()' method to
+        provide data loading functionality.
+        
+        Methods:
+            load(): Abstract method to be implemented by subclasses for loading data.
+            load_chunks(): Yields the data in parts, defaults to a single part from 'load()'.
+    """
+
+    @abstractmethod
+    def load(self) -> pd.DataFrame:  # pragma: no cover
+        """
+        Abstract method to be implemented by subclasses for loading data.
+
+        Returns:
+            pd.DataFrame: The loaded data as a pandas DataFrame.
+
+        Raises:
+            NotImplementedError: This method is abstract and must be implemented in subclasses.
+        """
+        raise NotImplementedError()
+
+    def load_chunks(self) -> Iterator[pd.DataFrame]:
+        """
+        Load data in parts as pandas DataFrames.
+
+        Subclasses that can stream their data should override this method so that only
+        one part is held in memory at a time. The default implementation yields the
+        whole result of 'load()' as a single part.
+
+        Yields:
+            pd.DataFrame: A part of the loaded data.
+        """
+        yield self.load()
+
+    def __str__(self):  # pragma: no cover
+        raise NotImplementedError()
@@ -1,63 +1,140 @@
-"""
-Module for defining the CsvFileExtractor class.
-
-This module contains the CsvFileExtractor class, which is a specific implementation of the Extractor
-abstract class. It provides functionality to extract data from CSV file sources.
-
-Classes:
-    CsvFileExtractor: A class for extracting data from CSV file sources.
-"""
-from typing import List, Iterable
-import pandas as pd
-
-from src.interfaces.extractor import Extractor
-from src.models.csv_file_source import CsvFileSource
-
-
-class CsvFileExtractor(Extractor):
-    """
-    CsvFileExtractor class for extracting data from CSV file sources.
-
-    This class is a specific implementation of the Extractor abstract class,
-    providing functionality to extract data from CSV file sources.
-
-    Attributes:
-        csv_file_sources (List[CsvFileSource]): A list of CsvFileSource objects representing
-        the CSV file sources from which data will be extracted.
-
-    Methods:
-        __init__(csv_file_sources: List[CsvFileSource]) -> None:
-            Constructor for the CsvFileExtractor class.
-
-        extract() -> Iterable[pd.DataFrame]:
-            Method to extract data from CSV file sources.
-
-        __str__() -> str:
-        Returns a string representation of the CsvFileExtractor object.
-    """
-
-    def __init__(self, csv_file_sources: List[CsvFileSource]) -> None:
-        """
-        Constructor for the CsvFileExtractor class.
-
-        Args:
-            csv_file_sources (List[CsvFileSource]): A list of CsvFileSource objects representing 
-            the CSV file sources from which data will be extracted.
-        """
-        super().__init__(data_sources=csv_file_sources)
-
-    def extract(self) -> Iterable[pd.DataFrame]:
-        """
-        Extract data from CSV file sources.
-
-        This method iterates through the list of CsvFileSource objects and yields pandas DataFrames,
-        each representing the data extracted from a CSV file.
-
-        Yields:
-            pd.DataFrame: A DataFrame containing the extracted data from a CSV file.
-        """
-        for source in self.data_sources:
-            yield source.load()
-
-    def __str__(self):  # pragma: no cover
-        return ', '.join([str(source) for source in self.data_sources])
+"""
+Module for defining the CsvFileExtractor class.
+
+This module contains the CsvFileExtractor class, which is a specific implementation of the Extractor
+abstract class. It provides functionality to extract data from CSV file sources.
+
+Classes:
+    CsvFileExtractor: A class for extracting data from CSV file sources.
+"""
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Iterable, Iterator, Optional
+import pandas as pd
+
+from src.interfaces.extractor import Extractor
+from src.models.csv_file_source import CsvFileSource
+
+_SOURCE_DONE = object()
+_PUT_TIMEOUT = 0.1  # seconds
+
+
+class CsvFileExtractor(Extractor):
+    """
+    CsvFileExtractor class for extracting data from CSV file sources.
+
+    This class is a specific implementation of the Extractor abstract class,
+    providing functionality to extract data from CSV file sources.
+
+    Attributes:
+        csv_file_sources (List[CsvFileSource]): A list of CsvFileSource objects representing
+        the CSV file sources from which data will be extracted.
+        max_workers (int): The number of sources parsed at once. 1 parses them one after another.
+        prefetch (int): The maximum number of parsed DataFrames waiting to be consumed.
+
+    Methods:
+        __init__(csv_file_sources: List[CsvFileSource], max_workers: int = 1,
+        prefetch: Optional[int] = None) -> None:
+            Constructor for the CsvFileExtractor class.
+
+        extract() -> Iterable[pd.DataFrame]:
+            Method to extract data from CSV file sources.
+
+        __str__() -> str:
+        Returns a string representation of the CsvFileExtractor object.
+    """
+
+    def __init__(
+            self, csv_file_sources: List[CsvFileSource],
+            max_workers: int = 1,
+            prefetch: Optional[int] = None,
+    ) -> None:
+        """
+        Constructor for the CsvFileExtractor class.
+
+        Args:
+            csv_file_sources (List[CsvFileSource]): A list of CsvFileSource objects representing
+            the CSV file sources from which data will be extracted.
+            max_workers (int, optional): The number of sources parsed at once in a thread pool.
+            Default is 1, which parses the sources one after another in the calling thread.
+            prefetch (Optional[int]): The maximum number of parsed DataFrames buffered ahead of
+            the consumer in parallel mode. Default is None, which uses max_workers.
+        """
+        super().__init__(data_sources=csv_file_sources)
+        self.max_workers = max_workers
+        self.prefetch = prefetch or max_workers
+
+    def extract(self) -> Iterable[pd.DataFrame]:
+        """
+        Extract data from CSV file sources.
+
+        This method iterates through the list of CsvFileSource objects and yields pandas DataFrames,
+        each representing the data extracted from a CSV file, or a part of it when the source
+        is in streaming mode.
+
+        In parallel mode the DataFrames are yielded in the order they finish parsing. At most
+        'prefetch' DataFrames are buffered and at most 'max_workers' are being parsed, so the
+        memory use stays bounded while the consumer is busy.
+
+        Yields:
+            pd.DataFrame: A DataFrame containing the extracted data from a CSV file.
+        """
+        if self.max_workers <= 1 or len(self.data_sources) <= 1:
+            for source in self.data_sources:
+                yield from source.load_chunks()
+            return
+
+        yield from self._extract_parallel()
+
+    def _extract_parallel(self) -> Iterator[pd.DataFrame]:
+        """
+        Parse the sources in a thread pool and yield DataFrames from a bounded prefetch queue.
+
+        Raises:
+            Exception: The first error raised while parsing any of the sources.
+        """
+        parsed_parts = queue.Queue(maxsize=self.prefetch)
+        stopped = threading.Event()
+
+        def put(item) -> bool:
+            while not stopped.is_set():
+                try:
+                    parsed_parts.put(item, timeout=_PUT_TIMEOUT)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def parse(source: CsvFileSource) -> None:
+            try:
+                for part in source.load_chunks():
+                    if not put(part):
+                        return
+            except Exception as error:  # pylint: disable=broad-exception-caught
+                put(error)
+            finally:
+                put(_SOURCE_DONE)
+
+        pending_sources = len(self.data_sources)
+        executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix='csv-extractor'
+        )
+        try:
+            for source in self.data_sources:
+                executor.submit(parse, source)
+
+            while pending_sources:
+                item = parsed_parts.get()
+                if item is _SOURCE_DONE:
+                    pending_sources -= 1
+                elif isinstance(item, Exception):
+                    raise item
+                else:
+                    yield item
+        finally:
+            stopped.set()
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def __str__(self):  # pragma: no cover
+        return ', '.join([str(source) for source in self.data_sources])
@@ -1,64 +1,269 @@
-"""
-csv_file_source.py - Module for defining the CsvFileSource class.
-
-This module contains the implementation of the CsvFileSource class, which is a specific
-implementation of the DataSource abstract class. It provides functionality to load data from
-a CSV file.
-
-Classes:
-    CsvFileSource: A class for loading data from a CSV file.
-"""
-
-import pandas as pd
-
-from src.interfaces.data_source import DataSource
-
-
-class CsvFileSource(DataSource):
-    """
-    CsvFileSource class for loading data from a CSV file.
-
-    This class is a specific implementation of the DataSource abstract class,
-    providing functionality to load data from a CSV file.
-
-    Attributes:
-        file_path (str): The file path of the CSV file from which data will be loaded.
-
-    Methods:
-        __init__(file_path: str) -> None:
-            Constructor for the CsvFileSource class.
-
-        load() -> pd.DataFrame:
-            Method to load data from the CSV file as a pandas DataFrame.
-
-        __str__() -> str:
-            Returns a string representation of the CsvFileSource object.
-    """
-
-    def __init__(self, file_path: str) -> None:
-        """
-        Constructor for the CsvFileSource class.
-
-        Args:
-            file_path (str): The file path of the CSV file from which data will be loaded.
-        """
-        super().__init__()
-        self.file_path = file_path
-
-    def load(self) -> pd.DataFrame:
-        """
-        Load data from the CSV file as a pandas DataFrame.
-
-        Returns:
-            pd.DataFrame: A DataFrame containing the data loaded from the CSV file.
-        """
-        return pd.read_csv(self.file_path)
-
-    def __str__(self):  # pragma: no cover
-        """
-        String representation of the CsvFileSource object.
-
-        Returns:
-            str: The file path of the CSV file.
-        """
-        return self.file_path
+"""
+csv_file_source.py - Module for defining the CsvFileSource class.
+
+This module contains the implementation of the CsvFileSource class, which is a specific
+implementation of the DataSource abstract class. It provides functionality to load data from
+a CSV file.
+
+Classes:
+    CsvFileSource: A class for loading data from a CSV file.
+"""
+import io
+import os
+from importlib.util import find_spec
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+import pandas as pd
+
+from src.interfaces.data_source import DataSource
+from src.configs.csv_schemas import CsvSchema
+from src.models.parse_cache import ParseCache
+
+FAST_PARSER_ENGINE = 'pyarrow' if find_spec('pyarrow') is not None else 'c'
+
+
+class CsvFileSource(DataSource):
+    """
+    CsvFileSource class for loading data from a CSV file.
+
+    This class is a specific implementation of the DataSource abstract class,
+    providing functionality to load data from a CSV file.
+
+    Attributes:
+        file_path (str): The file path of the CSV file from which data will be loaded.
+        chunk_size (Optional[int]): The number of rows per part in streaming mode. When None,
+            the whole file is loaded as a single part.
+        schema (Optional[CsvSchema]): The dtypes, categorical columns, date columns and
+            usecols of the file. When None, pandas' default type inference is used.
+        parse_cache (Optional[ParseCache]): The cache of previously parsed files. When None,
+            the file is always parsed.
+        byte_range (Optional[Sequence[int]]): The start and end byte offsets of the records
+            to load, on record boundaries. When None, the whole file is loaded.
+
+    Methods:
+        __init__(file_path: str, chunk_size: Optional[int] = None,
+        schema: Optional[CsvSchema] = None, parse_cache: Optional[ParseCache] = None,
+        byte_range: Optional[Sequence[int]] = None) -> None:
+            Constructor for the CsvFileSource class.
+
+        load() -> pd.DataFrame:
+            Method to load data from the CSV file as a pandas DataFrame.
+
+        load_chunks() -> Iterator[pd.DataFrame]:
+            Method to load data from the CSV file in parts of chunk_size rows.
+
+        file_name -> str:
+            Property returning the file name of the CSV file.
+
+        __str__() -> str:
+            Returns a string representation of the CsvFileSource object.
+    """
+
+    def __init__(
+            self, file_path: str,
+            chunk_size: Optional[int] = None,
+            schema: Optional[CsvSchema] = None,
+            parse_cache: Optional[ParseCache] = None,
+            byte_range: Optional[Sequence[int]] = None,
+    ) -> None:
+        """
+        Constructor for the CsvFileSource class.
+
+        Args:
+            file_path (str): The file path of the CSV file from which data will be loaded.
+            chunk_size (Optional[int]): The number of rows per part in streaming mode.
+            Default is None, which loads the whole file as a single part.
+            schema (Optional[CsvSchema]): The typed parsing options of the file.
+            Default is None, which uses pandas' default type inference.
+            parse_cache (Optional[ParseCache]): The cache of previously parsed files.
+            Default is None, which always parses the file. The cache is not used for byte
+            ranges.
+            byte_range (Optional[Sequence[int]]): The start and end byte offsets of the
+            records to load, as planned by ShardPlanner. The range starting at 0 includes
+            the header; the header of the file names the columns of the other ranges.
+            Default is None, which loads the whole file.
+        """
+        super().__init__()
+        self.file_path = file_path
+        self.chunk_size = chunk_size
+        self.schema = schema
+        self.parse_cache = parse_cache if byte_range is None else None
+        self.byte_range = tuple(byte_range) if byte_range is not None else None
+
+    @property
+    def file_name(self) -> str:
+        """
+        The file name of the CSV file, which identifies the source of the loaded data.
+
+        Returns:
+            str: The base name of the file path.
+        """
+        return os.path.basename(self.file_path)
+
+    def load(self) -> pd.DataFrame:
+        """
+        Load data from the CSV file as a pandas DataFrame.
+
+        Files with a schema are parsed with the pyarrow engine when it is installed. When a
+        parse cache is set, an unchanged file is read from the cache and a parsed file is
+        stored in it. The file name is stored in the 'file_name' entry of DataFrame.attrs.
+
+        Returns:
+            pd.DataFrame: A DataFrame containing the data loaded from the CSV file.
+        """
+        data_frame = self._read_data_frame()
+        data_frame.attrs['file_name'] = self.file_name
+        return data_frame
+
+    def load_chunks(self) -> Iterator[pd.DataFrame]:
+        """
+        Load data from the CSV file in parts of chunk_size rows.
+
+        Only one part is parsed and held in memory at a time, so the peak memory depends
+        on the chunk size rather than the file size. The parts are read from the memory-mapped
+        parse cache entry when one exists; streaming reads do not fill the cache. The file name
+        is stored in the 'file_name' entry of DataFrame.attrs of every part.
+
+        Yields:
+            pd.DataFrame: A DataFrame containing up to chunk_size rows of the CSV file.
+        """
+        if self.chunk_size is None:
+            yield self.load()
+            return
+
+        for part in self._read_parts():
+            part.attrs['file_name'] = self.file_name
+            yield part
+
+    def _read_data_frame(self) -> pd.DataFrame:
+        """
+        Read the whole file from the parse cache or parse it.
+        """
+        if self.parse_cache is not None:
+            cached_df = self.parse_cache.load(self.file_path, repr(self.schema))
+            if cached_df is not None:
+                return cached_df
+
+        if self.byte_range is not None:
+            with self._open_byte_range() as csv_file:
+                data_frame = pd.read_csv(csv_file, **self._read_csv_options())
+        elif self.schema is None:
+            data_frame = pd.read_csv(self.file_path)
+        else:
+            data_frame = pd.read_csv(
+                self.file_path, engine=FAST_PARSER_ENGINE, **self._read_csv_options()
+            )
+
+        if self.parse_cache is not None:
+            self.parse_cache.save(self.file_path, repr(self.schema), data_frame)
+        return data_frame
+
+    def _read_parts(self) -> Iterator[pd.DataFrame]:
+        """
+        Read the file in parts of chunk_size rows from the parse cache or parse it.
+        """
+        if self.parse_cache is not None:
+            cached_parts = self.parse_cache.load_chunks(
+                self.file_path, repr(self.schema), self.chunk_size
+            )
+            if cached_parts is not None:
+                yield from cached_parts
+                return
+
+        read_csv_options = self._read_csv_options()
+        if self.byte_range is not None:
+            with self._open_byte_range() as csv_file:
+                with pd.read_csv(
+                        csv_file, chunksize=self.chunk_size, **read_csv_options
+                ) as reader:
+                    yield from reader
+            return
+
+        with pd.read_csv(self.file_path, chunksize=self.chunk_size, **read_csv_options) as reader:
+            yield from reader
+
+    def _open_byte_range(self) -> io.BufferedReader:
+        """
+        Open the byte range of the file as a binary file, which is read lazily.
+        """
+        return io.BufferedReader(_ByteRangeFile(self.file_path, *self.byte_range))
+
+    def _read_csv_options(self) -> Dict[str, Any]:
+        """
+        Build the pd.read_csv keyword arguments of the schema and of the byte range.
+
+        The header of the file is read first so that schema columns missing from the file
+        are left out instead of failing the parse. A byte range not starting at the header
+        is parsed without a header, with the columns named by the header of the file.
+
+        Returns:
+            Dict[str, Any]: The usecols, dtype, parse_dates, header and names arguments of
+            pd.read_csv.
+        """
+        range_options = {}
+        if self.byte_range is not None and self.byte_range[0] > 0:
+            range_options = {'header': None, 'names': self._header_columns()}
+        if self.schema is None:
+            return range_options
+
+        columns = self._header_columns()
+        if self.schema.usecols is not None:
+            columns = [column for column in columns if column in self.schema.usecols]
+
+        dtypes = {
+            column: dtype
+            for column, dtype in self.schema.dtypes.items()
+            if column in columns
+        }
+        dtypes.update({
+            column: 'category'
+            for column in self.schema.categorical_columns
+            if column in columns
+        })
+        date_columns = [column for column in self.schema.date_columns if column in columns]
+
+        read_csv_options = {'usecols': list(columns), 'dtype': dtypes, **range_options}
+        if date_columns:
+            read_csv_options['parse_dates'] = date_columns
+        return read_csv_options
+
+    def _header_columns(self) -> List[str]:
+        """
+        The column names in the header of the file.
+        """
+        return list(pd.read_csv(self.file_path, nrows=0).columns)
+
+    def __str__(self):  # pragma: no cover
+        """
+        String representation of the CsvFileSource object.
+
+        Returns:
+            str: The file path of the CSV file.
+        """
+        return self.file_path
+
+
+class _ByteRangeFile(io.RawIOBase):
+    """
+    A raw binary file reading the bytes of a range of another file.
+    """
+
+    def __init__(self, file_path: str, start: int, end: int) -> None:
+        super().__init__()
+        self._file = open(file_path, 'rb')  # pylint: disable=consider-using-with
+        self._file.seek(start)
+        self._remaining = end - start
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        size = min(len(buffer), self._remaining)
+        if size <= 0:
+            return 0
+        read_size = self._file.readinto(memoryview(buffer)[:size])
+        self._remaining -= read_size
+        return read_size
+
+    def close(self) -> None:
+        self._file.close()
+        super().close()
@@ -1,60 +1,184 @@
-"""
-data_frame_row_dict_transformer.py - Module for defining the DataFrameRowDictTransformer class.
-
-This module contains the implementation of the DataFrameRowDictTransformer class, which is a
-specific implementation of the Transformer abstract class. It provides functionality to transform
-a DataFrame into a list of dictionaries, where each dictionary represents a row in the DataFrame.
-
-Classes:
-    DataFrameRowDictTransformer: Class for transforming a DataFrame into a list of dictionaries.
-"""
-from typing import Dict, List
-import pandas as pd
-
-from src.interfaces.transformer import Transformer
-
-
-class DataFrameRowDictTransformer(Transformer):
-    """
-    Class for transforming a DataFrame into a list of dictionaries.
-
-    This class is a specific implementation of the Transformer abstract class, providing
-    functionality to transform a DataFrame into a list of dictionaries. Each dictionary in
-    the list represents a row in the DataFrame.
-
-    Attributes:
-        input_data (pd.DataFrame): The input DataFrame to be transformed.
-
-    Methods:
-        transform() -> List[Dict]:
-            Transform the input DataFrame into a list of dictionaries.
-    """
-
-    def __init__(self, input_df: pd.DataFrame) -> None:
-        """
-        Constructor for the DataFrameRowDictTransformer class.
-
-        Args:
-            input_df (pd.DataFrame): The input DataFrame to be transformed.
-        """
-        super().__init__(input_data=input_df)
-
-    def transform(self) -> List[Dict]:
-        """
-        Transform the input DataFrame into a list of dictionaries.
-
-        Returns:
-            List[Dict]: A list of dictionaries, where each dictionary represents a row in
-            the input DataFrame.
-        """
-        output_dicts = self.input_data.to_dict(orient='records')
-        return output_dicts
-
-    def __str__(self) -> str:  # pragma: no cover
-        """
-        String representation of the DataFrameRowDictTransformer object.
-
-        Returns:
-            str: The string representation of the DataFrameRowDictTransformer object.
-        """
-        return str(self.input_data)
+"""
+data_frame_row_dict_transformer.py - Module for defining the DataFrameRowDictTransformer class.
+
+This module contains the implementation of the DataFrameRowDictTransformer class, which is a
+specific implementation of the Transformer abstract class. It provides functionality to transform
+a DataFrame into a list of dictionaries, where each dictionary represents a row in the DataFrame.
+
+Classes:
+    DataFrameRowDictTransformer: Class for transforming a DataFrame into a list of dictionaries.
+"""
+from itertools import chain
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+import numpy as np
+import pandas as pd
+
+from src.interfaces.transformer import Transformer
+
+_MAX_EXACT_INTEGER = 2 ** 53  # larger floats are not all integers representable exactly
+
+
+class DataFrameRowDictTransformer(Transformer):
+    """
+    Class for transforming a DataFrame into a list of dictionaries.
+
+    This class is a specific implementation of the Transformer abstract class, providing
+    functionality to transform a DataFrame into a list of dictionaries. Each dictionary in
+    the list represents a row in the DataFrame.
+
+    Attributes:
+        input_data (pd.DataFrame): The input DataFrame to be transformed.
+        batch_size (Optional[int]): The number of rows converted at a time in streaming mode.
+            When None, the whole DataFrame is converted at once.
+        compact (bool): Whether the documents are encoded compactly: missing values are left
+            out and the integer columns become integers.
+        field_aliases (Dict[str, str]): Short field names replacing column names.
+        integer_columns (Tuple[str, ...]): Columns holding only whole numbers.
+
+    Methods:
+        transform() -> Union[List[Dict], Iterable[Dict]]:
+            Transform the input DataFrame into dictionaries.
+        transform_batches() -> Iterator[List[Dict]]:
+            Lazily transform the input DataFrame into batches of dictionaries.
+    """
+
+    def __init__(
+            self, input_df: pd.DataFrame, batch_size: Optional[int] = None,
+            compact: bool = False, field_aliases: Optional[Dict[str, str]] = None,
+            integer_columns: Iterable[str] = (),
+    ) -> None:
+        """
+        Constructor for the DataFrameRowDictTransformer class.
+
+        Args:
+            input_df (pd.DataFrame): The input DataFrame to be transformed.
+            batch_size (Optional[int]): The number of rows converted at a time in streaming
+            mode. Default is None, which converts the whole DataFrame into a list at once.
+            compact (bool, optional): Whether to encode the documents compactly. Missing
+            values are left out and the integer columns are converted to integers, which
+            BSON stores as int32 when they fit. Default is False.
+            field_aliases (Optional[Dict[str, str]]): Short field names replacing the column
+            names in the documents. Default is None, which keeps the column names.
+            integer_columns (Iterable[str], optional): Columns holding only whole numbers,
+            usually the integer columns of the CSV schema of the file. Their type is declared
+            instead of inferred from the values, so every batch and every part of a file
+            stores a column with the same BSON type. Default is (), no integer columns.
+        """
+        super().__init__(input_data=input_df)
+        self.batch_size = batch_size
+        self.compact = compact
+        self.field_aliases = field_aliases or {}
+        self.integer_columns: Tuple[str, ...] = tuple(integer_columns)
+
+    def transform(self) -> Union[List[Dict], Iterable[Dict]]:
+        """
+        Transform the input DataFrame into dictionaries.
+
+        In streaming mode, and in compact mode or with field aliases, the dictionaries are
+        produced lazily by 'transform_batches()'. Otherwise a list is built with
+        DataFrame.to_dict. Missing values of datetime columns are converted to None, since
+        NaT can not be encoded to BSON.
+
+        Returns:
+            Union[List[Dict], Iterable[Dict]]: The dictionaries, where each dictionary represents
+            a row in the input DataFrame.
+        """
+        if self.batch_size is not None or self.compact or self.field_aliases:
+            return chain.from_iterable(self.transform_batches())
+
+        input_df = self.input_data
+        datetime_columns = input_df.select_dtypes(include=['datetime', 'datetimetz']).columns
+        if len(datetime_columns) > 0:
+            input_df = input_df.copy(deep=False)
+            for column in datetime_columns:
+                input_df[column] = input_df[column].astype(object).where(
+                    input_df[column].notna(), None
+                )
+
+        output_dicts = input_df.to_dict(orient='records')
+        return output_dicts
+
+    def transform_batches(self) -> Iterator[List[Dict]]:
+        """
+        Lazily transform the input DataFrame into batches of dictionaries.
+
+        Each batch converts a slice of batch_size rows column by column into native Python
+        values, so no numpy scalars are boxed per row and only one batch of dictionaries is
+        alive at a time. Missing values are left out of the dictionaries instead of being
+        stored as NaN. Columns are renamed by the field aliases and, in compact mode, the
+        integer columns are encoded as integers.
+
+        Yields:
+            List[Dict]: The dictionaries of up to batch_size consecutive rows.
+        """
+        batch_size = self.batch_size or len(self.input_data) or 1
+        column_names = [
+            self.field_aliases.get(str(column), str(column)) for column in self.input_data.columns
+        ]
+        for start in range(0, len(self.input_data), batch_size):
+            batch_df = self.input_data.iloc[start:start + batch_size]
+
+            column_values = []
+            missing_masks = []
+            for column_name, (column, series) in zip(column_names, batch_df.items()):
+                if self.compact and str(column) in self.integer_columns:
+                    series = self._integer_series(str(column), series)
+                column_values.append(self._native_values(series))
+                missing_mask = series.isna().to_numpy()
+                if missing_mask.any():
+                    missing_masks.append((column_name, missing_mask))
+
+            output_dicts = [dict(zip(column_names, row)) for row in zip(*column_values)]
+            for column_name, missing_mask in missing_masks:
+                for row_ix in np.flatnonzero(missing_mask):
+                    del output_dicts[row_ix][column_name]
+            yield output_dicts
+
+    @staticmethod
+    def _integer_series(column: str, series: pd.Series) -> pd.Series:
+        """
+        Convert a column holding only whole numbers into nullable integers.
+
+        Args:
+            column (str): The name of the column.
+            series (pd.Series): The column to convert.
+
+        Returns:
+            pd.Series: The converted column.
+
+        Raises:
+            ValueError: The column holds a value that is not a whole number, or one too
+            large to be represented exactly as a float.
+        """
+        values = series.dropna()
+        if (
+                not pd.api.types.is_numeric_dtype(series)
+                or not (values % 1 == 0).all()
+                or (values.abs() > _MAX_EXACT_INTEGER).any()
+        ):
+            raise ValueError(f"The integer column '{column}' holds values that are not integers.")
+        return series.astype('Int64')
+
+    @staticmethod
+    def _native_values(series: pd.Series) -> list:
+        """
+        Convert a column into a list of native Python values.
+
+        Args:
+            series (pd.Series): The column to convert.
+
+        Returns:
+            list: The values of the column as Python objects.
+        """
+        if pd.api.types.is_datetime64_any_dtype(series):
+            return list(series.dt.to_pydatetime())
+        return series.tolist()
+
+    def __str__(self) -> str:  # pragma: no cover
+        """
+        String representation of the DataFrameRowDictTransformer object.
+
+        Returns:
+            str: The string representation of the DataFrameRowDictTransformer object.
+        """
+        return str(self.input_data)
@@ -0,0 +1,132 @@
+"""
+mongo_client_registry.py - Module for defining the MongoClientRegistry class.
+
+This module contains the implementation of the MongoClientRegistry class, which shares one
+MongoClient per connection settings within a process, and the process-wide client_registry.
+A MongoClient is thread-safe and keeps its own connection pool, so tasks and tools that
+connect with the same settings reuse warm, authenticated connections instead of opening
+new ones.
+
+Classes:
+    MongoClientRegistry: A registry of shared MongoClients and of checked indexes.
+"""
+import os
+import threading
+from typing import Any, Dict, Hashable, Set, Tuple
+from pymongo import MongoClient
+
+
+class MongoClientRegistry:
+    """
+    MongoClientRegistry class for sharing MongoClients within a process.
+
+    Clients are keyed by all their settings, including the credentials, so callers
+    connecting differently never share a client. MongoClients are not fork-safe, so a
+    registry used in a forked child drops the clients of its parent without closing them.
+
+    The registry also remembers which collections had their indexes checked through a
+    client, so index checks are not repeated for every storage created in the process.
+
+    Methods:
+        get_client(**client_options) -> MongoClient:
+            The shared client of the given settings.
+        indexes_checked(key: Hashable) -> bool:
+            Whether the indexes identified by the key were checked.
+        mark_indexes_checked(key: Hashable) -> None:
+            Remember that the indexes identified by the key were checked.
+        forget_indexes(key: Hashable) -> None:
+            Forget the index check of the key, after the indexes were changed.
+        clear() -> None:
+            Close and forget every client and index check.
+    """
+
+    def __init__(self) -> None:
+        """
+        Constructor for the MongoClientRegistry class.
+        """
+        self._clients: Dict[Tuple, MongoClient] = {}
+        self._checked_indexes: Set[Hashable] = set()
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def get_client(self, **client_options: Any) -> MongoClient:
+        """
+        The shared client of the given settings, created on first use.
+
+        Args:
+            **client_options (Any): The MongoClient keyword arguments, such as host, port,
+            username, password and maxPoolSize. Options set to None are left out, so the
+            pymongo defaults apply to them.
+
+        Returns:
+            MongoClient: The client shared by every caller with the same settings.
+        """
+        client_options = {
+            option: value for option, value in client_options.items() if value is not None
+        }
+        key = tuple(sorted((option, str(value)) for option, value in client_options.items()))
+        with self._lock:
+            self._reset_after_fork()
+            client = self._clients.get(key)
+            if client is None:
+                client = self._clients[key] = MongoClient(**client_options)
+            return client
+
+    def indexes_checked(self, key: Hashable) -> bool:
+        """
+        Whether the indexes identified by the key were checked.
+
+        Args:
+            key (Hashable): The identity of the indexes, such as the client, the collection
+            and the index names.
+
+        Returns:
+            bool: True once mark_indexes_checked was called with the key.
+        """
+        with self._lock:
+            self._reset_after_fork()
+            return key in self._checked_indexes
+
+    def mark_indexes_checked(self, key: Hashable) -> None:
+        """
+        Remember that the indexes identified by the key were checked.
+
+        Args:
+            key (Hashable): The identity of the indexes.
+        """
+        with self._lock:
+            self._checked_indexes.add(key)
+
+    def forget_indexes(self, key: Hashable) -> None:
+        """
+        Forget the index check of the key, so the indexes are checked again.
+
+        Args:
+            key (Hashable): The identity of the indexes.
+        """
+        with self._lock:
+            self._checked_indexes.discard(key)
+
+    def clear(self) -> None:
+        """
+        Close and forget every client and index check.
+        """
+        with self._lock:
+            clients = list(self._clients.values()) if self._pid == os.getpid() else []
+            self._clients.clear()
+            self._checked_indexes.clear()
+            self._pid = os.getpid()
+        for client in clients:
+            client.close()
+
+    def _reset_after_fork(self) -> None:
+        """
+        Forget the clients inherited from a parent process. Must hold the lock.
+        """
+        if self._pid != os.getpid():
+            self._clients.clear()
+            self._checked_indexes.clear()
+            self._pid = os.getpid()
+
+
+client_registry = MongoClientRegistry()
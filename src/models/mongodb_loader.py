@@ -1,156 +1,595 @@
-"""
-Module for defining the MongoDBStorage and MongoDBLoader classes.
-
-This module contains the implementation of the MongoDBStorage class, which is a specific
-implementation of the Storage abstract class. It provides functionality to store data in a
-MongoDB collection. Additionally, it includes the MongoDBLoader class, which is a specific
-implementation of the Loader abstract class, providing functionality to load data into a
-MongoDB collection in chunks.
-
-Classes:
-    MongoDBStorage: Class for handling data storage in MongoDB.
-    MongoDBLoader: Class for loading data into MongoDB.
-"""
-
-from typing import List, Dict
-from pymongo import MongoClient
-
-from src.interfaces.loader import Loader
-from src.interfaces.storage import Storage
-from src.configs.mongodb import MongoDBConfigs
-
-
-class MongoDBStorage(Storage):
-    """
-    MongoDBStorage class for handling data storage in MongoDB.
-
-    This class is a specific implementation of the Storage abstract class,
-    providing functionality to store data in a MongoDB collection.
-
-    Attributes:
-        client (MongoClient): A MongoClient instance representing the MongoDB client.
-        name (str): The name of the MongoDB database.
-
-    Methods:
-        __init__() -> None:
-            Constructor for the MongoDBStorage class.
-        initialize_database() -> None:
-            Initialize the MongoDB database and collection.
-        save(input_data: List[Dict]) -> None:
-            Save the input data in the MongoDB collection.
-        __str__() -> str:
-            Returns a string representation of the MongoDBStorage object.
-    """
-
-    def __init__(self) -> None:
-        """
-        Constructor for the MongoDBStorage class.
-
-        Initializes the MongoDB client and database.
-        """
-        super().__init__()
-        self.client = MongoClient(
-            host=MongoDBConfigs.HOST,
-            port=MongoDBConfigs.PORT,
-            username=MongoDBConfigs.USERNAME,
-            password=MongoDBConfigs.PASSWORD,
-        )
-        self.name = MongoDBConfigs.MONGO_DATABASE
-        self.initialize_database()
-
-    def initialize_database(self):
-        """
-        Initialize the MongoDB database and collection.
-
-        If the specified text index does not exist, it creates the text index
-        for the source_description column.
-        """
-        self.database = self.client[MongoDBConfigs.MONGO_DATABASE]
-        self.collection = self.database[MongoDBConfigs.INVESTMENT_COLLECTION]
-
-        index_info = self.collection.index_information()
-        index_name = f'{MongoDBConfigs.SEARCH_QUERY_COLUMN}_text'
-        if index_name not in index_info:
-            self.collection.create_index(
-                [(MongoDBConfigs.SEARCH_QUERY_COLUMN, 'text')],
-                name=index_name
-            )
-
-    def save(self, input_data: List[Dict]) -> None:
-        """
-        Save the input data in the MongoDB collection.
-
-        Args:
-            input_data (List[Dict]): A list of dictionaries representing the data to be stored.
-        """
-        self.collection.insert_many(input_data)
-
-    def __str__(self):  # pragma: no cover
-        """
-        String representation of the MongoDBStorage object.
-
-        Returns:
-            str: The string representation of the MongoDBStorage object.
-        """
-        return str(self.name)
-
-
-class MongoDBLoader(Loader):
-    """
-    MongoDBLoader class for loading data into MongoDB.
-
-    This class is a specific implementation of the Loader abstract class,
-    providing functionality to load data into a MongoDB collection.
-
-    Attributes:
-        storage (MongoDBStorage): An instance of MongoDBStorage representing the MongoDB collection
-            where data will be loaded.
-        chunk_size (int): The number of documents to insert in a single batch.
-
-    Methods:
-        __init__(mongo_storage: MongoDBStorage,
-        chunk_size: int = MongoDBConfigs.DEFAULT_CHUNK_SIZE) -> None:
-            Constructor for the MongoDBLoader class.
-        load(input_data: List[Dict]) -> None:
-            Load the input data into the MongoDB collection in chunks.
-        __str__() -> str:
-            Returns a string representation of the MongoDBLoader object.
-    """
-
-    def __init__(
-            self, mongo_storage: MongoDBStorage,
-            chunk_size: int = MongoDBConfigs.DEFAULT_CHUNK_SIZE
-    ):
-        """
-        Constructor for the MongoDBLoader class.
-
-        Args:
-            mongo_storage (MongoDBStorage): An instance of MongoDBStorage representing the
-            MongoDB collection where data will be loaded.
-            chunk_size (int, optional): The number of documents to insert in a single batch.
-            Default is MongoDBConfigs.DEFAULT_CHUNK_SIZE.
-        """
-        super().__init__(storage=mongo_storage)
-        self.chunk_size = chunk_size
-
-    def load(self, input_data: List[Dict]):
-        """
-        Load the input data into the MongoDB collection in chunks.
-
-        Args:
-            input_data (List[Dict]): A list of dictionaries representing the data to be loaded.
-        """
-        total_size = len(input_data)
-        for data_ix in range(0, total_size, self.chunk_size):
-            start, end = data_ix, data_ix + self.chunk_size
-            data_chunk = input_data[start:end]
-            self.storage.save(data_chunk)
-
-    def __str__(self):  # pragma: no cover
-        """
-        String representation of the MongoDBLoader object.
-
-        Returns:
-            str: The string representation of the MongoDBLoader object.
-        """
-        return str(self.storage)
+"""
+Module for defining the MongoDBStorage and MongoDBLoader classes.
+
+This module contains the implementation of the MongoDBStorage class, which is a specific
+implementation of the Storage abstract class. It provides functionality to store data in a
+MongoDB collection. Additionally, it includes the MongoDBLoader class, which is a specific
+implementation of the Loader abstract class, providing functionality to load data into a
+MongoDB collection in chunks.
+
+Classes:
+    MongoDBStorage: Class for handling data storage in MongoDB.
+    MongoDBLoader: Class for loading data into MongoDB.
+"""
+
+import hashlib
+import json
+import math
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from itertools import islice
+from typing import Any, List, Dict, Iterable, Optional, Sequence, Tuple, Union
+from loguru import logger
+from pymongo import IndexModel, ReplaceOne
+from pymongo.write_concern import WriteConcern
+
+from src.interfaces.loader import Loader
+from src.interfaces.storage import Storage
+from src.models.mongo_client_registry import client_registry
+from src.configs.mongodb import MongoDBConfigs
+
+WRITE_MODES = ('insert', 'upsert')
+HASH_EXCLUDED_FIELDS = (
+    '_id', MongoDBConfigs.CONTENT_HASH_FIELD, MongoDBConfigs.LOADED_AT_FIELD,
+)
+
+
+class MongoDBStorage(Storage):  # pylint: disable=too-many-instance-attributes
+    """
+    MongoDBStorage class for handling data storage in MongoDB.
+
+    This class is a specific implementation of the Storage abstract class,
+    providing functionality to store data in a MongoDB collection.
+
+    Attributes:
+        client (MongoClient): The MongoClient of the process-wide client registry.
+        name (str): The name of the MongoDB database.
+        ordered (bool): Whether documents are inserted in order, stopping at the first error.
+        write_concern_w (Optional[Union[int, str]]): The write concern of the inserts.
+        write_mode (str): 'insert' appends every document, 'upsert' only writes new or
+            changed documents.
+        natural_key (Sequence[str]): The fields that identify a document in upsert mode.
+        key_prefix (str): The prefix of the document ids in upsert mode, such as the source name.
+        collection_name (str): The name of the MongoDB collection the data is stored in.
+        text_index (bool): Whether the collection has a text index on the search column.
+        secondary_indexes (Sequence[str]): The fields with an ascending secondary index.
+        defer_indexes (bool): Whether the indexes are built once after the load instead of
+            being maintained by every insert.
+        index_build_seconds (Optional[float]): The duration of the last deferred index build.
+        field_aliases (Dict[str, str]): The short field names of the stored documents.
+        sparse_indexes (bool): Whether the secondary indexes leave out the documents missing
+            their field.
+
+    Methods:
+        __init__(ordered: bool = True,
+        write_concern_w: Optional[Union[int, str]] = MongoDBConfigs.WRITE_CONCERN_W,
+        write_mode: str = MongoDBConfigs.WRITE_MODE, natural_key: Sequence[str] = (),
+        key_prefix: str = '', collection_name: str = MongoDBConfigs.INVESTMENT_COLLECTION,
+        text_index: bool = True, secondary_indexes: Sequence[str] = (),
+        defer_indexes: bool = False,
+        field_aliases: Optional[Dict[str, str]] = None, sparse_indexes: bool = False) -> None:
+            Constructor for the MongoDBStorage class.
+        initialize_database() -> None:
+            Initialize the MongoDB database and collection.
+        save_field_aliases() -> None:
+            Record the field aliases of the collection in the meta collection.
+        save(input_data: List[Dict]) -> None:
+            Save the input data in the MongoDB collection.
+        finalize() -> None:
+            Build the deferred indexes after all the data of a load is saved.
+        bump_load_generation() -> None:
+            Increment the load generation counter that invalidates cached search results.
+        __str__() -> str:
+            Returns a string representation of the MongoDBStorage object.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments,too-many-positional-arguments
+            self, ordered: bool = True,
+            write_concern_w: Optional[Union[int, str]] = MongoDBConfigs.WRITE_CONCERN_W,
+            write_mode: str = MongoDBConfigs.WRITE_MODE,
+            natural_key: Sequence[str] = (),
+            key_prefix: str = '',
+            collection_name: str = MongoDBConfigs.INVESTMENT_COLLECTION,
+            text_index: bool = True,
+            secondary_indexes: Sequence[str] = (),
+            defer_indexes: bool = False,
+            field_aliases: Optional[Dict[str, str]] = None,
+            sparse_indexes: bool = False,
+    ) -> None:
+        """
+        Constructor for the MongoDBStorage class.
+
+        Initializes the MongoDB database with the client of the process-wide registry, so
+        storages created in the same worker process share its pooled connections.
+
+        Args:
+            ordered (bool, optional): Whether documents are inserted in order. Unordered inserts
+            let the server apply a batch in parallel. Default is True.
+            write_concern_w (Optional[Union[int, str]]): The 'w' option of the write concern,
+            such as 1 or 'majority'. Default is MongoDBConfigs.WRITE_CONCERN_W, None uses the
+            server default.
+            write_mode (str, optional): 'insert' appends every document with insert_many,
+            'upsert' replaces documents by id and skips unchanged ones.
+            Default is MongoDBConfigs.WRITE_MODE.
+            natural_key (Sequence[str], optional): The fields that identify a document in
+            upsert mode. Default is (), which identifies documents by their content hash.
+            key_prefix (str, optional): The prefix of the document ids in upsert mode, so that
+            sources sharing a collection do not collide. Default is ''.
+            collection_name (str, optional): The name of the collection the data is stored in.
+            Default is MongoDBConfigs.INVESTMENT_COLLECTION.
+            text_index (bool, optional): Whether to create the text index on the search column.
+            Default is True.
+            secondary_indexes (Sequence[str], optional): The fields to create an ascending
+            index on. Default is ().
+            defer_indexes (bool, optional): Whether to drop the indexes before the load and
+            build them once in 'finalize', so inserts do not maintain them. Searches can not
+            use the indexes until the load is finalized, so no other storage may load into
+            the collection meanwhile. Default is False.
+            field_aliases (Optional[Dict[str, str]]): The short field names the transformer
+            gives the columns. The natural key and the secondary indexes are given by column
+            name and translated. Default is None, which stores the column names.
+            sparse_indexes (bool, optional): Whether the secondary indexes are sparse, which
+            keeps documents without the field, such as compact documents with a missing
+            value, out of the index. Default is False.
+
+        Raises:
+            ValueError: The write mode is not one of WRITE_MODES.
+        """
+        if write_mode not in WRITE_MODES:
+            raise ValueError(
+                f'Unknown write mode {write_mode!r}, expected one of {", ".join(WRITE_MODES)}.'
+            )
+        super().__init__()
+        self.ordered = ordered
+        self.write_concern_w = write_concern_w
+        self.write_mode = write_mode
+        self.field_aliases = dict(field_aliases or {})
+        self.natural_key = tuple(self.field_aliases.get(field, field) for field in natural_key)
+        self.key_prefix = key_prefix
+        self.collection_name = collection_name
+        self.text_index = text_index
+        self.secondary_indexes = tuple(
+            self.field_aliases.get(field, field) for field in secondary_indexes
+        )
+        self.defer_indexes = defer_indexes
+        self.sparse_indexes = sparse_indexes
+        self.index_build_seconds = None
+        self.client = client_registry.get_client(
+            host=MongoDBConfigs.HOST,
+            port=MongoDBConfigs.PORT,
+            username=MongoDBConfigs.USERNAME,
+            password=MongoDBConfigs.PASSWORD,
+            maxPoolSize=MongoDBConfigs.MAX_POOL_SIZE,
+            minPoolSize=MongoDBConfigs.MIN_POOL_SIZE,
+            connectTimeoutMS=MongoDBConfigs.CONNECT_TIMEOUT_MS,
+            serverSelectionTimeoutMS=MongoDBConfigs.SERVER_SELECTION_TIMEOUT_MS,
+            socketTimeoutMS=MongoDBConfigs.SOCKET_TIMEOUT_MS,
+            compressors=MongoDBConfigs.COMPRESSORS,
+        )
+        self.name = MongoDBConfigs.MONGO_DATABASE
+        self.initialize_database()
+
+    def initialize_database(self):
+        """
+        Initialize the MongoDB database and collection.
+
+        If the specified text index does not exist, it creates the text index
+        for the source_description column. The missing secondary indexes are created too.
+        When the indexes are deferred, the existing ones are dropped instead so that the
+        load does not pay for maintaining them.
+
+        Once the indexes of the collection are known to exist, later storages of the same
+        client and collection in the process skip the index_information round trip.
+        The field aliases of the collection are recorded for the search tool.
+        """
+        self.database = self.client[MongoDBConfigs.MONGO_DATABASE]
+        self.collection = self.database[self.collection_name]
+        if self.write_concern_w is not None:
+            write_concern_w = self.write_concern_w
+            if isinstance(write_concern_w, str) and write_concern_w.isdigit():
+                write_concern_w = int(write_concern_w)
+            self.collection = self.collection.with_options(
+                write_concern=WriteConcern(w=write_concern_w)
+            )
+
+        if self.field_aliases:
+            self.save_field_aliases()
+        if not self.defer_indexes and client_registry.indexes_checked(self._index_key()):
+            return
+
+        index_info = self.collection.index_information()
+        for index_name, index_keys, index_options in self._index_profile():
+            if self.defer_indexes:
+                if index_name in index_info:
+                    self.collection.drop_index(index_name)
+            elif index_name not in index_info:
+                self.collection.create_index(index_keys, name=index_name, **index_options)
+
+        if self.defer_indexes:
+            client_registry.forget_indexes(self._index_key())
+        else:
+            client_registry.mark_indexes_checked(self._index_key())
+
+    def finalize(self) -> None:
+        """
+        Build the deferred indexes after all the data of a load is saved.
+
+        All the indexes of the collection are built with a single createIndexes command and
+        the duration of the build is logged and kept in index_build_seconds.
+        """
+        if not self.defer_indexes:
+            return
+
+        index_models = [
+            IndexModel(index_keys, name=index_name, **index_options)
+            for index_name, index_keys, index_options in self._index_profile()
+        ]
+        if not index_models:
+            return
+
+        start_time = time.perf_counter()
+        self.collection.create_indexes(index_models)
+        self.index_build_seconds = time.perf_counter() - start_time
+        client_registry.mark_indexes_checked(self._index_key())
+        logger.info(
+            f'Built {len(index_models)} indexes of {self} in {self.index_build_seconds:.2f}s.'
+        )
+
+    def bump_load_generation(self) -> None:
+        """
+        Increment the load generation counter in the meta collection.
+
+        The search tool caches results per load generation, so bumping the counter after a
+        successful load stops stale results from being served.
+        """
+        self.database[MongoDBConfigs.META_COLLECTION].update_one(
+            {'_id': MongoDBConfigs.LOAD_GENERATION_ID},
+            {'$inc': {'value': 1}},
+            upsert=True,
+        )
+
+    def save_field_aliases(self) -> None:
+        """
+        Record the field aliases of the collection in the meta collection.
+
+        The search tool reads them to translate the requested fields to the stored names
+        and the stored names of its results back. Aliases are only added, so collections
+        shared by several source files collect the aliases of all of them.
+        """
+        self.database[MongoDBConfigs.META_COLLECTION].update_one(
+            {'_id': f'{MongoDBConfigs.FIELD_ALIASES_ID}:{self.collection_name}'},
+            {'$set': {
+                f'aliases.{field}': alias for field, alias in self.field_aliases.items()
+            }},
+            upsert=True,
+        )
+
+    def _index_key(self) -> Tuple:
+        """
+        The identity of the indexes of the collection in the client registry.
+        """
+        return (
+            id(self.client), self.name, self.collection_name,
+            tuple(index_name for index_name, _, _ in self._index_profile()),
+        )
+
+    def _index_profile(self) -> List[Tuple[str, List[Tuple[str, Any]], Dict[str, Any]]]:
+        """
+        The names, keys and options of the text and secondary indexes of the collection.
+        """
+        index_profile = []
+        if self.text_index:
+            index_profile.append((
+                f'{MongoDBConfigs.SEARCH_QUERY_COLUMN}_text',
+                [(MongoDBConfigs.SEARCH_QUERY_COLUMN, 'text')],
+                {},
+            ))
+        secondary_options = {'sparse': True} if self.sparse_indexes else {}
+        index_profile.extend(
+            (f'{field}_1', [(field, 1)], secondary_options)
+            for field in self.secondary_indexes
+        )
+        return index_profile
+
+    def save(self, input_data: List[Dict]) -> None:
+        """
+        Save the input data in the MongoDB collection.
+
+        Every written document is stamped with the time of the write in
+        MongoDBConfigs.LOADED_AT_FIELD, so the search index can pick up the documents
+        written since its last update. Pre-encoded documents carry their own stamp.
+
+        Args:
+            input_data (List[Dict]): A list of dictionaries representing the data to be stored.
+        """
+        if self.write_mode == 'upsert':
+            self.upsert(input_data)
+            return
+
+        self._stamp(input_data)
+        self.collection.insert_many(input_data, ordered=self.ordered)
+
+    def upsert(self, input_data: List[Dict]) -> None:
+        """
+        Write the new and changed documents of the input data in a single bulk_write.
+
+        Each document gets a stable '_id' from the key prefix and its natural key, and a
+        content hash of its fields. The stored hashes of the batch are fetched with one query
+        and documents whose hash is unchanged are skipped, so repeated loads of the same data
+        only write the delta.
+
+        Args:
+            input_data (List[Dict]): A list of dictionaries representing the data to be stored.
+        """
+        for document in input_data:
+            content_hash = self.content_hash(document)
+            document['_id'] = self.document_id(document, content_hash)
+            document[MongoDBConfigs.CONTENT_HASH_FIELD] = content_hash
+
+        stored_hashes = {
+            stored['_id']: stored.get(MongoDBConfigs.CONTENT_HASH_FIELD)
+            for stored in self.collection.find(
+                {'_id': {'$in': [document['_id'] for document in input_data]}},
+                {MongoDBConfigs.CONTENT_HASH_FIELD: 1},
+            )
+        }
+        self._stamp(input_data)
+        requests = [
+            ReplaceOne({'_id': document['_id']}, document, upsert=True)
+            for document in input_data
+            if stored_hashes.get(document['_id']) != document[MongoDBConfigs.CONTENT_HASH_FIELD]
+        ]
+        if requests:
+            self.collection.bulk_write(requests, ordered=self.ordered)
+        logger.info(
+            f'Upserted {len(requests)} of {len(input_data)} documents, '
+            f'{len(input_data) - len(requests)} were unchanged.'
+        )
+
+    def document_id(self, document: Dict, content_hash: str) -> str:
+        """
+        Build the stable id of a document from the key prefix and its natural key.
+
+        Documents with a missing natural key value are identified by their content hash.
+
+        Args:
+            document (Dict): The document to identify.
+            content_hash (str): The content hash of the document.
+
+        Returns:
+            str: The id of the document.
+        """
+        key_values = [self._key_value(document.get(field)) for field in self.natural_key]
+        if not key_values or any(value is None for value in key_values):
+            key_values = [content_hash]
+        return ':'.join([self.key_prefix, *key_values])
+
+    @staticmethod
+    def content_hash(document: Dict) -> str:
+        """
+        Compute a stable hash of the fields of a document.
+
+        Missing values are left out, so NaN fields and absent fields hash the same, and
+        integral floats hash like integers.
+
+        Args:
+            document (Dict): The document to hash.
+
+        Returns:
+            str: The hex digest of the document's fields.
+        """
+        fields = {}
+        for field, value in document.items():
+            if field in HASH_EXCLUDED_FIELDS or value is None:
+                continue
+            if isinstance(value, float):
+                if math.isnan(value):
+                    continue
+                if value.is_integer():
+                    value = int(value)
+            fields[field] = value
+        encoded_fields = json.dumps(fields, sort_keys=True, default=str).encode()
+        return hashlib.blake2b(encoded_fields, digest_size=16).hexdigest()
+
+    @staticmethod
+    def _stamp(input_data: List[Dict]) -> None:
+        """
+        Stamp the documents with the time of their write, leaving pre-encoded ones as they are.
+        """
+        loaded_at = datetime.now(timezone.utc)
+        for document in input_data:
+            if isinstance(document, dict):
+                document[MongoDBConfigs.LOADED_AT_FIELD] = loaded_at
+
+    @staticmethod
+    def _key_value(value: Any) -> Optional[str]:
+        """
+        Format a natural key value so that 12, 12.0 and '12' give the same id.
+        """
+        if value is None or (isinstance(value, float) and math.isnan(value)):
+            return None
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+        return str(value)
+
+    def __str__(self):  # pragma: no cover
+        """
+        String representation of the MongoDBStorage object.
+
+        Returns:
+            str: The string representation of the MongoDBStorage object.
+        """
+        return f'{self.name}.{self.collection_name}'
+
+
+class MongoDBLoader(Loader):  # pylint: disable=too-many-instance-attributes
+    """
+    MongoDBLoader class for loading data into MongoDB.
+
+    This class is a specific implementation of the Loader abstract class,
+    providing functionality to load data into a MongoDB collection.
+
+    Attributes:
+        storage (MongoDBStorage): An instance of MongoDBStorage representing the MongoDB collection
+            where data will be loaded.
+        chunk_size (int): The number of documents to insert in a single batch.
+        writer_threads (int): The number of background writer threads. 0 writes synchronously.
+        queue_size (int): The maximum number of chunks waiting for a writer thread.
+
+    Methods:
+        __init__(mongo_storage: MongoDBStorage,
+        chunk_size: int = MongoDBConfigs.DEFAULT_CHUNK_SIZE,
+        writer_threads: int = 0, queue_size: Optional[int] = None) -> None:
+            Constructor for the MongoDBLoader class.
+        load(input_data: Iterable[Dict]) -> None:
+            Load the input data into the MongoDB collection in chunks.
+        close() -> None:
+            Wait for the chunks in flight, finalize the storage and raise the first write error.
+            A successful load bumps the load generation of the storage.
+        __str__() -> str:
+            Returns a string representation of the MongoDBLoader object.
+    """
+
+    def __init__(
+            self, mongo_storage: MongoDBStorage,
+            chunk_size: int = MongoDBConfigs.DEFAULT_CHUNK_SIZE,
+            writer_threads: int = 0,
+            queue_size: Optional[int] = None,
+    ):
+        """
+        Constructor for the MongoDBLoader class.
+
+        Args:
+            mongo_storage (MongoDBStorage): An instance of MongoDBStorage representing the
+            MongoDB collection where data will be loaded.
+            chunk_size (int, optional): The number of documents to insert in a single batch.
+            Default is MongoDBConfigs.DEFAULT_CHUNK_SIZE.
+            writer_threads (int, optional): The number of background threads saving the chunks.
+            Default is 0, which saves each chunk synchronously in 'load'.
+            queue_size (Optional[int]): The maximum number of chunks waiting for a writer
+            thread. Default is None, which uses twice the number of writer threads.
+        """
+        super().__init__(storage=mongo_storage)
+        self.chunk_size = chunk_size
+        self.writer_threads = writer_threads
+        self.queue_size = queue_size or 2 * writer_threads
+        self._chunk_queue = None
+        self._writers = []
+        self._write_error = None
+        self._write_error_lock = threading.Lock()
+        self._write_failed = threading.Event()
+        self._load_failed = False
+
+    def load(self, input_data: Iterable[Dict]):
+        """
+        Load the input data into the MongoDB collection in chunks.
+
+        The input data is consumed lazily, so iterators of dictionaries are loaded without
+        being materialized as a whole. With writer threads the chunks are handed to them
+        through a bounded queue and this method returns once the last chunk is queued;
+        'close' must be called to wait for the writes.
+
+        Args:
+            input_data (Iterable[Dict]): The dictionaries representing the data to be loaded.
+
+        Raises:
+            Exception: The first error raised by a writer thread.
+        """
+        input_iterator = iter(input_data)
+        try:
+            while data_chunk := list(islice(input_iterator, self.chunk_size)):
+                if self.writer_threads <= 0:
+                    self.storage.save(data_chunk)
+                    continue
+
+                self._start_writers()
+                self._raise_write_error()
+                self._chunk_queue.put(data_chunk)
+        except BaseException:
+            self._load_failed = True
+            raise
+
+    def close(self) -> None:
+        """
+        Wait for the chunks in flight to be written, stop the writer threads and finalize
+        the storage. The storage is finalized even when a write failed, so deferred indexes
+        are never left unbuilt. The load generation is only bumped when no load or write
+        since the last close failed, including errors that 'load' already raised.
+
+        Raises:
+            Exception: The first error raised by a writer thread.
+        """
+        for _ in self._writers:
+            self._chunk_queue.put(None)
+        for writer in self._writers:
+            writer.join()
+        self._writers = []
+        self._chunk_queue = None
+        load_failed, self._load_failed = self._load_failed, False
+        try:
+            self._raise_write_error()
+        finally:
+            self.storage.finalize()
+        if load_failed:
+            logger.warning(f'Keeping the load generation, the load of {self} failed.')
+            return
+        self.storage.bump_load_generation()
+
+    def _start_writers(self) -> None:
+        """
+        Start the writer threads if they are not running.
+        """
+        if self._writers:
+            return
+
+        self._chunk_queue = queue.Queue(maxsize=self.queue_size)
+        with self._write_error_lock:
+            self._write_error = None
+        self._write_failed.clear()
+        self._writers = [
+            threading.Thread(
+                target=self._write_chunks, name=f'mongodb-writer-{index}', daemon=True
+            )
+            for index in range(self.writer_threads)
+        ]
+        for writer in self._writers:
+            writer.start()
+
+    def _write_chunks(self) -> None:
+        """
+        Save the queued chunks until a stop sentinel is received.
+
+        After a failed write the remaining chunks are discarded until the writers are
+        stopped, even once 'load' raised the error, so the producer is never blocked on a
+        full queue and no chunk of a failed load is written afterwards.
+        """
+        while (data_chunk := self._chunk_queue.get()) is not None:
+            if self._write_failed.is_set():
+                continue
+            try:
+                self.storage.save(data_chunk)
+            except Exception as error:  # pylint: disable=broad-exception-caught
+                with self._write_error_lock:
+                    self._write_error = self._write_error or error
+                self._write_failed.set()
+
+    def _raise_write_error(self) -> None:
+        """
+        Raise the first error raised by a writer thread, if it was not raised yet. The
+        writers keep discarding the chunks until they are stopped.
+        """
+        with self._write_error_lock:
+            error, self._write_error = self._write_error, None
+        if error is not None:
+            raise error
+
+    def __str__(self):  # pragma: no cover
+        """
+        String representation of the MongoDBLoader object.
+
+        Returns:
+            str: The string representation of the MongoDBLoader object.
+        """
+        return str(self.storage)
@@ -0,0 +1,474 @@
+"""
+multiprocess_engine.py - Module for defining the MultiprocessEngine class.
+
+This module contains the implementation of the MultiprocessEngine class, which runs the
+extract, transform and load steps of a set of CSV files in worker processes. Parse workers
+read shards of the files and encode their rows into BSON batches, which they hand to writer
+processes through shared memory. The process running the engine only coordinates them.
+
+The batches are row-wise buffers of BSON documents rather than columnar batches: MongoDB
+stores documents, so a columnar batch would have to be turned back into documents in the
+writers, while a BSON buffer is sent to the server as it is. The batches are written in the
+order they reach a writer, so the documents of different shards are not stored in the order
+of the files, which the collections do not keep anyway.
+
+Classes:
+    MultiprocessEngine: A coordinator of parse and writer processes.
+"""
+import multiprocessing
+import os
+import queue
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing.shared_memory import SharedMemory
+from typing import Callable, Dict, List, Optional, Tuple
+import bson
+from bson.raw_bson import DEFAULT_RAW_BSON_OPTIONS
+from loguru import logger
+
+from src.interfaces.data_source import DataSource
+from src.interfaces.loader import Loader
+from src.models.csv_file_extractor import CsvFileExtractor
+from src.models.pipeline_metrics import PipelineMetrics
+from src.models.raw_bson_transformer import DEFAULT_BATCH_SIZE, encode_documents
+from src.models.shard_planner import ShardPlanner
+
+SourceFactory = Callable[..., List[DataSource]]
+LoaderFactory = Callable[[str, List[str]], Loader]
+
+DEFAULT_PUT_TIMEOUT = 600.0  # seconds a parse worker waits for room in the batch queue
+_POLL_SECONDS = 0.1
+_BATCH_QUEUE = None  # the queue of a parse worker, set by its initializer
+
+
+class EngineError(RuntimeError):
+    """
+    Raised when a parse worker or a writer process of the engine failed.
+    """
+
+
+class MultiprocessEngine:  # pylint: disable=too-many-instance-attributes,too-few-public-methods
+    """
+    MultiprocessEngine class for running the steps of an ETL in worker processes.
+
+    The coordinator splits the files into shards of about shard_bytes with ShardPlanner and
+    submits them to parse_workers spawned processes. A parse worker reads its shard with the
+    source factory and encodes every batch_size rows into one buffer of consecutive BSON
+    documents, the format the writers send to MongoDB. The buffer is copied into a shared
+    memory block, and only the block's name is queued for the writer processes, so no
+    Python objects are pickled between the steps. A writer attaches the block, hands the
+    documents to the loader of their file as RawBSONDocuments and unlinks the block. The
+    bounded queue makes fast parsers wait for slow writers.
+
+    The first failure of a worker stops the run: the remaining shards are cancelled, the
+    queued blocks are unlinked and an EngineError is raised. A writer process that dies
+    before the run finished fails the run too, and a parse worker that finds no room in the
+    queue for put_timeout seconds fails its shard, so a lost writer never hangs the run.
+    The writers are only stopped once they reported every queued batch, since a batch
+    queued by a parse worker may reach the queue after its shard finished. Since documents
+    are inserted as their batches arrive, a failed run may have stored part of the files.
+    After a successful run the number of written rows of every file is checked against the
+    parsed rows.
+
+    Attributes:
+        source_factory (SourceFactory): Creates the data sources of a shard from file_paths,
+            chunk_size and byte_range keyword arguments.
+        loader_factory (LoaderFactory): Creates the loader of a file from its name and columns.
+        parse_workers (int): The number of parse processes.
+        writer_processes (int): The number of writer processes.
+        shard_bytes (int): The target number of CSV bytes per shard.
+        chunk_size (Optional[int]): The number of rows read from a shard at a time.
+        batch_size (int): The number of rows per shared memory batch.
+        queue_size (int): The maximum number of batches waiting for a writer.
+        put_timeout (float): The seconds a parse worker waits for room in the queue.
+        compact (bool): Whether the documents are encoded compactly.
+        field_aliases (Dict[str, Dict[str, str]]): Short field names replacing column names,
+            per file name.
+        integer_columns (Dict[str, Tuple[str, ...]]): Columns holding only whole numbers,
+            per file name.
+
+    Methods:
+        run(file_paths: List[str], byte_range: Optional[List[int]] = None) -> PipelineMetrics:
+            Extract, transform and load the files.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments,too-many-positional-arguments
+            self, source_factory: SourceFactory, loader_factory: LoaderFactory,
+            parse_workers: int, writer_processes: int, shard_bytes: int,
+            chunk_size: Optional[int] = None,
+            batch_size: Optional[int] = None,
+            queue_size: Optional[int] = None,
+            put_timeout: float = DEFAULT_PUT_TIMEOUT,
+            compact: bool = False,
+            field_aliases: Optional[Dict[str, Dict[str, str]]] = None,
+            integer_columns: Optional[Dict[str, Tuple[str, ...]]] = None,
+    ) -> None:
+        """
+        Constructor for the MultiprocessEngine class.
+
+        Args:
+            source_factory (SourceFactory): Creates the data sources of a shard. It must be
+            picklable, such as a module level function or static method.
+            loader_factory (LoaderFactory): Creates the loader of a file from its name and
+            columns in a writer process. It must be picklable.
+            parse_workers (int): The number of parse processes.
+            writer_processes (int): The number of writer processes.
+            shard_bytes (int): The target number of CSV bytes per shard.
+            chunk_size (Optional[int]): The number of rows read from a shard at a time.
+            Default is None, which reads whole shards.
+            batch_size (Optional[int]): The number of rows per shared memory batch.
+            Default is None, which uses DEFAULT_BATCH_SIZE of the raw BSON transformer.
+            queue_size (Optional[int]): The maximum number of batches waiting for a writer.
+            Default is None, which allows two batches per writer.
+            put_timeout (float, optional): The seconds a parse worker waits for room in the
+            queue before failing its shard. Default is DEFAULT_PUT_TIMEOUT.
+            compact (bool, optional): Whether to encode the documents compactly.
+            Default is False.
+            field_aliases (Optional[Dict[str, Dict[str, str]]]): Short field names replacing
+            column names, per file name. Default is None, which keeps the column names.
+            integer_columns (Optional[Dict[str, Tuple[str, ...]]]): Columns holding only
+            whole numbers, stored as integers in compact documents, per file name.
+            Default is None, no integer columns.
+        """
+        self.source_factory = source_factory
+        self.loader_factory = loader_factory
+        self.parse_workers = max(parse_workers, 1)
+        self.writer_processes = max(writer_processes, 1)
+        self.shard_bytes = shard_bytes
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size or DEFAULT_BATCH_SIZE
+        self.queue_size = queue_size or 2 * self.writer_processes
+        self.put_timeout = put_timeout
+        self.compact = compact
+        self.field_aliases = field_aliases or {}
+        self.integer_columns = integer_columns or {}
+
+    def run(
+            self, file_paths: List[str], byte_range: Optional[List[int]] = None
+    ) -> PipelineMetrics:
+        """
+        Extract, transform and load the files in the worker processes.
+
+        Args:
+            file_paths (List[str]): The paths of the CSV files.
+            byte_range (Optional[List[int]]): The byte range of the single file to process,
+            which is then parsed as one shard. Default is None, which shards the files.
+
+        Returns:
+            PipelineMetrics: The stage measurements reported by the workers. The stage times
+            are summed over the workers, so they can exceed the wall time of the run.
+
+        Raises:
+            EngineError: A parse worker or writer process failed.
+        """
+        if byte_range is not None:
+            shards = [{'file_paths': file_paths, 'byte_range': byte_range}]
+        else:
+            shards = ShardPlanner(self.shard_bytes, small_file_bytes=0).plan(file_paths)
+        logger.info(
+            f'Running {len(shards)} shards of {len(file_paths)} files with '
+            f'{self.parse_workers} parse workers and {self.writer_processes} writers.'
+        )
+        context = multiprocessing.get_context('spawn')
+        batch_queue = context.Queue(maxsize=self.queue_size)
+        report_queue = context.Queue()
+        writers = [
+            context.Process(
+                target=write_batches,
+                args=(batch_queue, report_queue, self.loader_factory),
+                name=f'etl-writer-{index}',
+                daemon=True,
+            )
+            for index in range(self.writer_processes)
+        ]
+        for writer in writers:
+            writer.start()
+
+        metrics = PipelineMetrics()
+        parsed_rows: Dict[str, int] = {}
+        written_rows: Dict[str, int] = {}
+        errors: List[str] = []
+        try:
+            self._parse(shards, context, batch_queue, report_queue, writers, metrics,
+                        parsed_rows, written_rows, errors)
+        finally:
+            self._stop_writers(batch_queue, writers, errors)
+            self._collect_reports(report_queue, writers, metrics, written_rows, errors)
+
+        if errors:
+            raise EngineError(f'The ETL run failed: {errors[0]}')
+        for file_name, rows in parsed_rows.items():
+            if written_rows.get(file_name, 0) != rows:
+                raise EngineError(
+                    f'{file_name}: wrote {written_rows.get(file_name, 0)} of {rows} rows.'
+                )
+        return metrics
+
+    def _parse(  # pylint: disable=too-many-arguments,too-many-positional-arguments,too-many-locals
+            self, shards: List[Dict], context, batch_queue, report_queue, writers: List,
+            metrics: PipelineMetrics, parsed_rows: Dict[str, int],
+            written_rows: Dict[str, int], errors: List[str],
+    ) -> None:
+        """
+        Submit the shards to the parse workers and wait for them and for the writers to
+        report their batches, stopping at the first failure of a parse worker or writer, or
+        when a writer died before the run finished.
+        """
+        executor = ProcessPoolExecutor(
+            max_workers=self.parse_workers,
+            mp_context=context,
+            initializer=_init_parse_worker,
+            initargs=(batch_queue,),
+        )
+        futures = []
+        for shard in shards:
+            file_name = os.path.basename(shard['file_paths'][0])
+            futures.append(executor.submit(
+                parse_shard, self.source_factory, shard['file_paths'][0],
+                shard.get('byte_range'), self.chunk_size, self.batch_size, self.put_timeout,
+                self.compact, self.field_aliases.get(file_name, {}),
+                self.integer_columns.get(file_name, ()),
+            ))
+        pending = set(futures)
+        queued_batches = reported_batches = 0
+        try:
+            while (pending or reported_batches < queued_batches) and not errors:
+                done = set()
+                if pending:
+                    done, pending = wait(
+                        pending, timeout=_POLL_SECONDS, return_when=FIRST_COMPLETED
+                    )
+                for future in done:
+                    try:
+                        shard_report = future.result()
+                    except Exception as error:  # pylint: disable=broad-except
+                        errors.append(f'parse worker: {error!r}')
+                        continue
+                    self._record_parse(shard_report, metrics, parsed_rows)
+                    queued_batches += shard_report['batches']
+                reported_batches += self._read_reports(
+                    report_queue, metrics, written_rows, errors,
+                    0.0 if pending else _POLL_SECONDS,
+                )
+                dead_writers = [writer.name for writer in writers if not writer.is_alive()]
+                if dead_writers and not errors:
+                    errors.append(f'{dead_writers[0]} died before the run finished')
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+            # running parse workers may wait for room in the queue, which is freed for them
+            while not all(future.done() for future in futures):
+                self._discard_batches(batch_queue, _POLL_SECONDS)
+            executor.shutdown()
+
+    def _stop_writers(self, batch_queue, writers: List, errors: List[str]) -> None:
+        """
+        Queue a stop sentinel for every writer, after the queued batches if the run succeeded.
+        """
+        if errors:
+            self._discard_batches(batch_queue)
+        stops = len(writers)
+        while stops:
+            try:
+                batch_queue.put(None, timeout=_POLL_SECONDS)
+                stops -= 1
+            except queue.Full:
+                if not any(writer.is_alive() for writer in writers):
+                    self._discard_batches(batch_queue)
+
+    @staticmethod
+    def _record_parse(
+            shard_report: Dict, metrics: PipelineMetrics, parsed_rows: Dict[str, int]
+    ) -> None:
+        """
+        Add the measurements of a parsed shard to the metrics.
+        """
+        file_name = shard_report['file_name']
+        parsed_rows[file_name] = parsed_rows.get(file_name, 0) + shard_report['rows']
+        for stage in ('extract', 'transform'):
+            metrics.record(
+                file_name, stage, shard_report[f'{stage}_seconds'],
+                shard_report[f'{stage}_cpu_seconds'], shard_report['rows'],
+                shard_report['bytes'], shard_report['chunks'],
+            )
+
+    def _collect_reports(
+            self, report_queue, writers: List, metrics: PipelineMetrics,
+            written_rows: Dict[str, int], errors: List[str],
+    ) -> None:
+        """
+        Read the reports of the writers until every writer finished or died.
+        """
+        while any(writer.is_alive() for writer in writers):
+            self._read_reports(report_queue, metrics, written_rows, errors, _POLL_SECONDS)
+        self._read_reports(report_queue, metrics, written_rows, errors)
+        for writer in writers:
+            writer.join()
+            if writer.exitcode:
+                errors.append(f'{writer.name} exited with code {writer.exitcode}')
+
+    @staticmethod
+    def _read_reports(
+            report_queue, metrics: PipelineMetrics, written_rows: Dict[str, int],
+            errors: List[str], timeout: float = 0.0,
+    ) -> int:
+        """
+        Add the available writer reports to the metrics and the errors, waiting up to the
+        timeout for the first one, and return the number of reports read.
+        """
+        reports = 0
+        while True:
+            try:
+                kind, file_name, payload = report_queue.get(timeout=timeout)
+            except queue.Empty:
+                return reports
+            timeout = 0.0
+            reports += 1
+            if kind == 'error':
+                errors.append(f'writer of {file_name}: {payload}')
+                continue
+            metrics.record(
+                file_name, 'load', payload['seconds'], payload['cpu_seconds'], payload['rows'],
+                payload['bytes'], payload['chunks'],
+            )
+            written_rows[file_name] = written_rows.get(file_name, 0) + payload['rows']
+
+    @staticmethod
+    def _discard_batches(batch_queue, timeout: float = 0.0) -> None:
+        """
+        Remove the queued batches and unlink their shared memory blocks, waiting up to the
+        timeout for the first one.
+        """
+        while True:
+            try:
+                batch = batch_queue.get(timeout=timeout)
+            except queue.Empty:
+                return
+            timeout = 0.0
+            if batch is not None:
+                _unlink(batch[1])
+
+
+def _init_parse_worker(batch_queue) -> None:
+    """
+    Keep the batch queue inherited by a parse worker.
+    """
+    global _BATCH_QUEUE  # pylint: disable=global-statement
+    _BATCH_QUEUE = batch_queue
+
+
+def parse_shard(  # pylint: disable=too-many-arguments,too-many-positional-arguments,too-many-locals
+        source_factory: SourceFactory, file_path: str, byte_range: Optional[List[int]],
+        chunk_size: Optional[int], batch_size: int, put_timeout: float, compact: bool,
+        field_aliases: Dict[str, str], integer_columns: Tuple[str, ...],
+) -> Dict:
+    """
+    Read a shard, encode its rows into BSON batches and queue them in shared memory.
+    Runs in the parse workers.
+
+    Returns:
+        Dict: The file name, rows, bytes, chunks, queued batches and stage times of the
+        shard.
+
+    Raises:
+        EngineError: No writer made room in the queue for put_timeout seconds.
+    """
+    report = {
+        'rows': 0, 'bytes': 0, 'chunks': 0, 'batches': 0,
+        'extract_seconds': 0.0, 'extract_cpu_seconds': 0.0,
+        'transform_seconds': 0.0, 'transform_cpu_seconds': 0.0,
+    }
+    sources = source_factory(file_paths=[file_path], chunk_size=chunk_size, byte_range=byte_range)
+    report['file_name'] = sources[0].file_name
+    parts = iter(CsvFileExtractor(sources).extract())
+    while True:
+        wall_start, cpu_start = time.perf_counter(), time.thread_time()
+        data_frame = next(parts, None)
+        report['extract_seconds'] += time.perf_counter() - wall_start
+        report['extract_cpu_seconds'] += time.thread_time() - cpu_start
+        if data_frame is None:
+            return report
+
+        columns = [str(column) for column in data_frame.columns]
+        report['bytes'] += PipelineMetrics.data_frame_bytes(data_frame)
+        report['chunks'] += 1
+        for start in range(0, len(data_frame), batch_size):
+            wall_start, cpu_start = time.perf_counter(), time.thread_time()
+            batch = data_frame.iloc[start:start + batch_size]
+            buffer = encode_documents(batch, compact, field_aliases, integer_columns)
+            shared_memory = SharedMemory(create=True, size=max(len(buffer), 1))
+            shared_memory.buf[:len(buffer)] = buffer
+            shared_memory.close()
+            report['transform_seconds'] += time.perf_counter() - wall_start
+            report['transform_cpu_seconds'] += time.thread_time() - cpu_start
+            report['rows'] += len(batch)
+            try:
+                _BATCH_QUEUE.put(
+                    (report['file_name'], shared_memory.name, len(buffer), len(batch), columns),
+                    timeout=put_timeout,
+                )
+            except queue.Full:
+                _unlink(shared_memory.name)
+                raise EngineError(
+                    f'No writer took a batch of {report["file_name"]} in {put_timeout} seconds.'
+                ) from None
+            report['batches'] += 1
+
+
+def write_batches(  # pylint: disable=too-many-locals
+        batch_queue, report_queue, loader_factory: LoaderFactory
+) -> None:
+    """
+    Load the queued batches until a stop sentinel is received, then close the loaders.
+    Runs in the writer processes.
+    """
+    loaders: Dict[str, Loader] = {}
+    failed = False
+    while True:
+        batch = batch_queue.get()
+        if batch is None:
+            break
+        file_name, block_name, size, rows, columns = batch
+        try:
+            buffer = _read_block(block_name, size)
+            if failed:
+                continue
+            wall_start, cpu_start = time.perf_counter(), time.thread_time()
+            if file_name not in loaders:
+                loaders[file_name] = loader_factory(file_name, columns)
+            loaders[file_name].load(bson.decode_all(buffer, DEFAULT_RAW_BSON_OPTIONS))
+            report_queue.put(('load', file_name, {
+                'rows': rows, 'bytes': size, 'chunks': 1,
+                'seconds': time.perf_counter() - wall_start,
+                'cpu_seconds': time.thread_time() - cpu_start,
+            }))
+        except Exception as error:  # pylint: disable=broad-except
+            failed = True
+            report_queue.put(('error', file_name, repr(error)))
+
+    for file_name, loader in loaders.items():
+        try:
+            loader.close()
+        except Exception as error:  # pylint: disable=broad-except
+            report_queue.put(('error', file_name, repr(error)))
+
+
+def _read_block(block_name: str, size: int) -> bytes:
+    """
+    Copy the contents of a shared memory block and unlink it.
+    """
+    shared_memory = SharedMemory(name=block_name)
+    try:
+        return bytes(shared_memory.buf[:size])
+    finally:
+        shared_memory.close()
+        shared_memory.unlink()
+
+
+def _unlink(block_name: str) -> None:
+    """
+    Unlink a shared memory block that will not be read.
+    """
+    try:
+        _read_block(block_name, 0)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,258 @@
+"""
+parse_cache.py - Module for defining the ParseCache class.
+
+This module contains the implementation of the ParseCache class, which stores parsed CSV files
+as Arrow IPC files. Later runs memory-map the cached columns instead of parsing the CSV text
+again, as long as the file fingerprint and parsing options are unchanged.
+
+Classes:
+    ParseCache: A size-bounded, fingerprint-keyed cache of parsed DataFrames.
+"""
+import glob
+import hashlib
+import json
+import os
+import tempfile
+from typing import Iterator, Optional
+import pandas as pd
+from loguru import logger
+
+try:
+    import pyarrow as pa
+except ImportError:  # pragma: no cover
+    pa = None
+
+_HASH_BLOCK_SIZE = 1 << 20  # bytes
+_CACHE_FILE_SUFFIX = '.arrow'
+
+
+class ParseCache:
+    """
+    ParseCache class for caching parsed CSV files in a columnar binary format.
+
+    Entries are keyed by the file path, size, modification time, a content hash and the
+    parsing options. Reading an entry memory-maps the Arrow IPC file, so the columns are
+    not copied into memory until pandas needs them. The least recently used entries are
+    evicted once the cache grows over max_bytes.
+
+    Several processes may share the cache directory. Entries are written to a temporary
+    file of the writing process and renamed into place, and an entry that disappears or
+    can not be read is treated as a miss, so the file is parsed again.
+
+    Attributes:
+        cache_dir (str): The directory in which the cache entries are stored.
+        max_bytes (int): The maximum total size of the cache entries.
+
+    Methods:
+        __init__(cache_dir: str, max_bytes: int) -> None:
+            Constructor for the ParseCache class.
+        is_available() -> bool:
+            Whether the cache can be used, which requires pyarrow.
+        load(file_path: str, options_key: str) -> Optional[pd.DataFrame]:
+            Load a cached DataFrame.
+        load_chunks(file_path: str, options_key: str, chunk_size: int)
+        -> Optional[Iterator[pd.DataFrame]]:
+            Load a cached DataFrame in parts of chunk_size rows.
+        save(file_path: str, options_key: str, data_frame: pd.DataFrame) -> None:
+            Store a parsed DataFrame and evict entries over the size bound.
+        invalidate(file_path: Optional[str] = None) -> None:
+            Remove the entries of a file, or every entry.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int) -> None:
+        """
+        Constructor for the ParseCache class.
+
+        Args:
+            cache_dir (str): The directory in which the cache entries are stored.
+            max_bytes (int): The maximum total size of the cache entries.
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._cache_paths = {}
+
+    @staticmethod
+    def is_available() -> bool:
+        """
+        Whether the cache can be used.
+
+        Returns:
+            bool: True if pyarrow is installed.
+        """
+        return pa is not None
+
+    def load(self, file_path: str, options_key: str) -> Optional[pd.DataFrame]:
+        """
+        Load the cached DataFrame of a file.
+
+        Args:
+            file_path (str): The path of the parsed CSV file.
+            options_key (str): A representation of the options the file was parsed with.
+
+        Returns:
+            Optional[pd.DataFrame]: The cached DataFrame, or None when there is no valid entry.
+        """
+        table = self._read_table(file_path, options_key)
+        if table is None:
+            return None
+        return table.to_pandas()
+
+    def load_chunks(
+            self, file_path: str, options_key: str, chunk_size: int
+    ) -> Optional[Iterator[pd.DataFrame]]:
+        """
+        Load the cached DataFrame of a file in parts of chunk_size rows.
+
+        Args:
+            file_path (str): The path of the parsed CSV file.
+            options_key (str): A representation of the options the file was parsed with.
+            chunk_size (int): The number of rows per part.
+
+        Returns:
+            Optional[Iterator[pd.DataFrame]]: An iterator over the cached parts, or None when
+            there is no valid entry.
+        """
+        table = self._read_table(file_path, options_key)
+        if table is None:
+            return None
+        return (
+            pa.Table.from_batches([batch]).to_pandas()
+            for batch in table.to_batches(max_chunksize=chunk_size)
+        )
+
+    def save(self, file_path: str, options_key: str, data_frame: pd.DataFrame) -> None:
+        """
+        Store a parsed DataFrame, replacing older entries of the same file.
+
+        A DataFrame that can not be converted to Arrow is not cached.
+
+        Args:
+            file_path (str): The path of the parsed CSV file.
+            options_key (str): A representation of the options the file was parsed with.
+            data_frame (pd.DataFrame): The parsed data of the file.
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.invalidate(file_path)
+
+        cache_path = self._cache_path(file_path, options_key)
+        file_descriptor, temporary_path = tempfile.mkstemp(
+            dir=self.cache_dir, prefix=f'{os.path.basename(cache_path)}.', suffix='.tmp'
+        )
+        os.close(file_descriptor)
+        try:
+            table = pa.Table.from_pandas(data_frame, preserve_index=False)
+            with pa.OSFile(temporary_path, 'wb') as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+            os.replace(temporary_path, cache_path)
+        except (pa.ArrowException, OSError) as error:
+            logger.warning(f'Could not cache the parsed {file_path}: {error}')
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+            return
+        logger.info(f'Cached the parsed {file_path} at {cache_path}.')
+
+        self._evict()
+
+    def invalidate(self, file_path: Optional[str] = None) -> None:
+        """
+        Remove the cache entries of a file, or every entry when no file is given.
+
+        Args:
+            file_path (Optional[str]): The path of the CSV file whose entries are removed.
+        """
+        prefix = self._path_digest(file_path) if file_path is not None else ''
+        pattern = os.path.join(self.cache_dir, f'{prefix}*{_CACHE_FILE_SUFFIX}')
+        for cache_path in glob.glob(pattern):
+            _remove(cache_path)
+
+    def _read_table(self, file_path: str, options_key: str) -> Optional['pa.Table']:
+        """
+        Memory-map the cached Arrow table of a file.
+        """
+        cache_path = self._cache_path(file_path, options_key)
+        try:
+            os.utime(cache_path)
+            table = pa.ipc.open_file(pa.memory_map(cache_path, 'r')).read_all()
+        except FileNotFoundError:
+            return None
+        except (pa.ArrowException, OSError) as error:
+            logger.warning(f'Ignoring the unreadable parse cache entry {cache_path}: {error}')
+            return None
+        logger.info(f'Loaded the parsed {file_path} from {cache_path}.')
+        return table
+
+    def _evict(self) -> None:
+        """
+        Remove the least recently used entries until the cache fits in max_bytes.
+        """
+        entries = []
+        for cache_path in glob.glob(os.path.join(self.cache_dir, f'*{_CACHE_FILE_SUFFIX}')):
+            try:
+                entries.append((os.stat(cache_path), cache_path))
+            except FileNotFoundError:
+                continue  # evicted by another process
+        entries.sort(key=lambda entry: entry[0].st_mtime_ns)
+
+        total_size = sum(stat.st_size for stat, _ in entries)
+        for stat, cache_path in entries:
+            if total_size <= self.max_bytes:
+                break
+            _remove(cache_path)
+            total_size -= stat.st_size
+            logger.info(f'Evicted {cache_path} from the parse cache.')
+
+    def _cache_path(self, file_path: str, options_key: str) -> str:
+        """
+        Path of the cache entry of the current fingerprint of a file.
+
+        The content hash is computed once per size and modification time of the file.
+        """
+        stat = os.stat(file_path)
+        stat_key = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns, options_key)
+        if stat_key in self._cache_paths:
+            return self._cache_paths[stat_key]
+
+        content_hash = hashlib.blake2b(digest_size=16)
+        with open(file_path, 'rb') as file:
+            for block in iter(lambda: file.read(_HASH_BLOCK_SIZE), b''):
+                content_hash.update(block)
+
+        fingerprint = json.dumps([
+            os.path.abspath(file_path),
+            stat.st_size,
+            stat.st_mtime_ns,
+            content_hash.hexdigest(),
+            options_key,
+        ])
+        key = hashlib.sha256(fingerprint.encode()).hexdigest()[:32]
+        self._cache_paths[stat_key] = os.path.join(
+            self.cache_dir, f'{self._path_digest(file_path)}-{key}{_CACHE_FILE_SUFFIX}'
+        )
+        return self._cache_paths[stat_key]
+
+    @staticmethod
+    def _path_digest(file_path: str) -> str:
+        """
+        Prefix shared by every cache entry of a file.
+        """
+        return hashlib.sha256(os.path.abspath(file_path).encode()).hexdigest()[:16]
+
+    def __str__(self):  # pragma: no cover
+        """
+        String representation of the ParseCache object.
+
+        Returns:
+            str: The cache directory.
+        """
+        return self.cache_dir
+
+
+def _remove(cache_path: str) -> None:
+    """
+    Remove a cache entry, unless another process already removed it.
+    """
+    try:
+        os.remove(cache_path)
+    except FileNotFoundError:
+        pass
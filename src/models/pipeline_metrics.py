@@ -0,0 +1,394 @@
+"""
+pipeline_metrics.py - Module for defining the PipelineMetrics class.
+
+This module contains the implementation of the PipelineMetrics class, which measures the
+extract, transform and load stages of App.run per source file and exports the measurements
+as a JSON summary and as a Prometheus textfile.
+
+Classes:
+    StageMetrics: The measurements of a stage of a file.
+    PipelineMetrics: Per file and per stage measurements of a run.
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterable, Iterator, Optional
+import pandas as pd
+
+from src.interfaces.transformer import Transformer
+from src.models.staged_pipeline import SOURCE_STAGE, StageReport
+
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None
+
+STAGES = ('extract', 'transform', 'load')
+
+
+@dataclass
+class StageMetrics:
+    """
+    The measurements of a stage of a file.
+
+    Attributes:
+        wall_seconds (float): The elapsed time spent in the stage.
+        cpu_seconds (float): The CPU time of the thread running the stage. The work of
+            extract workers, writer threads and encode processes is not included.
+        rows (int): The number of rows processed by the stage.
+        bytes (int): The in-memory size of the DataFrame parts processed by the stage.
+        chunks (int): The number of parts processed by the stage.
+    """
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    rows: int = 0
+    bytes: int = 0
+    chunks: int = 0
+
+    @property
+    def rows_per_sec(self) -> float:
+        """
+        The throughput of the stage.
+
+        Returns:
+            float: The rows per second of wall time, 0.0 when no time was measured.
+        """
+        return self.rows / self.wall_seconds if self.wall_seconds else 0.0
+
+
+class PipelineMetrics:
+    """
+    PipelineMetrics class for measuring the stages of a run per source file.
+
+    The extract and transform stages are lazy, so their time is measured while their
+    iterators are consumed. The load stage is measured around the loader calls, without
+    the transform time spent inside them. The CPU time is the thread CPU time of the
+    calling thread, so work running concurrently in other threads is not attributed to a
+    stage.
+
+    The peak resident set size is a measurement of the whole run, not of its files: the
+    peak of a process never decreases, so a later file would inherit the peak of an
+    earlier one. Every task runs in its own process, which makes it the peak of the task.
+
+    Attributes:
+        files (Dict[str, Dict[str, StageMetrics]]): The stage measurements of every file.
+
+    Methods:
+        track_extract(data_frames: Iterable[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+            Measure the extraction of the parts of the files.
+        track_transform(file_name: str, transformer: Transformer, nbytes: int)
+        -> Iterator[Dict]:
+            Transform a part and measure the transformation.
+        track_load(file_name: str, nbytes: int = 0, chunks: int = 1):
+            Context manager measuring the load of a part.
+        record(file_name: str, stage: str, wall_seconds: float, cpu_seconds: float,
+        rows: int, nbytes: int, chunks: int = 1) -> None:
+            Add measurements taken by a worker.
+        record_stage_reports(file_name: str, reports: Dict[str, StageReport], rows: int)
+        -> None:
+            Add the reports of a StagedPipeline run over the parts of a file.
+        peak_rss_bytes() -> Optional[int]:
+            The peak resident set size of the process.
+        summary() -> Dict:
+            The measurements as a JSON serializable dictionary.
+        to_prometheus() -> str:
+            The measurements in the Prometheus text exposition format.
+        export(directory: str, name: str) -> None:
+            Write the JSON summary and the Prometheus textfile.
+    """
+
+    def __init__(self) -> None:
+        """
+        Constructor for the PipelineMetrics class.
+        """
+        self.files: Dict[str, Dict[str, StageMetrics]] = {}
+        self.started_at = time.time()
+        self._started_perf_counter = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def stage(self, file_name: str, stage: str) -> StageMetrics:
+        """
+        The measurements of a stage of a file.
+
+        Args:
+            file_name (str): The name of the source file.
+            stage (str): One of 'extract', 'transform' and 'load'.
+
+        Returns:
+            StageMetrics: The measurements, created empty on first use.
+        """
+        stages = self.files.setdefault(
+            str(file_name), {name: StageMetrics() for name in STAGES}
+        )
+        return stages[stage]
+
+    def track_extract(self, data_frames: Iterable[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+        """
+        Measure the time spent producing each part and attribute it to the part's file.
+
+        Args:
+            data_frames (Iterable[pd.DataFrame]): The extracted parts, with the source file
+            name in attrs['file_name'].
+
+        Yields:
+            pd.DataFrame: The extracted parts.
+        """
+        iterator = iter(data_frames)
+        while True:
+            wall_start, cpu_start = time.perf_counter(), time.thread_time()
+            try:
+                data_frame = next(iterator)
+            except StopIteration:
+                return
+            metrics = self.stage(data_frame.attrs.get('file_name'), 'extract')
+            metrics.wall_seconds += time.perf_counter() - wall_start
+            metrics.cpu_seconds += time.thread_time() - cpu_start
+            metrics.rows += len(data_frame)
+            metrics.bytes += self.data_frame_bytes(data_frame)
+            metrics.chunks += 1
+            yield data_frame
+
+    def track_transform(
+            self, file_name: str, transformer: Transformer, nbytes: int
+    ) -> Iterator[Dict]:
+        """
+        Transform a part and measure the time spent producing its documents, both in the
+        transform call and, for lazy transformers, while the documents are consumed.
+
+        Args:
+            file_name (str): The name of the source file of the part.
+            transformer (Transformer): The transformer of the part.
+            nbytes (int): The in-memory size of the part.
+
+        Returns:
+            Iterator[Dict]: The transformed documents.
+        """
+        metrics = self.stage(file_name, 'transform')
+        metrics.chunks += 1
+        metrics.bytes += nbytes
+        wall_start, cpu_start = time.perf_counter(), time.thread_time()
+        iterator = iter(transformer.transform())
+        metrics.wall_seconds += time.perf_counter() - wall_start
+        metrics.cpu_seconds += time.thread_time() - cpu_start
+        return self._track_documents(metrics, iterator)
+
+    @staticmethod
+    def _track_documents(metrics: StageMetrics, iterator: Iterator[Dict]) -> Iterator[Dict]:
+        """
+        Yield the documents of an iterator, measuring the time spent producing them.
+        """
+        while True:
+            wall_start, cpu_start = time.perf_counter(), time.thread_time()
+            try:
+                document = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                metrics.wall_seconds += time.perf_counter() - wall_start
+                metrics.cpu_seconds += time.thread_time() - cpu_start
+            metrics.rows += 1
+            yield document
+
+    @contextmanager
+    def track_load(self, file_name: str, nbytes: int = 0, chunks: int = 1):
+        """
+        Measure the load of a part, excluding the transform time spent while loading it.
+
+        Args:
+            file_name (str): The name of the source file of the part.
+            nbytes (int): The in-memory size of the part.
+            chunks (int): The number of parts loaded in the block, 0 when closing a loader.
+        """
+        metrics = self.stage(file_name, 'load')
+        transform_metrics = self.stage(file_name, 'transform')
+        transform_wall, transform_cpu = (
+            transform_metrics.wall_seconds, transform_metrics.cpu_seconds
+        )
+        transform_rows = transform_metrics.rows
+        wall_start, cpu_start = time.perf_counter(), time.thread_time()
+        try:
+            yield metrics
+        finally:
+            metrics.wall_seconds += (
+                time.perf_counter() - wall_start
+                - (transform_metrics.wall_seconds - transform_wall)
+            )
+            metrics.cpu_seconds += (
+                time.thread_time() - cpu_start
+                - (transform_metrics.cpu_seconds - transform_cpu)
+            )
+            metrics.rows += transform_metrics.rows - transform_rows
+            metrics.bytes += nbytes
+            metrics.chunks += chunks
+
+    def record(  # pylint: disable=too-many-arguments,too-many-positional-arguments
+            self, file_name: str, stage: str, wall_seconds: float, cpu_seconds: float,
+            rows: int, nbytes: int, chunks: int = 1,
+    ) -> None:
+        """
+        Add measurements taken by a worker thread or process. Safe to call from several
+        threads at once.
+
+        Args:
+            file_name (str): The name of the source file.
+            stage (str): One of 'extract', 'transform' and 'load'.
+            wall_seconds (float): The elapsed time of the work.
+            cpu_seconds (float): The CPU time of the work.
+            rows (int): The number of rows processed.
+            nbytes (int): The in-memory size of the processed parts.
+            chunks (int): The number of processed parts.
+        """
+        with self._lock:
+            metrics = self.stage(file_name, stage)
+            metrics.wall_seconds += wall_seconds
+            metrics.cpu_seconds += cpu_seconds
+            metrics.rows += rows
+            metrics.bytes += nbytes
+            metrics.chunks += chunks
+
+    def record_stage_reports(
+            self, file_name: str, reports: Dict[str, StageReport], rows: int
+    ) -> None:
+        """
+        Add the reports of a StagedPipeline run over the parts of a file. The source of the
+        pipeline is recorded as the extract stage and the other stages under their names.
+
+        Args:
+            file_name (str): The name of the source file.
+            reports (Dict[str, StageReport]): The reports of the pipeline, by stage name.
+            rows (int): The number of rows of the parts, which every stage processed.
+        """
+        for name, report in reports.items():
+            self.record(
+                file_name, 'extract' if name == SOURCE_STAGE else name, report.busy_seconds,
+                report.cpu_seconds, rows, report.bytes, report.items,
+            )
+
+    @staticmethod
+    def peak_rss_bytes() -> Optional[int]:
+        """
+        The peak resident set size of the process so far.
+
+        Returns:
+            Optional[int]: The peak in bytes, None where the resource module is missing.
+        """
+        if resource is None:  # pragma: no cover
+            return None
+        # ru_maxrss is in kilobytes on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    @staticmethod
+    def data_frame_bytes(data_frame: pd.DataFrame) -> int:
+        """
+        The in-memory size of a DataFrame's columns, without following object references.
+
+        Args:
+            data_frame (pd.DataFrame): The DataFrame.
+
+        Returns:
+            int: The size in bytes.
+        """
+        return int(data_frame.memory_usage(index=False).sum())
+
+    def summary(self) -> Dict:
+        """
+        The measurements as a JSON serializable dictionary.
+
+        Returns:
+            Dict: The wall time and peak RSS of the run and the stage measurements of every
+            file.
+        """
+        return {
+            'started_at': self.started_at,
+            'wall_seconds': round(time.perf_counter() - self._started_perf_counter, 6),
+            'peak_rss_bytes': self.peak_rss_bytes(),
+            'files': {
+                file_name: {
+                    'stages': {
+                        stage: {
+                            **{key: round(value, 6) for key, value in asdict(metrics).items()},
+                            'rows_per_sec': round(metrics.rows_per_sec, 3),
+                        }
+                        for stage, metrics in stages.items()
+                    },
+                }
+                for file_name, stages in self.files.items()
+            },
+        }
+
+    def to_prometheus(self) -> str:
+        """
+        The measurements in the Prometheus text exposition format, as read by the textfile
+        collector of the node exporter.
+
+        Returns:
+            str: The metric families of the run.
+        """
+        summary = self.summary()
+        families = [
+            ('etl_stage_wall_seconds', 'wall_seconds', 'Wall time spent in an ETL stage.'),
+            ('etl_stage_cpu_seconds', 'cpu_seconds', 'CPU time of the thread of an ETL stage.'),
+            ('etl_stage_rows', 'rows', 'Rows processed by an ETL stage.'),
+            ('etl_stage_bytes', 'bytes', 'In-memory bytes of the parts of an ETL stage.'),
+            ('etl_stage_chunks', 'chunks', 'Parts processed by an ETL stage.'),
+            ('etl_stage_rows_per_second', 'rows_per_sec', 'Rows per second of an ETL stage.'),
+        ]
+        lines = []
+        for family, field, description in families:
+            lines.extend([f'# HELP {family} {description}', f'# TYPE {family} gauge'])
+            for file_name, file_summary in summary['files'].items():
+                for stage, stage_summary in file_summary['stages'].items():
+                    labels = f'file="{_escape_label(file_name)}",stage="{stage}"'
+                    lines.append(f'{family}{{{labels}}} {stage_summary[field]}')
+
+        if summary['peak_rss_bytes'] is not None:
+            lines.extend([
+                '# HELP etl_run_peak_rss_bytes Peak resident set size of the ETL run.',
+                '# TYPE etl_run_peak_rss_bytes gauge',
+                f'etl_run_peak_rss_bytes {summary["peak_rss_bytes"]}',
+            ])
+        lines.extend([
+            '# HELP etl_run_wall_seconds Wall time of the ETL run.',
+            '# TYPE etl_run_wall_seconds gauge',
+            f'etl_run_wall_seconds {summary["wall_seconds"]}',
+            '# HELP etl_run_timestamp_seconds Start time of the ETL run.',
+            '# TYPE etl_run_timestamp_seconds gauge',
+            f'etl_run_timestamp_seconds {summary["started_at"]}',
+        ])
+        return '\n'.join(lines) + '\n'
+
+    def export(self, directory: str, name: str) -> None:
+        """
+        Write the JSON summary to '<name>.json' and the Prometheus textfile to '<name>.prom'
+        in a directory. The files are replaced atomically, so a collector never reads a
+        partial file.
+
+        Args:
+            directory (str): The directory the files are written to.
+            name (str): The base name of the files.
+        """
+        os.makedirs(directory, exist_ok=True)
+        _write_atomically(
+            os.path.join(directory, f'{name}.json'), json.dumps(self.summary(), indent=4)
+        )
+        _write_atomically(os.path.join(directory, f'{name}.prom'), self.to_prometheus())
+
+
+def _escape_label(value: str) -> str:
+    """
+    Escape a Prometheus label value.
+    """
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _write_atomically(path: str, content: str) -> None:
+    """
+    Write a file through a temporary file in the same directory.
+    """
+    temporary_path = f'{path}.tmp'
+    with open(temporary_path, 'w', encoding='utf-8') as output_file:
+        output_file.write(content)
+    os.replace(temporary_path, path)
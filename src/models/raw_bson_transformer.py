@@ -0,0 +1,172 @@
+"""
+raw_bson_transformer.py - Module for defining the RawBsonTransformer class.
+
+This module contains the implementation of the RawBsonTransformer class, which is a specific
+implementation of the Transformer abstract class. It encodes the rows of a DataFrame into BSON
+in worker processes and yields them as RawBSONDocument objects, which pymongo inserts by
+copying their bytes instead of encoding dictionaries under the GIL.
+
+Classes:
+    RawBsonTransformer: Class for transforming a DataFrame into pre-encoded BSON documents.
+"""
+from collections import deque
+from concurrent.futures import Executor
+from datetime import datetime, timezone
+from itertools import chain
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import bson
+import pandas as pd
+from bson.objectid import ObjectId
+from bson.raw_bson import DEFAULT_RAW_BSON_OPTIONS, RawBSONDocument
+
+from src.configs.mongodb import MongoDBConfigs
+from src.interfaces.transformer import Transformer
+from src.models.df_transformer import DataFrameRowDictTransformer
+
+DEFAULT_BATCH_SIZE = 10000  # rows encoded by a worker at a time
+
+
+class RawBsonTransformer(Transformer):
+    """
+    Class for transforming a DataFrame into pre-encoded BSON documents.
+
+    The DataFrame is split into batches of batch_size rows. Every batch is sent to the
+    executor, converted into dictionaries like DataFrameRowDictTransformer does in streaming
+    mode and encoded into a single buffer of BSON documents, each with a new ObjectId as
+    '_id'. The buffers are split into RawBSONDocument objects in the calling process, which
+    only slices bytes. With a process pool the encoding scales with the number of cores.
+
+    Attributes:
+        input_data (pd.DataFrame): The input DataFrame to be transformed.
+        executor (Executor): The executor encoding the batches, usually a process pool.
+        batch_size (int): The number of rows encoded at a time.
+        compact (bool): Whether the documents are encoded compactly.
+        field_aliases (Dict[str, str]): Short field names replacing column names.
+        integer_columns (Tuple[str, ...]): Columns holding only whole numbers.
+        max_pending (int): The maximum number of batches encoded ahead of the consumer.
+
+    Methods:
+        transform() -> Iterator[RawBSONDocument]:
+            Lazily transform the input DataFrame into BSON documents.
+        transform_batches() -> Iterator[List[RawBSONDocument]]:
+            Lazily transform the input DataFrame into batches of BSON documents.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments,too-many-positional-arguments
+            self, input_df: pd.DataFrame, executor: Executor,
+            batch_size: Optional[int] = None,
+            compact: bool = False,
+            field_aliases: Optional[Dict[str, str]] = None,
+            integer_columns: Iterable[str] = (),
+            max_pending: int = 2,
+    ) -> None:
+        """
+        Constructor for the RawBsonTransformer class.
+
+        Args:
+            input_df (pd.DataFrame): The input DataFrame to be transformed.
+            executor (Executor): The executor encoding the batches. A process pool must
+            use a start method that does not fork a process with running threads, such as
+            'spawn' or 'forkserver'.
+            batch_size (Optional[int]): The number of rows encoded at a time.
+            Default is None, which uses DEFAULT_BATCH_SIZE.
+            compact (bool, optional): Whether to encode the documents compactly, see
+            DataFrameRowDictTransformer. Default is False.
+            field_aliases (Optional[Dict[str, str]]): Short field names replacing the column
+            names in the documents. Default is None, which keeps the column names.
+            integer_columns (Iterable[str], optional): Columns holding only whole numbers,
+            stored as integers in compact documents. Default is (), no integer columns.
+            max_pending (int, optional): The maximum number of batches encoded ahead of the
+            consumer, which bounds the memory of the encoded buffers. About twice the number
+            of workers keeps every worker busy. Default is 2.
+        """
+        super().__init__(input_data=input_df)
+        self.executor = executor
+        self.batch_size = batch_size or DEFAULT_BATCH_SIZE
+        self.compact = compact
+        self.field_aliases = field_aliases or {}
+        self.integer_columns: Tuple[str, ...] = tuple(integer_columns)
+        self.max_pending = max(max_pending, 1)
+
+    def transform(self) -> Iterator[RawBSONDocument]:
+        """
+        Lazily transform the input DataFrame into BSON documents.
+
+        Returns:
+            Iterator[RawBSONDocument]: The documents of the rows, in the order of the rows.
+        """
+        return chain.from_iterable(self.transform_batches())
+
+    def transform_batches(self) -> Iterator[List[RawBSONDocument]]:
+        """
+        Lazily transform the input DataFrame into batches of BSON documents.
+
+        Up to max_pending batches are encoded at once. A batch is yielded when it and all
+        the batches before it are encoded, so the documents keep the order of the rows.
+
+        Yields:
+            List[RawBSONDocument]: The documents of up to batch_size consecutive rows.
+        """
+        pending = deque()
+        for start in range(0, len(self.input_data), self.batch_size):
+            pending.append(self.executor.submit(
+                encode_documents,
+                self.input_data.iloc[start:start + self.batch_size],
+                self.compact,
+                self.field_aliases,
+                self.integer_columns,
+            ))
+            if len(pending) >= self.max_pending:
+                yield split_documents(pending.popleft().result())
+        while pending:
+            yield split_documents(pending.popleft().result())
+
+    def __str__(self) -> str:  # pragma: no cover
+        """
+        String representation of the RawBsonTransformer object.
+
+        Returns:
+            str: The string representation of the RawBsonTransformer object.
+        """
+        return str(self.input_data)
+
+
+def encode_documents(
+        data_frame: pd.DataFrame, compact: bool, field_aliases: Dict[str, str],
+        integer_columns: Tuple[str, ...] = (),
+) -> bytes:
+    """
+    Encode the rows of a DataFrame into consecutive BSON documents. Runs in the workers.
+
+    Args:
+        data_frame (pd.DataFrame): The rows to encode.
+        compact (bool): Whether to encode the documents compactly.
+        field_aliases (Dict[str, str]): Short field names replacing the column names.
+        integer_columns (Tuple[str, ...]): Columns holding only whole numbers.
+
+    Returns:
+        bytes: The BSON documents, each with a new ObjectId as '_id' and the encoding time
+        as MongoDBConfigs.LOADED_AT_FIELD.
+    """
+    loaded_at = datetime.now(timezone.utc)
+    transformer = DataFrameRowDictTransformer(
+        data_frame, batch_size=len(data_frame) or 1, compact=compact,
+        field_aliases=field_aliases, integer_columns=integer_columns,
+    )
+    return b''.join(
+        bson.encode({'_id': ObjectId(), **document, MongoDBConfigs.LOADED_AT_FIELD: loaded_at})
+        for document in transformer.transform()
+    )
+
+
+def split_documents(buffer: bytes) -> List[RawBSONDocument]:
+    """
+    Split a buffer of consecutive BSON documents without decoding their fields.
+
+    Args:
+        buffer (bytes): The BSON documents.
+
+    Returns:
+        List[RawBSONDocument]: The documents, which keep their bytes without decoding them.
+    """
+    return bson.decode_all(buffer, DEFAULT_RAW_BSON_OPTIONS)
@@ -0,0 +1,204 @@
+"""
+run_profiler.py - Module for defining the RunProfiler class.
+
+This module contains the implementation of the RunProfiler class, a context manager that
+profiles a block with cProfile, tracemalloc and a sampling stack profiler, and writes the
+artifacts of the three profilers to a directory.
+
+Classes:
+    RunProfiler: Context manager capturing the CPU, allocation and stack profiles of a block.
+"""
+import cProfile
+import os
+import sys
+import threading
+import tracemalloc
+from collections import Counter
+from types import FrameType
+from typing import Optional
+from loguru import logger
+
+_TRACEMALLOC_FRAMES = 25
+_SNAPSHOT_INTERVAL = 1.0  # seconds between two checks for a new traced memory peak
+
+
+class RunProfiler:  # pylint: disable=too-many-instance-attributes
+    """
+    RunProfiler class for capturing the profiles of a block of code.
+
+    The artifacts are written to the output directory when the block exits, even if it raised:
+
+        <name>.pstats       cProfile statistics of the calling thread, for pstats or snakeviz
+        <name>.alloc.txt    the top allocation sites by size, from the tracemalloc snapshot
+                            taken when the traced memory was highest
+        <name>.collapsed    stacks of every thread sampled every sample_interval seconds, in
+                            the collapsed format of flamegraph.pl and speedscope
+
+    Attributes:
+        output_dir (str): The directory the artifacts are written to.
+        name (str): The base name of the artifacts.
+        sample_interval (float): The number of seconds between two stack samples.
+        top_allocations (int): The number of allocation sites written.
+
+    Methods:
+        __init__(output_dir: str, name: str, sample_interval: float = 0.005,
+        top_allocations: int = 50) -> None:
+            Constructor for the RunProfiler class.
+        __enter__() -> RunProfiler:
+            Start the profilers.
+        __exit__(*exc_info) -> None:
+            Stop the profilers and write the artifacts.
+    """
+
+    def __init__(
+            self, output_dir: str, name: str,
+            sample_interval: float = 0.005,
+            top_allocations: int = 50,
+    ) -> None:
+        """
+        Constructor for the RunProfiler class.
+
+        Args:
+            output_dir (str): The directory the artifacts are written to.
+            name (str): The base name of the artifacts.
+            sample_interval (float): The number of seconds between two stack samples.
+            top_allocations (int): The number of allocation sites written.
+        """
+        self.output_dir = output_dir
+        self.name = name
+        self.sample_interval = sample_interval
+        self.top_allocations = top_allocations
+        self.stack_counts = Counter()
+        self._profile = cProfile.Profile()
+        self._stopped = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self._started_tracemalloc = False
+        self._peak_snapshot: Optional[tracemalloc.Snapshot] = None
+        self._peak_snapshot_size = -1
+
+    def __enter__(self) -> 'RunProfiler':
+        """
+        Start the sampler thread, tracemalloc and cProfile.
+        """
+        self._sampler = threading.Thread(
+            target=self._sample_stacks, name='run-profiler-sampler', daemon=True
+        )
+        self._sampler.start()
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(_TRACEMALLOC_FRAMES)
+            self._started_tracemalloc = True
+        self._profile.enable()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        """
+        Stop the profilers and write the artifacts. Errors while writing are only logged,
+        so profiling never fails the profiled run.
+        """
+        self._profile.disable()
+        self._stopped.set()
+        self._sampler.join()
+        self._snapshot_if_peak()
+        _, peak_size = tracemalloc.get_traced_memory()
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            self._profile.dump_stats(self.path('pstats'))
+            if self._peak_snapshot is not None:
+                self._write_allocations(peak_size)
+            self._write_collapsed_stacks()
+        except OSError as error:
+            logger.warning(f'Could not write the profiles of {self.name}: {error}')
+            return
+        logger.info(f'Wrote the profiles of {self.name} to {self.output_dir}.')
+
+    def path(self, extension: str) -> str:
+        """
+        The path of an artifact.
+
+        Args:
+            extension (str): The extension of the artifact, such as 'pstats'.
+
+        Returns:
+            str: The path of the artifact in the output directory.
+        """
+        return os.path.join(self.output_dir, f'{self.name}.{extension}')
+
+    def _sample_stacks(self) -> None:
+        """
+        Count the stacks of the other threads until the profiler is stopped, and snapshot
+        the traced allocations whenever they reach a new high.
+        """
+        sampler_id = threading.get_ident()
+        samples_per_snapshot = max(int(_SNAPSHOT_INTERVAL / self.sample_interval), 1)
+        sample_count = 0
+        while not self._stopped.wait(self.sample_interval):
+            thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+            frames = sys._current_frames()  # pylint: disable=protected-access
+            for thread_id, frame in frames.items():
+                if thread_id == sampler_id:
+                    continue
+                thread_name = thread_names.get(thread_id, str(thread_id))
+                self.stack_counts[self._collapse(thread_name, frame)] += 1
+
+            sample_count += 1
+            if sample_count % samples_per_snapshot == 0:
+                self._snapshot_if_peak()
+
+    def _snapshot_if_peak(self) -> None:
+        """
+        Take a tracemalloc snapshot if the traced memory is higher than at the last one.
+        """
+        if not tracemalloc.is_tracing():
+            return
+        current_size, _ = tracemalloc.get_traced_memory()
+        if current_size > self._peak_snapshot_size:
+            self._peak_snapshot = tracemalloc.take_snapshot()
+            self._peak_snapshot_size = current_size
+
+    @staticmethod
+    def _collapse(thread_name: str, frame: Optional[FrameType]) -> str:
+        """
+        A stack as semicolon separated frames, from the thread's root frame to the leaf.
+        """
+        frames = []
+        while frame is not None:
+            code = frame.f_code
+            frames.append(
+                f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+            )
+            frame = frame.f_back
+        frames.append(thread_name)
+        return ';'.join(reversed(frames)).replace(' ', '_')
+
+    def _write_allocations(self, peak_size: int) -> None:
+        """
+        Write the top allocation sites of the peak snapshot with their tracebacks.
+        """
+        snapshot = self._peak_snapshot.filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ])
+        statistics = snapshot.statistics('traceback')
+        with open(self.path('alloc.txt'), 'w', encoding='utf-8') as allocations_file:
+            allocations_file.write(
+                f'Peak traced memory: {peak_size / 2 ** 20:.1f} MiB\n'
+                f'Traced memory at the snapshot: {self._peak_snapshot_size / 2 ** 20:.1f} MiB\n'
+            )
+            for rank, statistic in enumerate(statistics[:self.top_allocations], start=1):
+                allocations_file.write(
+                    f'\n#{rank}: {statistic.size / 2 ** 10:.1f} KiB '
+                    f'in {statistic.count} blocks\n'
+                )
+                for line in statistic.traceback.format(most_recent_first=True):
+                    allocations_file.write(f'{line}\n')
+
+    def _write_collapsed_stacks(self) -> None:
+        """
+        Write the sampled stacks in the collapsed format, one 'stack count' line per stack.
+        """
+        with open(self.path('collapsed'), 'w', encoding='utf-8') as collapsed_file:
+            for stack, count in self.stack_counts.most_common():
+                collapsed_file.write(f'{stack} {count}\n')
@@ -0,0 +1,145 @@
+"""
+shard_planner.py - Module for defining the ShardPlanner class.
+
+This module contains the implementation of the ShardPlanner class, which splits the ETL work
+of a set of CSV files into tasks of similar size. Large files are split into byte ranges
+that start and end on record boundaries, and small files are grouped into shared tasks.
+
+Classes:
+    ShardPlanner: A planner of the ETL tasks of CSV files by file size.
+"""
+import os
+from typing import Dict, List
+
+_SCAN_BLOCK_SIZE = 1 << 20  # bytes
+
+
+class ShardPlanner:
+    """
+    ShardPlanner class for planning the ETL tasks of CSV files by their size.
+
+    A file larger than target_bytes is split into byte ranges of about target_bytes, each
+    parsed and loaded by its own task. Files smaller than small_file_bytes are packed into
+    groups of up to target_bytes loaded by a single task. Every other file gets a task.
+
+    Attributes:
+        target_bytes (int): The target number of CSV bytes per task.
+        small_file_bytes (int): The size under which files are grouped.
+
+    Methods:
+        __init__(target_bytes: int, small_file_bytes: int) -> None:
+            Constructor for the ShardPlanner class.
+        plan(file_paths: List[str]) -> List[Dict]:
+            Plan the tasks of the files.
+        record_boundaries(file_path: str, offsets: List[int]) -> List[int]:
+            Find the record boundaries following the given byte offsets.
+    """
+
+    def __init__(self, target_bytes: int, small_file_bytes: int) -> None:
+        """
+        Constructor for the ShardPlanner class.
+
+        Args:
+            target_bytes (int): The target number of CSV bytes per task.
+            small_file_bytes (int): The size under which files are grouped.
+        """
+        self.target_bytes = target_bytes
+        self.small_file_bytes = small_file_bytes
+
+    def plan(self, file_paths: List[str]) -> List[Dict]:
+        """
+        Plan the tasks of the files, largest tasks first.
+
+        Args:
+            file_paths (List[str]): The paths of the CSV files.
+
+        Returns:
+            List[Dict]: The App.run keyword arguments of every task: 'file_paths', and
+            'byte_range' for the shards of a split file.
+        """
+        sized_paths = sorted(
+            ((os.path.getsize(file_path), file_path) for file_path in file_paths),
+            key=lambda sized_path: -sized_path[0],
+        )
+        tasks = []
+        groups: List[List] = []
+        for size, file_path in sized_paths:
+            if size > self.target_bytes:
+                tasks.extend(self._shards(file_path, size))
+            elif size >= self.small_file_bytes:
+                tasks.append({'file_paths': [file_path]})
+            else:
+                self._add_to_group(groups, size, file_path)
+
+        tasks.extend({'file_paths': group[1]} for group in groups)
+        return tasks
+
+    def _shards(self, file_path: str, size: int) -> List[Dict]:
+        """
+        Split a file into byte ranges of about target_bytes.
+        """
+        shard_count = -(-size // self.target_bytes)
+        offsets = [size * index // shard_count for index in range(1, shard_count)]
+        boundaries = [0] + self.record_boundaries(file_path, offsets) + [size]
+        return [
+            {'file_paths': [file_path], 'byte_range': [start, end]}
+            for start, end in zip(boundaries, boundaries[1:])
+            if start < end
+        ]
+
+    def _add_to_group(self, groups: List[List], size: int, file_path: str) -> None:
+        """
+        Add a small file to the first group with room for it, or to a new group.
+        """
+        for group in groups:
+            if group[0] + size <= self.target_bytes:
+                group[0] += size
+                group[1].append(file_path)
+                return
+        groups.append([size, [file_path]])
+
+    @staticmethod
+    def record_boundaries(file_path: str, offsets: List[int]) -> List[int]:
+        """
+        Find the record boundaries following the given byte offsets.
+
+        A boundary is the position after a line feed that is outside any quoted field, so
+        quoted fields spanning lines are never split. Whether a line feed is quoted follows
+        from the parity of the quote characters before it, which is tracked while the file
+        is scanned once in large blocks. Escaped quotes are doubled in CSV, so they do not
+        change the parity.
+
+        Args:
+            file_path (str): The path of the CSV file.
+            offsets (List[int]): The byte offsets, in ascending order.
+
+        Returns:
+            List[int]: The distinct boundaries, in ascending order. Offsets without a record
+            boundary after them have none.
+        """
+        boundaries = []
+        pending_offsets = iter(offsets)
+        seek_offset = next(pending_offsets, None)
+        block_start = 0
+        quote_parity = 0
+        with open(file_path, 'rb') as csv_file:
+            while seek_offset is not None and (block := csv_file.read(_SCAN_BLOCK_SIZE)):
+                position = max(seek_offset - block_start, 0)
+                while seek_offset is not None and position < len(block):
+                    line_end = block.find(b'\n', position)
+                    if line_end == -1:
+                        break
+                    position = line_end + 1
+                    if (quote_parity + block.count(b'"', 0, line_end)) % 2:
+                        continue
+
+                    boundary = block_start + position
+                    boundaries.append(boundary)
+                    while seek_offset is not None and seek_offset < boundary:
+                        seek_offset = next(pending_offsets, None)
+                    if seek_offset is not None:
+                        position = max(seek_offset - block_start, position)
+
+                quote_parity = (quote_parity + block.count(b'"')) % 2
+                block_start += len(block)
+        return boundaries
@@ -0,0 +1,407 @@
+"""
+staged_pipeline.py - Module for defining the StagedPipeline class.
+
+This module contains the implementation of the StagedPipeline class, which runs the items of
+a source through a chain of stages, each with its own worker threads, connected by bounded
+queues. A byte budget limits the source items in flight, so a slow last stage, such as a
+loader waiting for MongoDB, throttles the source instead of letting the queues grow.
+
+Classes:
+    Stage: A step of a staged pipeline.
+    StageReport: The measurements of a stage.
+    StagedPipeline: A runner of a source through stages.
+"""
+import queue
+import threading
+import time
+from dataclasses import dataclass, fields
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional
+from loguru import logger
+
+SOURCE_STAGE = 'source'  # the report name of the iteration of the source
+_STAGE_DONE = object()
+_POLL_TIMEOUT = 0.1  # seconds
+
+
+@dataclass
+class Stage:
+    """
+    A step of a staged pipeline.
+
+    Attributes:
+        name (str): The name of the stage in the reports.
+        process (Callable[[Any], Optional[Iterable]]): Processes an input item and returns
+            the items passed to the next stage, or None. The outputs of the last stage are
+            iterated and dropped. With several workers it is called concurrently.
+        workers (int): The number of threads running the stage.
+        queue_size (int): The maximum number of items waiting for the stage.
+    """
+    name: str
+    process: Callable[[Any], Optional[Iterable]]
+    workers: int = 1
+    queue_size: int = 2
+
+
+@dataclass
+class StageReport:
+    """
+    The measurements of a stage, summed over its workers.
+
+    Attributes:
+        items (int): The number of input items processed.
+        outputs (int): The number of items passed to the next stage.
+        bytes (int): The source bytes of the processed items, counted by the source only.
+        busy_seconds (float): The time spent processing items.
+        cpu_seconds (float): The CPU time of the worker threads while processing items.
+        idle_seconds (float): The time spent waiting for input items.
+        blocked_seconds (float): The time spent waiting for room in the next queue or, for
+            the source, in the byte budget. A high value means a later stage is slower.
+    """
+    items: int = 0
+    outputs: int = 0
+    bytes: int = 0
+    busy_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    idle_seconds: float = 0.0
+    blocked_seconds: float = 0.0
+
+    @property
+    def items_per_sec(self) -> float:
+        """
+        The throughput of the stage.
+
+        Returns:
+            float: The items per second of busy time, 0.0 when no time was measured.
+        """
+        return self.items / self.busy_seconds if self.busy_seconds else 0.0
+
+    def add(self, other: 'StageReport') -> None:
+        """
+        Add the measurements of another worker of the stage.
+
+        Args:
+            other (StageReport): The measurements to add.
+        """
+        for field in fields(self):
+            setattr(self, field.name, getattr(self, field.name) + getattr(other, field.name))
+
+
+class _Charge:  # pylint: disable=too-few-public-methods
+    """
+    The bytes of a source item, released once the item and all the items derived from it
+    were processed, and the key the item and its derived items are reported under.
+    """
+
+    def __init__(self, nbytes: int, key: Hashable = None) -> None:
+        self.nbytes = nbytes
+        self.key = key
+        self.pending = 1
+
+
+class StagedPipeline:  # pylint: disable=too-many-instance-attributes,too-few-public-methods
+    """
+    StagedPipeline class for running the items of a source through stages.
+
+    Every stage has a bounded input queue and its own worker threads. The source is
+    iterated in the calling thread, and every source item is charged its size against the
+    byte budget until it and all the items derived from it by the stages were processed.
+    When the budget is spent the source waits, so memory stays bounded by the budget and
+    the queue sizes even when the last stage is the slowest. An item larger than the whole
+    budget is admitted once nothing else is in flight.
+
+    Items are processed in the order they are queued, but with several workers per stage
+    they can reach the next stage in a different order.
+
+    The first error raised by the source or a stage stops the pipeline: the workers finish
+    their current item and the queued items are dropped.
+
+    Attributes:
+        stages (List[Stage]): The stages, in processing order.
+        max_inflight_bytes (Optional[int]): The byte budget of the source items in flight.
+        size_of (Callable[[Any], int]): The size of a source item in bytes.
+        key_of (Optional[Callable[[Any], Hashable]]): The key of a source item.
+        reports (Dict[str, StageReport]): The measurements of the last run per stage name,
+            starting with SOURCE_STAGE.
+        reports_by_key (Dict[Hashable, Dict[str, StageReport]]): The measurements of the
+            last run per source item key and stage name, empty without key_of. The waits
+            for input items are not attributed to a key.
+
+    Methods:
+        run(items: Iterable) -> Dict[str, StageReport]:
+            Run the items through the stages.
+    """
+
+    def __init__(
+            self, stages: List[Stage],
+            max_inflight_bytes: Optional[int] = None,
+            size_of: Optional[Callable[[Any], int]] = None,
+            key_of: Optional[Callable[[Any], Hashable]] = None,
+    ) -> None:
+        """
+        Constructor for the StagedPipeline class.
+
+        Args:
+            stages (List[Stage]): The stages, in processing order, at least one.
+            max_inflight_bytes (Optional[int]): The byte budget of the source items in
+            flight. Default is None, which only bounds the queues.
+            size_of (Optional[Callable[[Any], int]]): The size of a source item in bytes.
+            Default is None, which sizes every item as 0 bytes.
+            key_of (Optional[Callable[[Any], Hashable]]): The key of a source item, such as
+            its file, to also report the stages per key. The items derived from a source
+            item are reported under its key. Default is None, which only reports the totals.
+        """
+        if not stages:
+            raise ValueError('A staged pipeline needs at least one stage.')
+        self.stages = stages
+        self.max_inflight_bytes = max_inflight_bytes
+        self.size_of = size_of or (lambda item: 0)
+        self.key_of = key_of
+        self.reports: Dict[str, StageReport] = {}
+        self.reports_by_key: Dict[Hashable, Dict[str, StageReport]] = {}
+
+        self._queues: List[queue.Queue] = []
+        self._stopped = threading.Event()
+        self._errors: List[BaseException] = []
+        self._lock = threading.Lock()
+        self._budget = threading.Condition(self._lock)
+        self._inflight_bytes = 0
+        self._running_workers: List[int] = []
+
+    def run(self, items: Iterable) -> Dict[str, StageReport]:
+        """
+        Run the items of a source through the stages and wait until all are processed.
+
+        Args:
+            items (Iterable): The source items, iterated in the calling thread.
+
+        Returns:
+            Dict[str, StageReport]: The measurements of the source and of every stage.
+
+        Raises:
+            Exception: The first error raised by the source or by a stage.
+        """
+        self._queues = [queue.Queue(maxsize=max(stage.queue_size, 1)) for stage in self.stages]
+        self._stopped.clear()
+        self._errors = []
+        self._inflight_bytes = 0
+        self._running_workers = [max(stage.workers, 1) for stage in self.stages]
+        self.reports = self._new_reports()
+        self.reports_by_key = {}
+
+        threads = [
+            threading.Thread(
+                target=self._work, args=(index,), name=f'pipeline-{stage.name}-{worker}',
+                daemon=True,
+            )
+            for index, stage in enumerate(self.stages)
+            for worker in range(self._running_workers[index])
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            self._feed(items)
+        except BaseException as error:  # pylint: disable=broad-exception-caught
+            self._fail(error)
+        finally:
+            self._finish_stage(-1)
+            for thread in threads:
+                thread.join()
+
+        logger.info(f'Staged pipeline reports: {self.reports}')
+        if self._errors:
+            raise self._errors[0]
+        return self.reports
+
+    def _feed(self, items: Iterable) -> None:
+        """
+        Iterate the source, charging every item against the byte budget, and queue the items
+        for the first stage.
+        """
+        report = StageReport()
+        key_reports: Dict[Hashable, StageReport] = {}
+        try:
+            iterator = iter(items)
+            while not self._stopped.is_set():
+                started, cpu_started = time.perf_counter(), time.thread_time()
+                item = next(iterator, _STAGE_DONE)
+                item_report = StageReport(
+                    busy_seconds=time.perf_counter() - started,
+                    cpu_seconds=time.thread_time() - cpu_started,
+                )
+                if item is _STAGE_DONE:
+                    report.add(item_report)
+                    return
+                charge = _Charge(
+                    self.size_of(item), self.key_of(item) if self.key_of is not None else None
+                )
+                started = time.perf_counter()
+                admitted = self._acquire(charge.nbytes) and self._put(0, (item, charge))
+                item_report.blocked_seconds = time.perf_counter() - started
+                if admitted:
+                    item_report.items = item_report.outputs = 1
+                    item_report.bytes = charge.nbytes
+                self._add_item_report(report, key_reports, charge.key, item_report)
+                if not admitted:
+                    return
+        finally:
+            self._add_report(SOURCE_STAGE, report, key_reports)
+
+    def _work(self, index: int) -> None:
+        """
+        Process the items queued for a stage until its input is done or the pipeline stops.
+        """
+        stage = self.stages[index]
+        last = index == len(self.stages) - 1
+        report = StageReport()
+        key_reports: Dict[Hashable, StageReport] = {}
+        try:
+            while not self._stopped.is_set():
+                started = time.perf_counter()
+                try:
+                    entry = self._queues[index].get(timeout=_POLL_TIMEOUT)
+                except queue.Empty:
+                    report.idle_seconds += time.perf_counter() - started
+                    continue
+                report.idle_seconds += time.perf_counter() - started
+                if entry is _STAGE_DONE:
+                    return
+                item, charge = entry
+                item_report = StageReport()
+                try:
+                    self._process(index, stage, item, charge, last, item_report)
+                finally:
+                    self._release(charge)
+                    self._add_item_report(report, key_reports, charge.key, item_report)
+        except BaseException as error:  # pylint: disable=broad-exception-caught
+            self._fail(error)
+        finally:
+            self._add_report(stage.name, report, key_reports)
+            self._finish_stage(index)
+
+    def _process(  # pylint: disable=too-many-arguments,too-many-positional-arguments
+            self, index: int, stage: Stage, item: Any, charge: _Charge, last: bool,
+            report: StageReport,
+    ) -> None:
+        """
+        Process an item and queue its outputs for the next stage, measuring the stage.
+        """
+        started, cpu_started = time.perf_counter(), time.thread_time()
+        outputs = iter(stage.process(item) or ())
+        while True:
+            try:
+                output = next(outputs)
+            except StopIteration:
+                break
+            finally:
+                report.busy_seconds += time.perf_counter() - started
+                report.cpu_seconds += time.thread_time() - cpu_started
+            if not last:
+                with self._lock:
+                    charge.pending += 1
+                blocked = time.perf_counter()
+                if not self._put(index + 1, (output, charge)):
+                    self._release(charge)
+                    return
+                report.blocked_seconds += time.perf_counter() - blocked
+                report.outputs += 1
+            started, cpu_started = time.perf_counter(), time.thread_time()
+        report.items += 1
+        report.bytes += charge.nbytes
+
+    def _put(self, index: int, entry: Any) -> bool:
+        """
+        Queue an entry for a stage, waiting for room unless the pipeline stops.
+
+        Returns:
+            bool: False if the pipeline stopped before the entry was queued.
+        """
+        while not self._stopped.is_set():
+            try:
+                self._queues[index].put(entry, timeout=_POLL_TIMEOUT)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _acquire(self, nbytes: int) -> bool:
+        """
+        Wait until the byte budget has room for a source item, unless the pipeline stops.
+
+        Returns:
+            bool: False if the pipeline stopped before the bytes were charged.
+        """
+        with self._budget:
+            while (
+                    self.max_inflight_bytes is not None
+                    and self._inflight_bytes
+                    and self._inflight_bytes + nbytes > self.max_inflight_bytes
+            ):
+                if self._stopped.is_set():
+                    return False
+                self._budget.wait(_POLL_TIMEOUT)
+            self._inflight_bytes += nbytes
+            return not self._stopped.is_set()
+
+    def _release(self, charge: _Charge) -> None:
+        """
+        Mark an item derived from a source item as processed, and return the bytes of the
+        source item to the budget once all its items were processed.
+        """
+        with self._budget:
+            charge.pending -= 1
+            if not charge.pending:
+                self._inflight_bytes -= charge.nbytes
+                self._budget.notify_all()
+
+    def _finish_stage(self, index: int) -> None:
+        """
+        Count a finished worker of a stage, -1 for the source, and tell the workers of the
+        next stage that their input is done once the last worker of the stage finished.
+        """
+        with self._lock:
+            if index >= 0:
+                self._running_workers[index] -= 1
+                if self._running_workers[index]:
+                    return
+        if index + 1 < len(self.stages):
+            for _ in range(max(self.stages[index + 1].workers, 1)):
+                self._put(index + 1, _STAGE_DONE)
+
+    def _fail(self, error: BaseException) -> None:
+        """
+        Record an error and stop the pipeline.
+        """
+        with self._lock:
+            self._errors.append(error)
+        self._stopped.set()
+
+    def _add_item_report(
+            self, report: StageReport, key_reports: Dict[Hashable, StageReport],
+            key: Hashable, item_report: StageReport,
+    ) -> None:
+        """
+        Add the measurements of an item to the report of a worker and, with key_of, to the
+        report of the item's key.
+        """
+        report.add(item_report)
+        if self.key_of is not None:
+            key_reports.setdefault(key, StageReport()).add(item_report)
+
+    def _add_report(
+            self, name: str, report: StageReport, key_reports: Dict[Hashable, StageReport]
+    ) -> None:
+        """
+        Add the measurements of a worker to the reports of its stage.
+        """
+        with self._lock:
+            self.reports[name].add(report)
+            for key, key_report in key_reports.items():
+                self.reports_by_key.setdefault(key, self._new_reports())[name].add(key_report)
+
+    def _new_reports(self) -> Dict[str, StageReport]:
+        """
+        Empty reports of the source and of every stage.
+        """
+        reports = {SOURCE_STAGE: StageReport()}
+        reports.update((stage.name, StageReport()) for stage in self.stages)
+        return reports
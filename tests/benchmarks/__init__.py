@@ -0,0 +1,3 @@
+"""
+ETL benchmark suite, run with python -m tests.benchmarks.run
+"""
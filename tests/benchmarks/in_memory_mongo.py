@@ -0,0 +1,132 @@
+"""
+Module for defining an in-memory stand-in of MongoClient for the benchmarks.
+
+Inserted documents are BSON encoded like the driver does before sending them, so the
+benchmarks include the serialization cost of a load without a running server.
+"""
+from typing import Dict, List
+
+import bson
+from bson import ObjectId
+from bson.raw_bson import RawBSONDocument
+
+
+class InMemoryCollection:
+    """
+    A collection keeping BSON encoded documents by _id.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.documents: Dict = {}
+        self.indexes: Dict[str, List] = {'_id_': [('_id', 1)]}
+
+    def with_options(self, **_):
+        """
+        The collection itself, since the options do not change an in-memory write.
+        """
+        return self
+
+    def index_information(self) -> Dict:
+        """
+        The keys of the indexes by index name.
+        """
+        return {name: {'key': keys} for name, keys in self.indexes.items()}
+
+    def create_index(self, keys, name: str, **_) -> str:
+        """
+        Records an index and returns its name.
+        """
+        self.indexes[name] = keys
+        return name
+
+    def create_indexes(self, index_models) -> List[str]:
+        """
+        Records the indexes of pymongo IndexModels and returns their names.
+        """
+        names = []
+        for index_model in index_models:
+            document = index_model.document
+            names.append(self.create_index(list(document['key'].items()), document['name']))
+        return names
+
+    def drop_index(self, name: str) -> None:
+        """
+        Removes an index by name.
+        """
+        del self.indexes[name]
+
+    def insert_many(self, documents, ordered: bool = True) -> None:
+        """
+        Stores the documents BSON encoded, giving the ones without an _id an ObjectId.
+        """
+        # pylint: disable=unused-argument
+        for document in documents:
+            if isinstance(document, RawBSONDocument):
+                # pre-encoded documents are sent as they are
+                self.documents[document['_id']] = document.raw
+                continue
+            document.setdefault('_id', ObjectId())
+            self.documents[document['_id']] = bson.encode(document)
+
+    def find(self, query: Dict, projection: Dict = None):  # pylint: disable=unused-argument
+        """
+        Finds the documents of an _id $in query.
+        """
+        document_ids = query.get('_id', {}).get('$in', [])
+        return [
+            bson.decode(self.documents[document_id])
+            for document_id in document_ids
+            if document_id in self.documents
+        ]
+
+    def bulk_write(self, requests, ordered: bool = True) -> None:
+        """
+        Stores the documents of the replace requests BSON encoded.
+        """
+        # pylint: disable=unused-argument
+        for request in requests:
+            document = request._doc  # pylint: disable=protected-access
+            self.documents[document['_id']] = bson.encode(document)
+
+    def update_one(self, query: Dict, update: Dict, upsert: bool = False) -> None:
+        """
+        Applies the $inc of an update to a document, creating it when missing.
+        """
+        # pylint: disable=unused-argument
+        document = bson.decode(self.documents.get(query['_id'], bson.encode(query)))
+        for field, increment in update.get('$inc', {}).items():
+            document[field] = document.get(field, 0) + increment
+        self.documents[query['_id']] = bson.encode(document)
+
+
+class InMemoryMongoClient:
+    """
+    A MongoClient stand-in whose databases and collections live in memory.
+    """
+
+    def __init__(self, *_, **__) -> None:
+        self.databases: Dict[str, Dict[str, InMemoryCollection]] = {}
+
+    def __getitem__(self, database_name: str) -> 'InMemoryDatabase':
+        return InMemoryDatabase(self.databases.setdefault(database_name, {}))
+
+    def close(self) -> None:
+        """
+        Drops the databases of the client.
+        """
+        self.databases.clear()
+
+
+class InMemoryDatabase:  # pylint: disable=too-few-public-methods
+    """
+    A database of in-memory collections.
+    """
+
+    def __init__(self, collections: Dict[str, InMemoryCollection]) -> None:
+        self.collections = collections
+
+    def __getitem__(self, collection_name: str) -> InMemoryCollection:
+        if collection_name not in self.collections:
+            self.collections[collection_name] = InMemoryCollection(collection_name)
+        return self.collections[collection_name]
@@ -0,0 +1,221 @@
+"""
+Module for running the ETL benchmarks against stored baselines.
+
+Every stage of the ETL is timed on synthetic CSV files:
+
+    extract     CsvFileSource.load with the registered schema
+    transform   DataFrameRowDictTransformer.transform
+    load        MongoDBLoader.load into an in-memory MongoClient stand-in
+
+The rows per second of a stage are its best of --repeat runs, its peak memory is measured
+with tracemalloc in one additional run. tracemalloc sees the Python and numpy allocations
+but not the buffers allocated by pyarrow. A stage that is more than --tolerance slower, or
+uses more than --tolerance more memory, than its baseline fails the run. The baselines are
+only compared with results of the same configuration, which includes the host's CPU, so
+numbers recorded on another machine are never taken for a regression.
+
+Usage:
+    python -m tests.benchmarks.run
+    python -m tests.benchmarks.run --rows 200000 --extra-columns 20
+    python -m tests.benchmarks.run --update-baselines
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+from unittest import mock
+
+from src.configs.csv_schemas import CsvSchemaConfigs
+from src.models.csv_file_source import CsvFileSource
+from src.models.df_transformer import DataFrameRowDictTransformer
+from src.models.mongo_client_registry import client_registry
+from src.models.mongodb_loader import MongoDBLoader, MongoDBStorage
+from tests.benchmarks.in_memory_mongo import InMemoryMongoClient
+from tests.benchmarks.synthetic_data import generate_csv_files
+
+BASELINES_PATH = os.path.join(os.path.dirname(__file__), 'baselines.json')
+DEFAULT_FILES = ['objects.csv', 'funding_rounds.csv', 'investments.csv']
+STAGES = ('extract', 'transform', 'load')
+
+
+def host_info() -> Dict[str, object]:
+    """
+    Describe the machine the benchmarks run on.
+    """
+    processor = platform.processor()
+    if os.path.exists('/proc/cpuinfo'):
+        with open('/proc/cpuinfo', encoding='utf-8') as cpuinfo_file:
+            for line in cpuinfo_file:
+                if line.startswith('model name'):
+                    processor = line.partition(':')[2].strip()
+                    break
+    return {
+        'machine': platform.machine(),
+        'processor': processor,
+        'cpus': os.cpu_count(),
+        'python': platform.python_version(),
+    }
+
+
+def run_stages(file_path: str, chunk_size: int) -> Dict[str, Callable[[], int]]:
+    """
+    Build the stage callables of a file. Every callable runs its stage on the output of the
+    previous stage and returns the number of processed rows.
+    """
+    outputs = {}
+
+    def extract() -> int:
+        outputs['data_frame'] = CsvFileSource(
+            file_path, schema=CsvSchemaConfigs.get(file_path)
+        ).load()
+        return len(outputs['data_frame'])
+
+    def transform() -> int:
+        outputs['documents'] = list(DataFrameRowDictTransformer(outputs['data_frame']).transform())
+        return len(outputs['documents'])
+
+    def load() -> int:
+        # a fresh in-memory client per run, so earlier runs do not grow the collection
+        client_registry.clear()
+        storage = MongoDBStorage(
+            collection_name=os.path.splitext(os.path.basename(file_path))[0],
+        )
+        loader = MongoDBLoader(mongo_storage=storage, chunk_size=chunk_size)
+        # insert_many adds an _id to the documents, so every run loads fresh copies
+        loader.load(dict(document) for document in outputs['documents'])
+        loader.close()
+        return len(outputs['documents'])
+
+    return {'extract': extract, 'transform': transform, 'load': load}
+
+
+def benchmark(file_paths: List[str], repeat: int, chunk_size: int) -> Dict[str, Dict]:
+    """
+    Time every stage on every file and measure the peak memory of the stages.
+
+    Returns:
+        Dict[str, Dict]: The rows, best seconds, rows per second and peak memory in MiB of
+        every stage, summed over the files.
+    """
+    results = {stage: {'rows': 0, 'seconds': 0.0, 'peak_mib': 0.0} for stage in STAGES}
+    with mock.patch('src.models.mongo_client_registry.MongoClient', InMemoryMongoClient):
+        for file_path in file_paths:
+            stages = run_stages(file_path, chunk_size)
+            best_seconds = dict.fromkeys(STAGES, float('inf'))
+            rows = dict.fromkeys(STAGES, 0)
+            for _ in range(repeat):
+                for stage in STAGES:
+                    start_time = time.perf_counter()
+                    rows[stage] = stages[stage]()
+                    best_seconds[stage] = min(
+                        best_seconds[stage], time.perf_counter() - start_time
+                    )
+
+            for stage in STAGES:
+                tracemalloc.start()
+                stages[stage]()
+                _, peak_bytes = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                results[stage]['rows'] += rows[stage]
+                results[stage]['seconds'] += best_seconds[stage]
+                results[stage]['peak_mib'] = max(results[stage]['peak_mib'], peak_bytes / 2 ** 20)
+
+    for result in results.values():
+        result['rows_per_sec'] = round(result['rows'] / result['seconds'], 1)
+        result['seconds'] = round(result['seconds'], 4)
+        result['peak_mib'] = round(result['peak_mib'], 2)
+    return results
+
+
+def compare(results: Dict[str, Dict], baselines: Dict[str, Dict], tolerance: float) -> List[str]:
+    """
+    Compare the results with the baselines.
+
+    Returns:
+        List[str]: A description of every regression.
+    """
+    regressions = []
+    for stage, baseline in baselines.items():
+        result = results[stage]
+        if result['rows_per_sec'] < baseline['rows_per_sec'] * (1 - tolerance):
+            regressions.append(
+                f"{stage}: {result['rows_per_sec']} rows/sec, "
+                f"baseline {baseline['rows_per_sec']} rows/sec"
+            )
+        if result['peak_mib'] > baseline['peak_mib'] * (1 + tolerance):
+            regressions.append(
+                f"{stage}: {result['peak_mib']} MiB peak, baseline {baseline['peak_mib']} MiB"
+            )
+    return regressions
+
+
+def main() -> int:
+    """
+    Parse the command-line arguments, run the benchmarks and compare them with the baselines.
+
+    Returns:
+        int: The exit code, 1 when a stage regressed.
+    """
+    parser = argparse.ArgumentParser(description='ETL benchmarks.')
+    parser.add_argument('--rows', type=int, default=20000, help='Rows per generated file.')
+    parser.add_argument(
+        '--extra-columns', type=int, default=0, help='Additional text columns per file.'
+    )
+    parser.add_argument(
+        '--files', default=','.join(DEFAULT_FILES), help='Comma separated registered files.'
+    )
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per stage.')
+    parser.add_argument('--chunk-size', type=int, default=1000, help='Loader chunk size.')
+    parser.add_argument('--baselines', default=BASELINES_PATH, help='Baselines JSON file.')
+    parser.add_argument(
+        '--tolerance', type=float, default=0.25, help='Allowed fraction of slowdown.'
+    )
+    parser.add_argument(
+        '--update-baselines', action='store_true', help='Store the results as the baselines.'
+    )
+    args = parser.parse_args()
+
+    config = {
+        'rows': args.rows,
+        'extra_columns': args.extra_columns,
+        'files': args.files.split(','),
+        'chunk_size': args.chunk_size,
+        'repeat': args.repeat,
+        'host': host_info(),
+    }
+    with tempfile.TemporaryDirectory() as folder:
+        file_paths = generate_csv_files(
+            folder, config['files'], args.rows, args.extra_columns
+        )
+        results = benchmark(file_paths, args.repeat, args.chunk_size)
+    print(json.dumps({'config': config, 'results': results}, indent=4))
+
+    if args.update_baselines:
+        with open(args.baselines, 'w', encoding='utf-8') as baselines_file:
+            json.dump({'config': config, 'results': results}, baselines_file, indent=4)
+            baselines_file.write('\n')
+        print(f'Stored the baselines in {args.baselines}.')
+        return 0
+
+    if not os.path.exists(args.baselines):
+        print(f'No baselines at {args.baselines}, run with --update-baselines.')
+        return 0
+    with open(args.baselines, encoding='utf-8') as baselines_file:
+        baselines = json.load(baselines_file)
+    if baselines['config'] != config:
+        print('The baselines were recorded with another configuration, not comparing.')
+        return 0
+
+    regressions = compare(results, baselines['results'], args.tolerance)
+    for regression in regressions:
+        print(f'REGRESSION {regression}', file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
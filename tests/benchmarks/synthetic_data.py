@@ -0,0 +1,98 @@
+"""
+Module for generating synthetic CSV files shaped like the startup investments data.
+
+The columns, dtypes, categorical and date columns of a file are taken from its entry in
+CsvSchemaConfigs, so the generated files exercise the same parsing paths as the real data.
+"""
+import os
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from src.configs.csv_schemas import CsvSchemaConfigs
+
+_WORDS = np.array([
+    'ai', 'platform', 'startup', 'biotech', 'fintech', 'series', 'seed', 'round', 'raises',
+    'acquires', 'cloud', 'mobile', 'health', 'data', 'network', 'energy', 'retail', 'media',
+    'software', 'hardware', 'security', 'market', 'global', 'investors', 'capital', 'labs',
+])
+_CATEGORIES = np.array(['a', 'b', 'c', 'd', 'e', 'f', 'g', 'h'])
+_START_DATE = np.datetime64('2000-01-01')
+
+
+def generate_data_frame(
+        file_name: str, rows: int, extra_columns: int = 0, seed: int = 0
+) -> pd.DataFrame:
+    """
+    Generate the rows of a registered file.
+
+    Args:
+        file_name (str): A file name registered in CsvSchemaConfigs, such as 'objects.csv'.
+        rows (int): The number of rows.
+        extra_columns (int): The number of additional free text columns, to vary the width.
+        seed (int): The seed of the random generator.
+
+    Returns:
+        pd.DataFrame: The generated rows.
+    """
+    schema = CsvSchemaConfigs.SCHEMAS[file_name]
+    random = np.random.default_rng(seed)
+    columns = list(schema.usecols) + [f'extra_{index}' for index in range(extra_columns)]
+
+    data = {}
+    for column in columns:
+        if column in schema.date_columns:
+            days = random.integers(0, 8000, rows)
+            values = (_START_DATE + days).astype(str).astype(object)
+        elif column in schema.categorical_columns:
+            values = _CATEGORIES[random.integers(0, len(_CATEGORIES), rows)]
+        elif column in schema.integer_columns:
+            values = random.integers(0, 100, rows).astype(float)
+        elif schema.dtypes.get(column) == 'float64':
+            values = random.lognormal(10, 2, rows).round(2)
+        elif column in ('id', 'object_id') or column.endswith('_id'):
+            values = np.char.add('c:', random.integers(1, rows * 10, rows).astype(str))
+        else:
+            values = _sentences(random, rows)
+        values = pd.Series(values, dtype=object)
+        values[random.random(rows) < 0.1] = None
+        data[column] = values
+    if 'id' in data:
+        data['id'] = [f'r:{index}' for index in range(rows)]
+    return pd.DataFrame(data)
+
+
+def generate_csv_files(
+        folder: str, file_names: List[str], rows: int, extra_columns: int = 0, seed: int = 0
+) -> List[str]:
+    """
+    Write generated CSV files of the given registered file names to a folder.
+
+    Args:
+        folder (str): The folder the files are written to.
+        file_names (List[str]): File names registered in CsvSchemaConfigs.
+        rows (int): The number of rows of every file.
+        extra_columns (int): The number of additional free text columns.
+        seed (int): The seed of the random generator.
+
+    Returns:
+        List[str]: The paths of the written files.
+    """
+    os.makedirs(folder, exist_ok=True)
+    file_paths = []
+    for offset, file_name in enumerate(file_names):
+        file_path = os.path.join(folder, file_name)
+        generate_data_frame(file_name, rows, extra_columns, seed + offset).to_csv(
+            file_path, index=False
+        )
+        file_paths.append(file_path)
+    return file_paths
+
+
+def _sentences(random: np.random.Generator, rows: int) -> np.ndarray:
+    """
+    Random short sentences of the vocabulary.
+    """
+    words = _WORDS[random.integers(0, len(_WORDS), (rows, 6))]
+    return np.array([' '.join(row) for row in words], dtype=object)
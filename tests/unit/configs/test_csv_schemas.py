@@ -0,0 +1,78 @@
+import pytest
+
+from src.configs.csv_schemas import CsvSchemaConfigs
+
+TIMESTAMPS = ('created_at', 'updated_at')
+DATASET_COLUMNS = {
+    'acquisitions.csv': (
+        'id', 'acquisition_id', 'acquiring_object_id', 'acquired_object_id', 'term_code',
+        'price_amount', 'price_currency_code', 'acquired_at', 'source_url',
+        'source_description',
+    ) + TIMESTAMPS,
+    'degrees.csv': (
+        'id', 'object_id', 'degree_type', 'subject', 'institution', 'graduated_at',
+    ) + TIMESTAMPS,
+    'funding_rounds.csv': (
+        'id', 'funding_round_id', 'object_id', 'funded_at', 'funding_round_type',
+        'funding_round_code', 'raised_amount_usd', 'raised_amount', 'raised_currency_code',
+        'pre_money_valuation_usd', 'pre_money_valuation', 'pre_money_currency_code',
+        'post_money_valuation_usd', 'post_money_valuation', 'post_money_currency_code',
+        'participants', 'is_first_round', 'is_last_round', 'source_url', 'source_description',
+        'created_by',
+    ) + TIMESTAMPS,
+    'funds.csv': (
+        'id', 'fund_id', 'object_id', 'name', 'funded_at', 'raised_amount',
+        'raised_currency_code', 'source_url', 'source_description',
+    ) + TIMESTAMPS,
+    'investments.csv': (
+        'id', 'funding_round_id', 'funded_object_id', 'investor_object_id',
+    ) + TIMESTAMPS,
+    'ipos.csv': (
+        'id', 'ipo_id', 'object_id', 'valuation_amount', 'valuation_currency_code',
+        'raised_amount', 'raised_currency_code', 'public_at', 'stock_symbol', 'source_url',
+        'source_description',
+    ) + TIMESTAMPS,
+    'milestones.csv': (
+        'id', 'object_id', 'milestone_at', 'milestone_code', 'description', 'source_url',
+        'source_description',
+    ) + TIMESTAMPS,
+    'objects.csv': (
+        'id', 'entity_type', 'entity_id', 'parent_id', 'name', 'normalized_name', 'permalink',
+        'category_code', 'status', 'founded_at', 'closed_at', 'domain', 'homepage_url',
+        'twitter_username', 'logo_url', 'logo_width', 'logo_height', 'short_description',
+        'description', 'overview', 'tag_list', 'country_code', 'state_code', 'city', 'region',
+        'first_investment_at', 'last_investment_at', 'investment_rounds', 'invested_companies',
+        'first_funding_at', 'last_funding_at', 'funding_rounds', 'funding_total_usd',
+        'first_milestone_at', 'last_milestone_at', 'milestones', 'relationships', 'created_by',
+    ) + TIMESTAMPS,
+    'offices.csv': (
+        'id', 'object_id', 'office_id', 'description', 'region', 'address1', 'address2', 'city',
+        'zip_code', 'state_code', 'country_code', 'latitude', 'longitude',
+    ) + TIMESTAMPS,
+    'people.csv': (
+        'id', 'object_id', 'first_name', 'last_name', 'birthplace', 'affiliation_name',
+    ),
+    'relationships.csv': (
+        'id', 'relationship_id', 'person_object_id', 'relationship_object_id', 'start_at',
+        'end_at', 'is_past', 'sequence', 'title',
+    ) + TIMESTAMPS,
+}
+
+
+def test_every_dataset_file_has_a_schema():
+    assert set(CsvSchemaConfigs.SCHEMAS) == set(DATASET_COLUMNS)
+
+
+@pytest.mark.parametrize('file_name, columns', sorted(DATASET_COLUMNS.items()))
+def test_usecols_keep_every_column_of_the_file(file_name, columns):
+    assert set(CsvSchemaConfigs.SCHEMAS[file_name].usecols) == set(columns)
+
+
+@pytest.mark.parametrize('file_name', sorted(DATASET_COLUMNS))
+def test_typed_columns_are_read(file_name):
+    schema = CsvSchemaConfigs.SCHEMAS[file_name]
+    typed_columns = {
+        *schema.dtypes, *schema.categorical_columns, *schema.date_columns,
+        *schema.integer_columns, *schema.natural_key, *schema.indexes, *schema.field_aliases,
+    }
+    assert typed_columns <= set(schema.usecols)
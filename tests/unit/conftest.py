@@ -1,4 +1,4 @@
-"""
-conftest module for exporting fixtures
-"""
-from tests.unit.fixtures import * # pylint: disable=wildcard-import,unused-wildcard-import
+"""
+conftest module for exporting fixtures
+"""
+from tests.unit.fixtures import * # pylint: disable=wildcard-import,unused-wildcard-import
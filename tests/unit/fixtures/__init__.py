@@ -1,14 +1,14 @@
-"""
-Fixture Module
-"""
-from tests.unit.fixtures.test_common import (
-    csv_file_source_fixture,
-    sample_data_fixture,
-    mongo_client_fixture
-)
-
-__all__ = [
-    'csv_file_source_fixture',
-    'sample_data_fixture',
-    'mongo_client_fixture',
-]
+"""
+Fixture Module
+"""
+from tests.unit.fixtures.test_common import (
+    csv_file_source_fixture,
+    sample_data_fixture,
+    mongo_client_fixture
+)
+
+__all__ = [
+    'csv_file_source_fixture',
+    'sample_data_fixture',
+    'mongo_client_fixture',
+]
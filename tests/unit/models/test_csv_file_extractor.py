@@ -1,36 +1,111 @@
-import pytest
-import pandas as pd
-
-from src.models.csv_file_source import CsvFileSource
-from src.models.csv_file_extractor import CsvFileExtractor
-
-
-@pytest.mark.parametrize("file_paths, expected_num_dataframes", [
-    ([], 0),
-    (
-            [
-                'path/to/file1.csv',
-                'path/to/file2.csv',
-                'path/to/file3.csv',
-            ], 3
-    ),
-    (
-            [
-                'path/to/file1.csv',
-            ], 1
-    ),
-])
-def test_extract(file_paths, expected_num_dataframes, sample_data_fixture):
-    class MockCsvFileSource(CsvFileSource):
-        def load(self) -> pd.DataFrame:
-            return pd.DataFrame(sample_data_fixture)
-
-    extractor = CsvFileExtractor([MockCsvFileSource(path) for path in file_paths])
-
-    extracted_data = list(extractor.extract())
-
-    assert isinstance(extracted_data, list)
-    assert len(extracted_data) == expected_num_dataframes
-    for df in extracted_data:
-        assert isinstance(df, pd.DataFrame)
-        assert df.shape == (len(sample_data_fixture['col1']), len(sample_data_fixture))
+import time
+import pytest
+import pandas as pd
+
+from src.interfaces.data_source import DataSource
+from src.models.csv_file_source import CsvFileSource
+from src.models.csv_file_extractor import CsvFileExtractor
+
+
+@pytest.mark.parametrize("file_paths, expected_num_dataframes", [
+    ([], 0),
+    (
+            [
+                'path/to/file1.csv',
+                'path/to/file2.csv',
+                'path/to/file3.csv',
+            ], 3
+    ),
+    (
+            [
+                'path/to/file1.csv',
+            ], 1
+    ),
+])
+def test_extract(file_paths, expected_num_dataframes, sample_data_fixture):
+    class MockCsvFileSource(CsvFileSource):
+        def load(self) -> pd.DataFrame:
+            return pd.DataFrame(sample_data_fixture)
+
+    extractor = CsvFileExtractor([MockCsvFileSource(path) for path in file_paths])
+
+    extracted_data = list(extractor.extract())
+
+    assert isinstance(extracted_data, list)
+    assert len(extracted_data) == expected_num_dataframes
+    for df in extracted_data:
+        assert isinstance(df, pd.DataFrame)
+        assert df.shape == (len(sample_data_fixture['col1']), len(sample_data_fixture))
+
+
+def test_extract_loads_sources_without_parts_whole(sample_data_fixture):
+    class MockDataSource(DataSource):
+        def load(self) -> pd.DataFrame:
+            return pd.DataFrame(sample_data_fixture)
+
+    extracted_data = list(CsvFileExtractor([MockDataSource()]).extract())
+
+    assert len(extracted_data) == 1
+    assert extracted_data[0].shape == (len(sample_data_fixture['col1']), len(sample_data_fixture))
+
+
+def test_extract_parallel(sample_data_fixture):
+    class MockCsvFileSource(CsvFileSource):
+        def load_chunks(self):
+            for _ in range(3):
+                yield pd.DataFrame(sample_data_fixture)
+
+    sources = [MockCsvFileSource(f'path/to/file{index}.csv') for index in range(4)]
+    extractor = CsvFileExtractor(sources, max_workers=2, prefetch=1)
+
+    extracted_data = list(extractor.extract())
+
+    assert len(extracted_data) == 12
+    for df in extracted_data:
+        assert df.shape == (len(sample_data_fixture['col1']), len(sample_data_fixture))
+
+
+def test_extract_parallel_waits_for_a_slow_consumer(sample_data_fixture, monkeypatch):
+    monkeypatch.setattr('src.models.csv_file_extractor._PUT_TIMEOUT', 0.01)
+
+    class MockCsvFileSource(CsvFileSource):
+        def load_chunks(self):
+            for _ in range(3):
+                yield pd.DataFrame(sample_data_fixture)
+
+    sources = [MockCsvFileSource(f'path/to/file{index}.csv') for index in range(2)]
+    extracted_data = []
+    for df in CsvFileExtractor(sources, max_workers=2, prefetch=1).extract():
+        time.sleep(0.05)
+        extracted_data.append(df)
+
+    assert len(extracted_data) == 6
+
+
+def test_extract_parallel_raises_source_error(sample_data_fixture):
+    class FailingCsvFileSource(CsvFileSource):
+        def load(self) -> pd.DataFrame:
+            raise ValueError(self.file_path)
+
+    class MockCsvFileSource(CsvFileSource):
+        def load(self) -> pd.DataFrame:
+            return pd.DataFrame(sample_data_fixture)
+
+    sources = [MockCsvFileSource('path/to/file1.csv'), FailingCsvFileSource('path/to/file2.csv')]
+    extractor = CsvFileExtractor(sources, max_workers=2)
+
+    with pytest.raises(ValueError, match='file2'):
+        list(extractor.extract())
+
+
+def test_extract_parallel_stops_workers_on_close(sample_data_fixture):
+    class EndlessCsvFileSource(CsvFileSource):
+        def load_chunks(self):
+            while True:
+                yield pd.DataFrame(sample_data_fixture)
+
+    sources = [EndlessCsvFileSource('path/to/file1.csv'), EndlessCsvFileSource('path/to/file2.csv')]
+    iterator = CsvFileExtractor(sources, max_workers=2, prefetch=1).extract()
+
+    assert isinstance(next(iterator), pd.DataFrame)
+    iterator.close()
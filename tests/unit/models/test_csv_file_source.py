@@ -1,25 +1,75 @@
-import pytest
-
-from src.app import CsvFileSource
-import pandas as pd
-
-
-def test_csv_file_source_load(csv_file_source_fixture):
-    df = csv_file_source_fixture.load()
-    assert isinstance(df, pd.DataFrame)
-    assert len(df) == 3
-    assert set(df.columns) == {'col1', 'col2'}
-
-
-def test_csv_file_source_invalid_file():
-    invalid_file_path = '/path/to/invalid/file.csv'
-    with pytest.raises(FileNotFoundError):
-        CsvFileSource(file_path=invalid_file_path).load()
-
-
-def test_csv_file_source_empty_file(tmpdir):
-    empty_file = tmpdir.join('empty.csv')
-    open(empty_file, 'w').close()
-
-    with pytest.raises(pd.errors.EmptyDataError):
-        CsvFileSource(file_path=str(empty_file)).load()
+import pytest
+
+from src.app import CsvFileSource
+from src.configs.csv_schemas import CsvSchema, CsvSchemaConfigs
+import pandas as pd
+
+
+def test_csv_file_source_load(csv_file_source_fixture):
+    df = csv_file_source_fixture.load()
+    assert isinstance(df, pd.DataFrame)
+    assert len(df) == 3
+    assert set(df.columns) == {'col1', 'col2'}
+
+
+def test_csv_file_source_invalid_file():
+    invalid_file_path = '/path/to/invalid/file.csv'
+    with pytest.raises(FileNotFoundError):
+        CsvFileSource(file_path=invalid_file_path).load()
+
+
+def test_csv_file_source_empty_file(tmpdir):
+    empty_file = tmpdir.join('empty.csv')
+    open(empty_file, 'w').close()
+
+    with pytest.raises(pd.errors.EmptyDataError):
+        CsvFileSource(file_path=str(empty_file)).load()
+
+
+def test_csv_file_source_load_chunks(tmpdir):
+    csv_file = tmpdir.join('chunked.csv')
+    pd.DataFrame({'col1': range(5), 'col2': list('ABCDE')}).to_csv(csv_file, index=False)
+
+    chunks = list(CsvFileSource(file_path=str(csv_file), chunk_size=2).load_chunks())
+
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+    assert pd.concat(chunks)['col1'].tolist() == list(range(5))
+
+
+def test_csv_file_source_load_chunks_without_chunk_size(csv_file_source_fixture):
+    chunks = list(csv_file_source_fixture.load_chunks())
+    assert len(chunks) == 1
+    assert len(chunks[0]) == 3
+
+
+@pytest.mark.parametrize("chunk_size", [None, 2])
+def test_csv_file_source_load_with_schema(tmpdir, chunk_size):
+    csv_file = tmpdir.join('typed.csv')
+    pd.DataFrame({
+        'id': [1, 2, 3],
+        'code': ['a', 'b', 'a'],
+        'amount': [1, None, 3],
+        'funded_at': ['2010-01-01', None, '2012-03-04'],
+        'unused': ['x', 'y', 'z'],
+    }).to_csv(csv_file, index=False)
+    schema = CsvSchema(
+        dtypes={'amount': 'float64', 'missing': 'int64'},
+        categorical_columns=('code',),
+        date_columns=('funded_at', 'missing_at'),
+        usecols=('id', 'code', 'amount', 'funded_at', 'missing'),
+    )
+    source = CsvFileSource(file_path=str(csv_file), chunk_size=chunk_size, schema=schema)
+
+    parts = list(source.load_chunks()) if chunk_size else [source.load()]
+
+    assert sum(len(df) for df in parts) == 3
+    for df in parts:
+        assert list(df.columns) == ['id', 'code', 'amount', 'funded_at']
+        assert isinstance(df['code'].dtype, pd.CategoricalDtype)
+        assert df['amount'].dtype == 'float64'
+        assert pd.api.types.is_datetime64_any_dtype(df['funded_at'])
+
+
+def test_csv_schema_configs_get():
+    assert CsvSchemaConfigs.get('data/startup-investments/funding_rounds.csv') is not None
+    assert CsvSchemaConfigs.get('data/startup-investments/unknown.csv') is None
@@ -1,20 +1,119 @@
-import pandas as pd
-
-from src.models.df_transformer import DataFrameRowDictTransformer
-
-
-def test_transform(sample_data_fixture):
-    sample_data_frame = pd.DataFrame([sample_data_fixture])
-    transformer = DataFrameRowDictTransformer(sample_data_frame)
-
-    result = transformer.transform()
-
-    assert isinstance(result, list)
-    assert len(result) == len(sample_data_frame)
-
-    for item in result:
-        assert isinstance(item, dict)
-
-    for i, row in enumerate(sample_data_frame.iterrows()):
-        _, expected_dict = row
-        assert result[i] == expected_dict.to_dict()
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.models.df_transformer import DataFrameRowDictTransformer
+
+
+def test_transform(sample_data_fixture):
+    sample_data_frame = pd.DataFrame([sample_data_fixture])
+    transformer = DataFrameRowDictTransformer(sample_data_frame)
+
+    result = transformer.transform()
+
+    assert isinstance(result, list)
+    assert len(result) == len(sample_data_frame)
+
+    for item in result:
+        assert isinstance(item, dict)
+
+    for i, row in enumerate(sample_data_frame.iterrows()):
+        _, expected_dict = row
+        assert result[i] == expected_dict.to_dict()
+
+
+def test_transform_replaces_missing_datetimes_with_none():
+    sample_data_frame = pd.DataFrame({
+        'funded_at': pd.to_datetime(['2010-01-01', None]),
+        'name': ['A', 'B'],
+    })
+
+    result = DataFrameRowDictTransformer(sample_data_frame).transform()
+
+    assert result[0]['funded_at'] == pd.Timestamp('2010-01-01')
+    assert result[1]['funded_at'] is None
+    assert pd.api.types.is_datetime64_any_dtype(sample_data_frame['funded_at'])
+
+
+def test_transform_batches():
+    sample_data_frame = pd.DataFrame({
+        'id': np.arange(5, dtype='int64'),
+        'amount': [1.5, np.nan, 3.0, np.nan, 5.0],
+        'name': ['A', 'B', None, 'D', 'E'],
+        'funded_at': pd.to_datetime(['2010-01-01', None, '2012-01-01', None, None]),
+    })
+    transformer = DataFrameRowDictTransformer(sample_data_frame, batch_size=2)
+
+    batches = list(transformer.transform_batches())
+
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    assert batches[0] == [
+        {'id': 0, 'amount': 1.5, 'name': 'A', 'funded_at': datetime.datetime(2010, 1, 1)},
+        {'id': 1, 'name': 'B'},
+    ]
+    assert batches[1] == [
+        {'id': 2, 'amount': 3.0, 'funded_at': datetime.datetime(2012, 1, 1)},
+        {'id': 3, 'name': 'D'},
+    ]
+    assert type(batches[0][0]['id']) is int
+    assert type(batches[0][0]['amount']) is float
+
+
+def test_transform_with_batch_size_is_lazy(sample_data_fixture):
+    sample_data_frame = pd.DataFrame(sample_data_fixture)
+
+    result = DataFrameRowDictTransformer(sample_data_frame, batch_size=2).transform()
+
+    assert not isinstance(result, list)
+    assert list(result) == sample_data_frame.to_dict(orient='records')
+
+
+def test_transform_compact_with_field_aliases():
+    sample_data_frame = pd.DataFrame({
+        'object_id': [1.0, np.nan, 3.0],
+        'amount': [1.5, np.nan, 3.0],
+        'funded_at': ['2010-01-01', None, '2012-05-06 10:30:00'],
+        'name': ['A', '2012', None],
+    })
+    transformer = DataFrameRowDictTransformer(
+        sample_data_frame, compact=True, field_aliases={'object_id': 'oid'},
+        integer_columns=('object_id',),
+    )
+
+    result = list(transformer.transform())
+
+    assert result == [
+        {'oid': 1, 'amount': 1.5, 'funded_at': '2010-01-01', 'name': 'A'},
+        {'name': '2012'},
+        {'oid': 3, 'amount': 3.0, 'funded_at': '2012-05-06 10:30:00'},
+    ]
+    assert type(result[0]['oid']) is int
+
+
+def test_transform_compact_keeps_the_types_of_every_batch():
+    sample_data_frame = pd.DataFrame({
+        'count': [1.0, 2.0, 3.0, np.nan],
+        'amount': [1.0, 2.0, 3.5, 4.0],
+        'funded_at': ['2010-01-01', '2011-01-01', 'unknown', '2013-01-01'],
+    })
+    transformer = DataFrameRowDictTransformer(
+        sample_data_frame, batch_size=2, compact=True, integer_columns=('count',)
+    )
+
+    result = list(transformer.transform())
+
+    assert [type(document.get('count')) for document in result] == [int, int, int, type(None)]
+    assert {type(document['amount']) for document in result} == {float}
+    assert {type(document['funded_at']) for document in result} == {str}
+
+
+def test_transform_compact_rejects_fractions_in_integer_columns():
+    sample_data_frame = pd.DataFrame({'count': [1.0, 2.5]})
+    transformer = DataFrameRowDictTransformer(
+        sample_data_frame, compact=True, integer_columns=('count',)
+    )
+
+    with pytest.raises(ValueError, match="'count'"):
+        list(transformer.transform())
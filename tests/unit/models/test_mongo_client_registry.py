@@ -0,0 +1,56 @@
+import os
+from unittest.mock import MagicMock
+
+from src.configs.mongodb import MongoDBConfigs
+from src.models.mongo_client_registry import MongoClientRegistry
+from src.models.mongodb_loader import MongoDBStorage
+
+
+def test_get_client_shares_clients_per_settings(monkeypatch):
+    created_options = []
+    monkeypatch.setattr(
+        'src.models.mongo_client_registry.MongoClient',
+        lambda **options: created_options.append(options) or MagicMock(),
+    )
+    registry = MongoClientRegistry()
+
+    client = registry.get_client(host='mongo', username='root', compressors=None)
+    same_client = registry.get_client(username='root', host='mongo')
+    other_client = registry.get_client(host='mongo', username='reader')
+    registry.clear()
+
+    assert same_client is client
+    assert other_client is not client
+    assert created_options == [
+        {'host': 'mongo', 'username': 'root'}, {'host': 'mongo', 'username': 'reader'}
+    ]
+    client.close.assert_called_once_with()
+    assert registry.get_client(host='mongo', username='root') is not client
+
+
+def test_indexes_are_checked_once_per_collection(mongo_client_fixture):
+    mock_collection = mongo_client_fixture[MongoDBConfigs.MONGO_DATABASE]['objects']
+    mock_collection.index_information.return_value = {}
+
+    MongoDBStorage(collection_name='objects', text_index=False, secondary_indexes=('id',))
+    MongoDBStorage(collection_name='objects', text_index=False, secondary_indexes=('id',))
+    MongoDBStorage(collection_name='objects', text_index=False, secondary_indexes=('name',))
+
+    assert mock_collection.index_information.call_count == 2
+    assert mock_collection.create_index.call_count == 2
+
+
+def test_clients_of_the_parent_process_are_forgotten_after_a_fork(monkeypatch):
+    monkeypatch.setattr(
+        'src.models.mongo_client_registry.MongoClient', lambda **options: MagicMock()
+    )
+    registry = MongoClientRegistry()
+    client = registry.get_client(host='mongo')
+    registry.mark_indexes_checked('objects')
+    parent_pid = os.getpid()
+
+    monkeypatch.setattr(os, 'getpid', lambda: parent_pid + 1)
+
+    assert not registry.indexes_checked('objects')
+    assert registry.get_client(host='mongo') is not client
+    client.close.assert_not_called()
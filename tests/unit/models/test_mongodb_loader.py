@@ -1,52 +1,291 @@
-import pytest
-from unittest.mock import MagicMock, call
-from src.models.mongodb_loader import MongoDBLoader, MongoDBStorage
-from src.configs.mongodb import MongoDBConfigs
-
-
-def test_load():
-    mock_storage = MagicMock(spec=MongoDBStorage)
-
-    input_data = [
-        {"name": "Company 1", "industry": "Tech"},
-        {"name": "Company 2", "industry": "Finance"},
-        {"name": "Company 3", "industry": "Healthcare"},
-    ]
-
-    loader = MongoDBLoader(mongo_storage=mock_storage, chunk_size=2)
-
-    loader.load(input_data)
-    mock_storage.save.assert_has_calls(
-        [
-            call([
-                {"name": "Company 1", "industry": "Tech"},
-                {"name": "Company 2", "industry": "Finance"},
-            ]),
-            call([
-                {"name": "Company 3", "industry": "Healthcare"},
-            ]),
-        ],
-        any_order=False,
-    )
-
-
-def test_initialize_database(mongo_client_fixture):
-    MongoDBStorage()
-    mock_collection = mongo_client_fixture[MongoDBConfigs.MONGO_DATABASE][MongoDBConfigs.INVESTMENT_COLLECTION]
-    mock_collection.index_information.return_value = {"_id_": {"key": [("_id", 1)], "v": 2}}
-    mock_collection.create_index.assert_called_once_with(
-        [(MongoDBConfigs.SEARCH_QUERY_COLUMN, "text")],
-        name=f"{MongoDBConfigs.SEARCH_QUERY_COLUMN}_text",
-    )
-
-
-def test_save(mongo_client_fixture):
-    storage = MongoDBStorage()
-
-    input_data = [
-        {"name": "Company A", "industry": "Tech", "founded": "2005"},
-        {"name": "Company B", "industry": "Finance", "founded": "2010"},
-    ]
-    storage.save(input_data)
-    mock_collection = mongo_client_fixture[MongoDBConfigs.MONGO_DATABASE][MongoDBConfigs.INVESTMENT_COLLECTION]
-    mock_collection.insert_many.assert_called_once_with(input_data)
+import time
+import pytest
+from unittest.mock import MagicMock, call
+from pymongo import ReplaceOne
+from src.models.mongodb_loader import MongoDBLoader, MongoDBStorage
+from src.configs.mongodb import MongoDBConfigs
+
+
+def test_load():
+    mock_storage = MagicMock(spec=MongoDBStorage)
+
+    input_data = [
+        {"name": "Company 1", "industry": "Tech"},
+        {"name": "Company 2", "industry": "Finance"},
+        {"name": "Company 3", "industry": "Healthcare"},
+    ]
+
+    loader = MongoDBLoader(mongo_storage=mock_storage, chunk_size=2)
+
+    loader.load(input_data)
+    mock_storage.save.assert_has_calls(
+        [
+            call([
+                {"name": "Company 1", "industry": "Tech"},
+                {"name": "Company 2", "industry": "Finance"},
+            ]),
+            call([
+                {"name": "Company 3", "industry": "Healthcare"},
+            ]),
+        ],
+        any_order=False,
+    )
+
+
+def test_load_iterator():
+    mock_storage = MagicMock(spec=MongoDBStorage)
+    input_data = ({"name": f"Company {index}"} for index in range(5))
+
+    MongoDBLoader(mongo_storage=mock_storage, chunk_size=2).load(input_data)
+
+    assert [len(c.args[0]) for c in mock_storage.save.call_args_list] == [2, 2, 1]
+
+
+def test_initialize_database(mongo_client_fixture):
+    MongoDBStorage()
+    mock_collection = mongo_client_fixture[MongoDBConfigs.MONGO_DATABASE][
+        MongoDBConfigs.INVESTMENT_COLLECTION
+    ]
+    mock_collection.index_information.return_value = {"_id_": {"key": [("_id", 1)], "v": 2}}
+    mock_collection.create_index.assert_called_once_with(
+        [(MongoDBConfigs.SEARCH_QUERY_COLUMN, "text")],
+        name=f"{MongoDBConfigs.SEARCH_QUERY_COLUMN}_text",
+    )
+
+
+def test_save(mongo_client_fixture):
+    storage = MongoDBStorage()
+
+    input_data = [
+        {"name": "Company A", "industry": "Tech", "founded": "2005"},
+        {"name": "Company B", "industry": "Finance", "founded": "2010"},
+    ]
+    storage.save(input_data)
+    mock_collection = mongo_client_fixture[MongoDBConfigs.MONGO_DATABASE][
+        MongoDBConfigs.INVESTMENT_COLLECTION
+    ]
+    mock_collection.insert_many.assert_called_once_with(input_data, ordered=True)
+
+
+@pytest.mark.parametrize('write_concern_w, w', [('majority', 'majority'), ('2', 2)])
+def test_save_unordered_with_write_concern(mongo_client_fixture, write_concern_w, w):
+    storage = MongoDBStorage(ordered=False, write_concern_w=write_concern_w)
+
+    input_data = [{"name": "Company A"}]
+    storage.save(input_data)
+    mock_collection = mongo_client_fixture[MongoDBConfigs.MONGO_DATABASE][
+        MongoDBConfigs.INVESTMENT_COLLECTION
+    ]
+    write_concern = mock_collection.with_options.call_args.kwargs['write_concern']
+    assert write_concern.document == {'w': w}
+    mock_collection.with_options.return_value.insert_many.assert_called_once_with(
+        input_data, ordered=False
+    )
+
+
+def test_load_with_writer_threads():
+    mock_storage = MagicMock(spec=MongoDBStorage)
+    input_data = [{"name": f"Company {index}"} for index in range(7)]
+
+    loader = MongoDBLoader(mongo_storage=mock_storage, chunk_size=2, writer_threads=2, queue_size=1)
+    loader.load(input_data)
+    loader.close()
+
+    saved = [document for c in mock_storage.save.call_args_list for document in c.args[0]]
+    assert sorted(saved, key=lambda document: document["name"]) == input_data
+
+
+def test_load_with_writer_threads_raises_first_error():
+    mock_storage = MagicMock(spec=MongoDBStorage)
+    mock_storage.save.side_effect = RuntimeError('write failed')
+
+    loader = MongoDBLoader(mongo_storage=mock_storage, chunk_size=1, writer_threads=1)
+    loader.load([{"name": "Company 1"}])
+
+    with pytest.raises(RuntimeError, match='write failed'):
+        loader.close()
+    mock_storage.finalize.assert_called_once()
+    mock_storage.bump_load_generation.assert_not_called()
+
+
+@pytest.mark.parametrize('writer_threads', [0, 1])
+def test_close_keeps_load_generation_after_a_raised_load_error(writer_threads):
+    mock_storage = MagicMock(spec=MongoDBStorage)
+    mock_storage.save.side_effect = RuntimeError('write failed')
+    loader = MongoDBLoader(mongo_storage=mock_storage, chunk_size=1, writer_threads=writer_threads)
+
+    def input_data():
+        yield {"name": "Company 1"}
+        while writer_threads and loader._write_error is None:
+            time.sleep(0.001)
+        yield {"name": "Company 2"}
+
+    with pytest.raises(RuntimeError, match='write failed'):
+        loader.load(input_data())
+    loader.close()
+
+    mock_storage.finalize.assert_called_once()
+    mock_storage.bump_load_generation.assert_not_called()
+
+
+def test_writers_discard_the_chunks_queued_after_a_raised_write_error():
+    mock_storage = MagicMock(spec=MongoDBStorage)
+    mock_storage.save.side_effect = RuntimeError('write failed')
+    loader = MongoDBLoader(mongo_storage=mock_storage, chunk_size=1, writer_threads=1)
+
+    def input_data():
+        yield {"name": "Company 1"}
+        while loader._write_error is None:
+            time.sleep(0.001)
+        yield {"name": "Company 2"}
+
+    with pytest.raises(RuntimeError, match='write failed'):
+        loader.load(input_data())
+    for index in range(3, 6):
+        loader._chunk_queue.put([{"name": f"Company {index}"}])
+    loader.close()
+
+    mock_storage.save.assert_called_once_with([{"name": "Company 1"}])
+    mock_storage.bump_load_generation.assert_not_called()
+
+
+def test_close_bumps_load_generation(mongo_client_fixture):
+    storage = MongoDBStorage()
+    loader = MongoDBLoader(mongo_storage=storage, chunk_size=2)
+
+    loader.load([{"name": "Company 1"}])
+    loader.close()
+
+    mock_meta_collection = mongo_client_fixture[MongoDBConfigs.MONGO_DATABASE][
+        MongoDBConfigs.META_COLLECTION
+    ]
+    mock_meta_collection.update_one.assert_called_once_with(
+        {'_id': MongoDBConfigs.LOAD_GENERATION_ID}, {'$inc': {'value': 1}}, upsert=True,
+    )
+
+
+def test_upsert_skips_unchanged_documents(mongo_client_fixture):
+    storage = MongoDBStorage(write_mode='upsert', natural_key=('id',), key_prefix='funds')
+    mock_collection = mongo_client_fixture[MongoDBConfigs.MONGO_DATABASE][
+        MongoDBConfigs.INVESTMENT_COLLECTION
+    ]
+    unchanged_hash = MongoDBStorage.content_hash({"id": 1.0, "name": "Fund A"})
+    mock_collection.find.return_value = [
+        {"_id": "funds:1", MongoDBConfigs.CONTENT_HASH_FIELD: unchanged_hash},
+        {"_id": "funds:2", MongoDBConfigs.CONTENT_HASH_FIELD: "outdated"},
+    ]
+
+    documents = [
+        {"id": 1, "name": "Fund A"},
+        {"id": 2, "name": "Fund B"},
+        {"id": 3, "name": "Fund C"},
+    ]
+    storage.save(documents)
+
+    mock_collection.find.assert_called_once_with(
+        {"_id": {"$in": ["funds:1", "funds:2", "funds:3"]}},
+        {MongoDBConfigs.CONTENT_HASH_FIELD: 1},
+    )
+    mock_collection.bulk_write.assert_called_once_with(
+        [
+            ReplaceOne({"_id": "funds:2"}, documents[1], upsert=True),
+            ReplaceOne({"_id": "funds:3"}, documents[2], upsert=True),
+        ],
+        ordered=True,
+    )
+    mock_collection.insert_many.assert_not_called()
+
+
+def test_unknown_write_mode_is_rejected(mongo_client_fixture):
+    with pytest.raises(ValueError, match="Unknown write mode 'Upsert'"):
+        MongoDBStorage(write_mode='Upsert')
+
+
+def test_document_id_falls_back_to_content_hash(mongo_client_fixture):
+    storage = MongoDBStorage(write_mode='upsert', natural_key=('id',), key_prefix='funds')
+    document = {"id": float('nan'), "name": "Fund A"}
+
+    content_hash = MongoDBStorage.content_hash(document)
+
+    assert storage.document_id(document, content_hash) == f'funds:{content_hash}'
+    assert content_hash == MongoDBStorage.content_hash({"name": "Fund A"})
+
+
+def test_document_id_and_content_hash_ignore_number_types(mongo_client_fixture):
+    storage = MongoDBStorage(write_mode='upsert', natural_key=('id',), key_prefix='funds')
+
+    assert [storage.document_id({"id": value}, 'hash') for value in (12, 12.0, '12')] == [
+        'funds:12', 'funds:12', 'funds:12',
+    ]
+    assert MongoDBStorage.content_hash({"id": 12.0, "name": None}) == (
+        MongoDBStorage.content_hash({"id": 12})
+    )
+
+
+def test_initialize_database_with_index_profile(mongo_client_fixture):
+    mock_collection = mongo_client_fixture[MongoDBConfigs.MONGO_DATABASE]['investments']
+    mock_collection.index_information.return_value = {"_id_": {"key": [("_id", 1)], "v": 2}}
+
+    MongoDBStorage(
+        collection_name='investments', text_index=False, secondary_indexes=('funded_object_id',)
+    )
+
+    mock_collection.create_index.assert_called_once_with(
+        [('funded_object_id', 1)], name='funded_object_id_1'
+    )
+
+
+def test_deferred_indexes_are_built_in_finalize(mongo_client_fixture):
+    mock_collection = mongo_client_fixture[MongoDBConfigs.MONGO_DATABASE]['funds']
+    mock_collection.index_information.return_value = {
+        "_id_": {"key": [("_id", 1)], "v": 2},
+        "source_description_text": {"key": [("_fts", "text")], "v": 2},
+    }
+
+    storage = MongoDBStorage(
+        collection_name='funds', secondary_indexes=('object_id',), defer_indexes=True
+    )
+    mock_collection.drop_index.assert_called_once_with('source_description_text')
+    mock_collection.create_index.assert_not_called()
+
+    loader = MongoDBLoader(mongo_storage=storage, chunk_size=1)
+    loader.load([{"name": "Fund A"}])
+    loader.close()
+
+    index_models = mock_collection.create_indexes.call_args.args[0]
+    assert [model.document['name'] for model in index_models] == [
+        'source_description_text', 'object_id_1',
+    ]
+    assert storage.index_build_seconds is not None
+
+
+def test_finalize_without_an_index_profile_builds_nothing(mongo_client_fixture):
+    mock_collection = mongo_client_fixture[MongoDBConfigs.MONGO_DATABASE]['people']
+    mock_collection.index_information.return_value = {}
+
+    storage = MongoDBStorage(collection_name='people', text_index=False, defer_indexes=True)
+    storage.finalize()
+
+    mock_collection.create_indexes.assert_not_called()
+    assert storage.index_build_seconds is None
+
+
+def test_field_aliases_are_recorded_and_indexed(mongo_client_fixture):
+    mock_collection = mongo_client_fixture[MongoDBConfigs.MONGO_DATABASE]['offices']
+    mock_collection.index_information.return_value = {}
+
+    storage = MongoDBStorage(
+        collection_name='offices', text_index=False, natural_key=('object_id',),
+        secondary_indexes=('object_id',), field_aliases={'object_id': 'oid'},
+        sparse_indexes=True,
+    )
+
+    assert storage.natural_key == ('oid',)
+    mock_collection.create_index.assert_called_once_with(
+        [('oid', 1)], name='oid_1', sparse=True
+    )
+    mock_collection.update_one.assert_called_once_with(
+        {'_id': f'{MongoDBConfigs.FIELD_ALIASES_ID}:offices'},
+        {'$set': {'aliases.object_id': 'oid'}},
+        upsert=True,
+    )
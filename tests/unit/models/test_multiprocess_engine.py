@@ -0,0 +1,400 @@
+import json
+import os
+import queue
+import threading
+import time
+from functools import partial
+from multiprocessing.shared_memory import SharedMemory
+from typing import Iterable, List
+import bson
+import pandas as pd
+import pytest
+
+from src.interfaces.loader import Loader
+from src.models import multiprocess_engine
+from src.models.csv_file_source import CsvFileSource
+from src.models.multiprocess_engine import (
+    EngineError, MultiprocessEngine, parse_shard, write_batches,
+)
+from src.models.raw_bson_transformer import encode_documents
+
+
+# The doubles marked with 'pragma: no cover' only run in the parse and writer processes of
+# the engine, which coverage does not measure.
+
+
+class JsonLinesLoader(Loader):
+    """Appends the loaded documents to a JSON lines file per writer process."""
+
+    def __init__(self, output_dir: str, file_name: str) -> None:
+        super().__init__(storage=None)
+        self.path = os.path.join(output_dir, f'{file_name}.{os.getpid()}.jsonl')
+
+    def load(self, input_data: Iterable):
+        with open(self.path, 'a', encoding='utf-8') as output_file:
+            for document in input_data:
+                if document['id'] < 0:
+                    raise ValueError('negative id')
+                output_file.write(json.dumps({'id': document['id'], 'n': document['n']}) + '\n')
+
+
+class UnclosableLoader(JsonLinesLoader):
+    """Fails to flush its documents when it is closed."""
+
+    def close(self) -> None:
+        raise OSError('disk full')
+
+
+class ExitingLoader(Loader):  # pragma: no cover
+    """Ends its writer process without a report, like a writer killed by the system."""
+
+    def __init__(self) -> None:
+        super().__init__(storage=None)
+
+    def load(self, input_data: Iterable):
+        os._exit(3)
+
+
+class SlowLoader(Loader):  # pragma: no cover
+    """Takes a second per batch."""
+
+    def __init__(self) -> None:
+        super().__init__(storage=None)
+
+    def load(self, input_data: Iterable):
+        time.sleep(1)
+
+
+class LateQueue:  # pylint: disable=too-few-public-methods  # pragma: no cover
+    """Puts the batches half a second late, like a slow feeder thread of a queue."""
+
+    def __init__(self, batch_queue) -> None:
+        self.batch_queue = batch_queue
+
+    def put(self, batch, timeout=None) -> None:
+        threading.Timer(0.5, self.batch_queue.put, (batch, True, timeout)).start()
+
+
+def create_sources(file_paths: List[str], chunk_size=None, byte_range=None) -> List[CsvFileSource]:
+    return [
+        CsvFileSource(file_path=file_path, chunk_size=chunk_size, byte_range=byte_range)
+        for file_path in file_paths
+    ]
+
+
+def create_failing_sources(  # pragma: no cover
+        file_paths: List[str], **kwargs
+) -> List[CsvFileSource]:
+    if os.path.basename(file_paths[0]).startswith('bad'):
+        raise ValueError('unreadable shard')
+    return create_sources(file_paths, **kwargs)
+
+
+def create_late_queueing_sources(  # pragma: no cover
+        file_paths: List[str], **kwargs
+) -> List[CsvFileSource]:
+    """Delays the batches of the parse worker until after its shard finished."""
+    batch_queue = multiprocess_engine._BATCH_QUEUE
+    if not isinstance(batch_queue, LateQueue):
+        multiprocess_engine._BATCH_QUEUE = LateQueue(batch_queue)
+    return create_sources(file_paths, **kwargs)
+
+
+def create_loader(output_dir: str, file_name: str, _columns: List[str]) -> JsonLinesLoader:
+    return JsonLinesLoader(output_dir, file_name)
+
+
+def create_exiting_loader(  # pragma: no cover
+        _file_name: str, _columns: List[str]
+) -> ExitingLoader:
+    return ExitingLoader()
+
+
+def create_slow_loader(_file_name: str, _columns: List[str]) -> SlowLoader:  # pragma: no cover
+    return SlowLoader()
+
+
+def shared_memory_blocks() -> set:
+    return {name for name in os.listdir('/dev/shm') if name.startswith('psm_')}
+
+
+def queued_batches(batch_queue: queue.Queue) -> List[tuple]:
+    batches = []
+    while not batch_queue.empty():
+        batches.append(batch_queue.get_nowait())
+    return batches
+
+
+def queue_batch(batch_queue: queue.Queue, file_name: str, ids: List[int]) -> None:
+    buffer = encode_documents(
+        pd.DataFrame({'id': ids, 'n': [f'name {row_id}' for row_id in ids]}),
+        compact=False, field_aliases={},
+    )
+    shared_memory = SharedMemory(create=True, size=len(buffer))
+    shared_memory.buf[:len(buffer)] = buffer
+    shared_memory.close()
+    batch_queue.put((file_name, shared_memory.name, len(buffer), len(ids), ['id', 'n']))
+
+
+def written_documents(output_dir: str, file_name: str) -> List[dict]:
+    documents = []
+    for output_name in os.listdir(output_dir):
+        if output_name.startswith(f'{file_name}.'):
+            with open(os.path.join(output_dir, output_name), encoding='utf-8') as output_file:
+                documents.extend(json.loads(line) for line in output_file)
+    return sorted(documents, key=lambda document: document['id'])
+
+
+def write_csv(path, first_id: int, rows: int) -> str:
+    path.write_text('id,name\n' + ''.join(
+        f'{row_id},name {row_id}\n' for row_id in range(first_id, first_id + rows)
+    ))
+    return str(path)
+
+
+def test_run_loads_every_row_of_the_shards(tmp_path):
+    file_paths = [write_csv(tmp_path / 'a.csv', 0, 300), write_csv(tmp_path / 'b.csv', 1000, 20)]
+    output_dir = tmp_path / 'out'
+    output_dir.mkdir()
+
+    engine = MultiprocessEngine(
+        source_factory=create_sources,
+        loader_factory=partial(create_loader, str(output_dir)),
+        parse_workers=2, writer_processes=2, shard_bytes=1024, batch_size=50,
+        field_aliases={'a.csv': {'name': 'n'}, 'b.csv': {'name': 'n'}},
+    )
+    metrics = engine.run(file_paths)
+
+    assert written_documents(str(output_dir), 'a.csv') == [
+        {'id': row_id, 'n': f'name {row_id}'} for row_id in range(300)
+    ]
+    assert len(written_documents(str(output_dir), 'b.csv')) == 20
+    summary = metrics.summary()['files']
+    assert summary['a.csv']['stages']['extract']['rows'] == 300
+    assert summary['a.csv']['stages']['load']['rows'] == 300
+    assert summary['b.csv']['stages']['load']['rows'] == 20
+
+
+def test_run_raises_when_a_writer_fails(tmp_path):
+    file_paths = [write_csv(tmp_path / 'a.csv', -5, 100)]
+    output_dir = tmp_path / 'out'
+    output_dir.mkdir()
+
+    engine = MultiprocessEngine(
+        source_factory=create_sources,
+        loader_factory=partial(create_loader, str(output_dir)),
+        parse_workers=1, writer_processes=1, shard_bytes=1024, batch_size=10,
+        field_aliases={'a.csv': {'name': 'n'}},
+    )
+    with pytest.raises(EngineError, match='negative id'):
+        engine.run(file_paths)
+
+
+def test_run_unlinks_the_queued_batches_after_a_failure(tmp_path):
+    file_paths = [write_csv(tmp_path / 'a.csv', -5, 500)]
+    output_dir = tmp_path / 'out'
+    output_dir.mkdir()
+    blocks = shared_memory_blocks()
+
+    engine = MultiprocessEngine(
+        source_factory=create_sources,
+        loader_factory=partial(create_loader, str(output_dir)),
+        parse_workers=2, writer_processes=1, shard_bytes=4096, batch_size=10, queue_size=1,
+    )
+    with pytest.raises(EngineError, match='negative id'):
+        engine.run(file_paths)
+
+    assert shared_memory_blocks() == blocks
+
+
+def test_run_cancels_the_pending_shards_after_a_parse_failure(tmp_path):
+    file_paths = [write_csv(tmp_path / 'bad.csv', 0, 500)] + [
+        write_csv(tmp_path / f'{index}.csv', 0, 5) for index in range(20)
+    ]
+    output_dir = tmp_path / 'out'
+    output_dir.mkdir()
+
+    engine = MultiprocessEngine(
+        source_factory=create_failing_sources,
+        loader_factory=partial(create_loader, str(output_dir)),
+        parse_workers=1, writer_processes=1, shard_bytes=1 << 20, batch_size=10,
+    )
+    with pytest.raises(EngineError, match='parse worker: .*unreadable shard'):
+        engine.run(file_paths)
+
+    assert len(os.listdir(output_dir)) < 20
+
+
+def test_run_raises_when_a_writer_dies(tmp_path):
+    file_paths = [write_csv(tmp_path / 'a.csv', 0, 500)]
+    blocks = shared_memory_blocks()
+
+    engine = MultiprocessEngine(
+        source_factory=create_sources,
+        loader_factory=create_exiting_loader,
+        parse_workers=2, writer_processes=1, shard_bytes=4096, batch_size=10, queue_size=1,
+    )
+    with pytest.raises(EngineError, match='etl-writer-0'):
+        engine.run(file_paths)
+
+    assert shared_memory_blocks() == blocks
+
+
+def test_parse_worker_fails_when_no_writer_takes_its_batches(tmp_path):
+    file_paths = [write_csv(tmp_path / 'a.csv', 0, 100)]
+
+    engine = MultiprocessEngine(
+        source_factory=create_sources,
+        loader_factory=create_slow_loader,
+        parse_workers=1, writer_processes=1, shard_bytes=1 << 20, batch_size=10, queue_size=1,
+        put_timeout=0.2,
+    )
+    with pytest.raises(EngineError, match='No writer took a batch of a.csv in 0.2 seconds'):
+        engine.run(file_paths)
+
+
+def test_run_parses_a_byte_range_as_one_shard(tmp_path):
+    file_path = write_csv(tmp_path / 'a.csv', 0, 300)
+    output_dir = tmp_path / 'out'
+    output_dir.mkdir()
+
+    engine = MultiprocessEngine(
+        source_factory=create_sources,
+        loader_factory=partial(create_loader, str(output_dir)),
+        parse_workers=2, writer_processes=1, shard_bytes=1024, batch_size=50,
+        field_aliases={'a.csv': {'name': 'n'}},
+    )
+    metrics = engine.run([file_path], byte_range=[0, os.path.getsize(file_path)])
+
+    assert len(written_documents(str(output_dir), 'a.csv')) == 300
+    assert metrics.summary()['files']['a.csv']['stages']['extract']['chunks'] == 1
+
+
+def test_run_waits_for_the_batches_queued_after_their_shard(tmp_path):
+    file_paths = [write_csv(tmp_path / 'a.csv', 0, 30)]
+    output_dir = tmp_path / 'out'
+    output_dir.mkdir()
+
+    engine = MultiprocessEngine(
+        source_factory=create_late_queueing_sources,
+        loader_factory=partial(create_loader, str(output_dir)),
+        parse_workers=1, writer_processes=1, shard_bytes=1 << 20, batch_size=10,
+        queue_size=10, field_aliases={'a.csv': {'name': 'n'}},
+    )
+    engine.run(file_paths)
+
+    assert len(written_documents(str(output_dir), 'a.csv')) == 30
+
+
+def test_run_raises_when_rows_are_missing(tmp_path, monkeypatch):
+    file_paths = [write_csv(tmp_path / 'a.csv', 0, 20)]
+    output_dir = tmp_path / 'out'
+    output_dir.mkdir()
+    read_reports = MultiprocessEngine._read_reports
+
+    def drop_load_reports(report_queue, metrics, written_rows, errors, timeout=0.0):
+        reports = read_reports(report_queue, metrics, written_rows, errors, timeout)
+        written_rows.clear()
+        return reports
+
+    monkeypatch.setattr(MultiprocessEngine, '_read_reports', staticmethod(drop_load_reports))
+    engine = MultiprocessEngine(
+        source_factory=create_sources,
+        loader_factory=partial(create_loader, str(output_dir)),
+        parse_workers=1, writer_processes=1, shard_bytes=1024, batch_size=10,
+        field_aliases={'a.csv': {'name': 'n'}},
+    )
+    with pytest.raises(EngineError, match='a.csv: wrote 0 of 20 rows'):
+        engine.run(file_paths)
+
+
+def test_stop_writers_discards_the_batches_of_dead_writers():
+    class DeadWriter:  # pylint: disable=too-few-public-methods
+        @staticmethod
+        def is_alive() -> bool:
+            return False
+
+    batch_queue = queue.Queue(maxsize=1)
+    blocks = shared_memory_blocks()
+    queue_batch(batch_queue, 'a.csv', [1, 2])
+
+    engine = MultiprocessEngine(create_sources, create_slow_loader, 1, 1, 1024)
+    engine._stop_writers(batch_queue, [DeadWriter()], errors=[])
+
+    assert queued_batches(batch_queue) == [None]
+    assert shared_memory_blocks() == blocks
+
+
+def test_parse_shard_queues_the_batches_in_shared_memory(tmp_path, monkeypatch):
+    file_path = write_csv(tmp_path / 'a.csv', 0, 25)
+    batch_queue = queue.Queue()
+    monkeypatch.setattr(multiprocess_engine, '_BATCH_QUEUE', None)
+    multiprocess_engine._init_parse_worker(batch_queue)
+
+    report = parse_shard(create_sources, file_path, None, None, 10, 1.0, True, {'name': 'n'}, ())
+
+    assert (report['file_name'], report['rows'], report['chunks'], report['batches']) == (
+        'a.csv', 25, 1, 3
+    )
+    batches = queued_batches(batch_queue)
+    assert [rows for _, _, _, rows, _ in batches] == [10, 10, 5]
+    documents = [
+        document
+        for _, block_name, size, _, _ in batches
+        for document in bson.decode_all(multiprocess_engine._read_block(block_name, size))
+    ]
+    assert [(document['id'], document['n']) for document in documents] == [
+        (row_id, f'name {row_id}') for row_id in range(25)
+    ]
+
+
+def test_parse_shard_unlinks_its_batch_when_no_writer_takes_it(tmp_path, monkeypatch):
+    file_path = write_csv(tmp_path / 'a.csv', 0, 25)
+    batch_queue = queue.Queue(maxsize=1)
+    batch_queue.put(None)
+    monkeypatch.setattr(multiprocess_engine, '_BATCH_QUEUE', batch_queue)
+    blocks = shared_memory_blocks()
+
+    with pytest.raises(EngineError, match='No writer took a batch of a.csv'):
+        parse_shard(create_sources, file_path, None, None, 10, 0.01, False, {}, ())
+
+    assert shared_memory_blocks() == blocks
+
+
+def test_write_batches_skips_the_batches_after_a_failure(tmp_path):
+    batch_queue, report_queue = queue.Queue(), queue.Queue()
+    blocks = shared_memory_blocks()
+    queue_batch(batch_queue, 'a.csv', [1, 2])
+    queue_batch(batch_queue, 'a.csv', [-1, 3])
+    queue_batch(batch_queue, 'a.csv', [4, 5])
+    batch_queue.put(None)
+
+    write_batches(batch_queue, report_queue, partial(create_loader, str(tmp_path)))
+
+    reports = queued_batches(report_queue)
+    assert [(kind, file_name) for kind, file_name, _ in reports] == [
+        ('load', 'a.csv'), ('error', 'a.csv'),
+    ]
+    assert reports[0][2]['rows'] == 2
+    assert reports[1][2] == "ValueError('negative id')"
+    assert written_documents(str(tmp_path), 'a.csv') == [
+        {'id': 1, 'n': 'name 1'}, {'id': 2, 'n': 'name 2'},
+    ]
+    assert shared_memory_blocks() == blocks
+
+
+def test_write_batches_reports_the_errors_of_closing_a_loader(tmp_path):
+    batch_queue, report_queue = queue.Queue(), queue.Queue()
+    queue_batch(batch_queue, 'a.csv', [1])
+    batch_queue.put(None)
+
+    write_batches(
+        batch_queue, report_queue,
+        lambda file_name, _columns: UnclosableLoader(str(tmp_path), file_name),
+    )
+
+    assert queued_batches(report_queue)[-1] == ('error', 'a.csv', "OSError('disk full')")
+
+
+def test_unlink_ignores_a_missing_block():
+    multiprocess_engine._unlink('psm_missing_block')
@@ -0,0 +1,129 @@
+import glob
+import os
+from unittest.mock import MagicMock
+import pandas as pd
+import pytest
+
+from src.models.csv_file_source import CsvFileSource
+from src.models.parse_cache import ParseCache
+
+pytestmark = pytest.mark.skipif(not ParseCache.is_available(), reason='requires pyarrow')
+
+
+@pytest.fixture
+def csv_file_path(tmpdir):
+    csv_file = tmpdir.join('cached.csv')
+    pd.DataFrame({'col1': range(5), 'col2': list('ABCDE')}).to_csv(csv_file, index=False)
+    return str(csv_file)
+
+
+def test_load_returns_none_on_miss(tmpdir, csv_file_path):
+    cache = ParseCache(cache_dir=str(tmpdir.join('cache')), max_bytes=1 << 20)
+    assert cache.load(csv_file_path, 'None') is None
+    assert cache.load_chunks(csv_file_path, 'None', chunk_size=2) is None
+
+
+def test_save_and_load(tmpdir, csv_file_path):
+    cache = ParseCache(cache_dir=str(tmpdir.join('cache')), max_bytes=1 << 20)
+    data_frame = pd.read_csv(csv_file_path)
+
+    cache.save(csv_file_path, 'None', data_frame)
+
+    pd.testing.assert_frame_equal(cache.load(csv_file_path, 'None'), data_frame)
+    assert cache.load(csv_file_path, 'other options') is None
+    parts = list(cache.load_chunks(csv_file_path, 'None', chunk_size=2))
+    assert [len(part) for part in parts] == [2, 2, 1]
+
+
+def test_changed_file_is_not_served(tmpdir, csv_file_path):
+    cache = ParseCache(cache_dir=str(tmpdir.join('cache')), max_bytes=1 << 20)
+    cache.save(csv_file_path, 'None', pd.read_csv(csv_file_path))
+
+    pd.DataFrame({'col1': [9], 'col2': ['Z']}).to_csv(csv_file_path, index=False)
+
+    assert cache.load(csv_file_path, 'None') is None
+
+
+def test_invalidate(tmpdir, csv_file_path):
+    cache = ParseCache(cache_dir=str(tmpdir.join('cache')), max_bytes=1 << 20)
+    cache.save(csv_file_path, 'None', pd.read_csv(csv_file_path))
+
+    cache.invalidate(csv_file_path)
+
+    assert cache.load(csv_file_path, 'None') is None
+
+
+def test_eviction_keeps_cache_within_max_bytes(tmpdir):
+    cache_dir = str(tmpdir.join('cache'))
+    cache = ParseCache(cache_dir=cache_dir, max_bytes=1)
+    for index in range(3):
+        csv_file = tmpdir.join(f'file{index}.csv')
+        pd.DataFrame({'col1': [index]}).to_csv(csv_file, index=False)
+        cache.save(str(csv_file), 'None', pd.read_csv(csv_file))
+
+    assert os.listdir(cache_dir) == []
+
+
+def test_csv_file_source_uses_cache(tmpdir, csv_file_path, monkeypatch):
+    cache = ParseCache(cache_dir=str(tmpdir.join('cache')), max_bytes=1 << 20)
+    expected_df = CsvFileSource(file_path=csv_file_path, parse_cache=cache).load()
+
+    monkeypatch.setattr(pd, 'read_csv', MagicMock(
+        side_effect=AssertionError('the cached file must not be parsed again')
+    ))
+    pd.testing.assert_frame_equal(
+        CsvFileSource(file_path=csv_file_path, parse_cache=cache).load(), expected_df
+    )
+    source = CsvFileSource(file_path=csv_file_path, chunk_size=4, parse_cache=cache)
+    parts = list(source.load_chunks())
+    assert [len(part) for part in parts] == [4, 1]
+
+
+def test_corrupt_entry_is_a_miss(tmpdir, csv_file_path):
+    cache_dir = tmpdir.join('cache')
+    cache = ParseCache(cache_dir=str(cache_dir), max_bytes=1 << 20)
+    cache.save(csv_file_path, 'None', pd.read_csv(csv_file_path))
+    (cache_path,) = cache_dir.listdir()
+    cache_path.write_binary(cache_path.read_binary()[:20])
+
+    assert cache.load(csv_file_path, 'None') is None
+    assert CsvFileSource(file_path=csv_file_path, parse_cache=cache).load()['col1'].tolist() == [
+        0, 1, 2, 3, 4
+    ]
+
+
+def test_save_writes_through_a_private_temporary_file(tmpdir, csv_file_path, monkeypatch):
+    cache_dir = tmpdir.join('cache')
+    cache = ParseCache(cache_dir=str(cache_dir), max_bytes=1 << 20)
+    replaced = []
+    replace = os.replace
+    monkeypatch.setattr(os, 'replace', lambda src, dst: replaced.append(src) or replace(src, dst))
+
+    cache.save(csv_file_path, 'None', pd.read_csv(csv_file_path))
+    cache.save(csv_file_path, 'None', pd.read_csv(csv_file_path))
+
+    assert len(set(replaced)) == 2
+    assert all(path.endswith('.tmp') for path in replaced)
+    assert len(cache_dir.listdir()) == 1
+
+
+def test_data_arrow_cannot_store_is_not_cached(tmpdir, csv_file_path):
+    cache_dir = tmpdir.join('cache')
+    cache = ParseCache(cache_dir=str(cache_dir), max_bytes=1 << 20)
+
+    cache.save(csv_file_path, 'None', pd.DataFrame({'col1': [1, 'A']}))
+
+    assert cache_dir.listdir() == []
+    assert cache.load(csv_file_path, 'None') is None
+
+
+def test_entries_removed_by_another_process_are_skipped(tmpdir, csv_file_path, monkeypatch):
+    cache_dir = tmpdir.join('cache')
+    cache = ParseCache(cache_dir=str(cache_dir), max_bytes=1)
+    removed_path = str(cache_dir.join('removed.arrow'))
+    list_paths = glob.glob
+    monkeypatch.setattr(glob, 'glob', lambda pattern: [removed_path, *list_paths(pattern)])
+
+    cache.save(csv_file_path, 'None', pd.read_csv(csv_file_path))
+
+    assert cache_dir.listdir() == []
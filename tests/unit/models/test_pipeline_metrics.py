@@ -0,0 +1,73 @@
+import json
+import pandas as pd
+
+from src.models.df_transformer import DataFrameRowDictTransformer
+from src.models.pipeline_metrics import PipelineMetrics
+from src.models.staged_pipeline import SOURCE_STAGE, StageReport
+
+
+def run_pipeline(metrics, data_frames):
+    for data_frame in metrics.track_extract(data_frames):
+        file_name = data_frame.attrs['file_name']
+        nbytes = PipelineMetrics.data_frame_bytes(data_frame)
+        documents = metrics.track_transform(
+            file_name, DataFrameRowDictTransformer(data_frame, batch_size=2), nbytes
+        )
+        with metrics.track_load(file_name, nbytes):
+            list(documents)
+
+
+def test_stages_are_measured_per_file():
+    first_part = pd.DataFrame({'col1': [1, 2, 3]})
+    first_part.attrs['file_name'] = 'a.csv'
+    second_part = pd.DataFrame({'col1': [4, 5]})
+    second_part.attrs['file_name'] = 'b.csv'
+    metrics = PipelineMetrics()
+
+    run_pipeline(metrics, [first_part, second_part])
+
+    summary = metrics.summary()
+    assert set(summary['files']) == {'a.csv', 'b.csv'}
+    stages = summary['files']['a.csv']['stages']
+    for stage in ('extract', 'transform', 'load'):
+        assert stages[stage]['rows'] == 3
+        assert stages[stage]['chunks'] == 1
+        assert stages[stage]['bytes'] == 24
+        assert stages[stage]['wall_seconds'] >= 0
+    assert summary['peak_rss_bytes'] > 0
+
+
+def test_stage_reports_are_recorded_as_the_stages_of_a_file():
+    metrics = PipelineMetrics()
+
+    metrics.record_stage_reports('a.csv', {
+        SOURCE_STAGE: StageReport(items=2, outputs=2, bytes=40, busy_seconds=0.5,
+                                  cpu_seconds=0.25),
+        'transform': StageReport(items=2, outputs=2, bytes=40, busy_seconds=1.0),
+        'load': StageReport(items=2, bytes=40, busy_seconds=2.0, blocked_seconds=3.0),
+    }, rows=7)
+
+    stages = metrics.summary()['files']['a.csv']['stages']
+    assert {stage: (values['rows'], values['chunks'], values['bytes'])
+            for stage, values in stages.items()} == {
+        'extract': (7, 2, 40), 'transform': (7, 2, 40), 'load': (7, 2, 40),
+    }
+    assert stages['extract']['wall_seconds'] == 0.5
+    assert stages['extract']['cpu_seconds'] == 0.25
+    assert stages['load']['wall_seconds'] == 2.0
+
+
+def test_export(tmpdir):
+    part = pd.DataFrame({'col1': [1, 2]})
+    part.attrs['file_name'] = 'a"b.csv'
+    metrics = PipelineMetrics()
+    run_pipeline(metrics, [part])
+
+    metrics.export(str(tmpdir), 'etl_test')
+
+    with open(tmpdir.join('etl_test.json'), encoding='utf-8') as json_file:
+        assert json.load(json_file)['files']['a"b.csv']['stages']['load']['rows'] == 2
+    prometheus_lines = tmpdir.join('etl_test.prom').read().splitlines()
+    assert '# TYPE etl_stage_rows gauge' in prometheus_lines
+    assert 'etl_stage_rows{file="a\\"b.csv",stage="transform"} 2' in prometheus_lines
+    assert any(line.startswith('etl_run_peak_rss_bytes ') for line in prometheus_lines)
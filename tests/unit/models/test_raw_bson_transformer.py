@@ -0,0 +1,50 @@
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from bson.raw_bson import RawBSONDocument
+
+from src.configs.mongodb import MongoDBConfigs
+from src.models.raw_bson_transformer import RawBsonTransformer, encode_documents, split_documents
+
+
+def test_transform_yields_raw_documents_in_row_order():
+    sample_data_frame = pd.DataFrame({
+        'id': np.arange(5, dtype='int64'),
+        'amount': [1.5, np.nan, 3.0, np.nan, 5.0],
+        'name': ['A', 'B', None, 'D', 'E'],
+    })
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        transformer = RawBsonTransformer(
+            sample_data_frame, executor, batch_size=2, field_aliases={'name': 'n'}
+        )
+        result = list(transformer.transform())
+
+    assert all(isinstance(document, RawBSONDocument) for document in result)
+    assert [
+        {
+            field: value for field, value in document.items()
+            if field not in ('_id', MongoDBConfigs.LOADED_AT_FIELD)
+        }
+        for document in result
+    ] == [
+        {'id': 0, 'amount': 1.5, 'n': 'A'},
+        {'id': 1, 'n': 'B'},
+        {'id': 2, 'amount': 3.0},
+        {'id': 3, 'n': 'D'},
+        {'id': 4, 'amount': 5.0, 'n': 'E'},
+    ]
+    assert len({document['_id'] for document in result}) == 5
+    assert all(MongoDBConfigs.LOADED_AT_FIELD in document for document in result)
+
+
+def test_split_documents_keeps_the_encoded_bytes():
+    sample_data_frame = pd.DataFrame({'id': [1.0, 2.0]})
+
+    buffer = encode_documents(
+        sample_data_frame, compact=True, field_aliases={}, integer_columns=('id',)
+    )
+    documents = split_documents(buffer)
+
+    assert b''.join(document.raw for document in documents) == buffer
+    assert [type(document['id']) for document in documents] == [int, int]
@@ -0,0 +1,55 @@
+import os
+import pstats
+import time
+import tracemalloc
+
+from src.models.run_profiler import RunProfiler
+
+
+def busy_work():
+    deadline = time.perf_counter() + 0.1
+    blocks = []
+    while time.perf_counter() < deadline:
+        blocks.append(bytearray(1024))
+    return blocks
+
+
+def test_profiles_are_written(tmpdir):
+    output_dir = str(tmpdir.join('profiles'))
+
+    with RunProfiler(output_dir, 'objects', sample_interval=0.001) as profiler:
+        blocks = busy_work()
+
+    assert blocks
+    stats = pstats.Stats(profiler.path('pstats'))
+    assert any(function[2] == 'busy_work' for function in stats.stats)
+    assert 'test_run_profiler.py' in tmpdir.join('profiles', 'objects.alloc.txt').read()
+    collapsed_lines = tmpdir.join('profiles', 'objects.collapsed').read().splitlines()
+    assert collapsed_lines
+    stacks = dict(line.rsplit(' ', 1) for line in collapsed_lines)
+    assert all(int(count) > 0 for count in stacks.values())
+    assert any(
+        stack.startswith('MainThread;') and 'busy_work' in stack for stack in stacks
+    )
+
+
+def test_peak_allocations_are_kept_when_the_block_stops_tracemalloc(tmpdir, monkeypatch):
+    monkeypatch.setattr('src.models.run_profiler._SNAPSHOT_INTERVAL', 0.001)
+    output_dir = str(tmpdir.join('profiles'))
+
+    with RunProfiler(output_dir, 'objects', sample_interval=0.001):
+        blocks = busy_work()
+        tracemalloc.stop()
+
+    assert blocks
+    assert 'test_run_profiler.py' in tmpdir.join('profiles', 'objects.alloc.txt').read()
+
+
+def test_write_errors_do_not_fail_the_run(tmpdir):
+    output_dir = tmpdir.join('profiles')
+    output_dir.write('not a directory')
+
+    with RunProfiler(str(output_dir), 'objects', sample_interval=0.001):
+        busy_work()
+
+    assert os.path.isfile(str(output_dir))
@@ -0,0 +1,60 @@
+import pandas as pd
+import pytest
+
+from src.models.csv_file_source import CsvFileSource
+from src.models.shard_planner import ShardPlanner
+
+
+def test_record_boundaries_skip_quoted_line_feeds(tmpdir, monkeypatch):
+    monkeypatch.setattr('src.models.shard_planner._SCAN_BLOCK_SIZE', 7)
+    csv_file = tmpdir.join('quoted.csv')
+    csv_file.write_binary(b'a,b\n1,"x\ny"\n2,"z ""q""\n"\n3,w\n')
+
+    boundaries = ShardPlanner.record_boundaries(str(csv_file), [5, 6, 14, 30])
+
+    assert boundaries == [12, 25]
+
+
+def test_plan_splits_large_files_and_groups_small_ones(tmpdir):
+    large_file = tmpdir.join('large.csv')
+    large_file.write('id,name\n' + ''.join(f'{index},name {index}\n' for index in range(100)))
+    medium_file = tmpdir.join('medium.csv')
+    medium_file.write('id\n' + '1\n' * 200)
+    small_files = [tmpdir.join(f'small{index}.csv') for index in range(3)]
+    for small_file in small_files:
+        small_file.write('id\n1\n')
+    planner = ShardPlanner(target_bytes=500, small_file_bytes=100)
+
+    tasks = planner.plan([str(path) for path in [*small_files, medium_file, large_file]])
+
+    shards = [task for task in tasks if 'byte_range' in task]
+    assert len(shards) == 3
+    assert shards[0]['byte_range'][0] == 0
+    assert shards[-1]['byte_range'][1] == large_file.size()
+    for shard, next_shard in zip(shards, shards[1:]):
+        assert shard['byte_range'][1] == next_shard['byte_range'][0]
+    assert {'file_paths': [str(medium_file)]} in tasks
+    assert tasks[-1] == {'file_paths': [str(path) for path in small_files]}
+
+
+@pytest.mark.parametrize('chunk_size', [7, None])
+def test_shards_load_the_rows_of_the_file(tmpdir, chunk_size):
+    csv_file = tmpdir.join('data.csv')
+    data_frame = pd.DataFrame({
+        'id': range(50),
+        'text': [f'line\n"{index}", quoted' for index in range(50)],
+    })
+    data_frame.to_csv(csv_file, index=False)
+    tasks = ShardPlanner(target_bytes=300, small_file_bytes=0).plan([str(csv_file)])
+
+    parts = [
+        part
+        for task in tasks
+        for part in CsvFileSource(
+            str(csv_file), chunk_size=chunk_size, byte_range=task['byte_range']
+        ).load_chunks()
+    ]
+
+    assert len(tasks) > 1
+    assert all(part.attrs['file_name'] == 'data.csv' for part in parts)
+    pd.testing.assert_frame_equal(pd.concat(parts, ignore_index=True), data_frame)
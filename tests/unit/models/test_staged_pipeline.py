@@ -0,0 +1,165 @@
+import threading
+import time
+import pytest
+
+from src.models.staged_pipeline import SOURCE_STAGE, Stage, StagedPipeline
+
+
+def test_run_passes_items_through_the_stages():
+    loaded = []
+    lock = threading.Lock()
+
+    def split(item):
+        return [item * 10, item * 10 + 1]
+
+    def load(item):
+        with lock:
+            loaded.append(item)
+
+    pipeline = StagedPipeline(
+        stages=[Stage('split', split, workers=3), Stage('load', load, workers=2)],
+        max_inflight_bytes=100,
+        size_of=lambda item: 10,
+    )
+    reports = pipeline.run(range(20))
+
+    assert sorted(loaded) == sorted(value for item in range(20) for value in split(item))
+    assert reports[SOURCE_STAGE].items == 20
+    assert reports[SOURCE_STAGE].bytes == 200
+    assert reports['split'].items == 20
+    assert reports['split'].outputs == 40
+    assert reports['load'].items == 40
+
+
+def test_run_throttles_the_source_to_the_byte_budget():
+    inflight = []
+    produced = []
+    lock = threading.Lock()
+
+    def source():
+        for item in range(12):
+            with lock:
+                produced.append(item)
+                inflight.append(len(produced) - len(loaded))
+            yield item
+
+    loaded = []
+
+    def slow_load(item):
+        time.sleep(0.01)
+        with lock:
+            loaded.append(item)
+
+    pipeline = StagedPipeline(
+        stages=[Stage('pass', lambda item: [item], workers=2, queue_size=10),
+                Stage('load', slow_load, queue_size=10)],
+        max_inflight_bytes=30,
+        size_of=lambda item: 10,
+    )
+    reports = pipeline.run(source())
+
+    assert sorted(loaded) == list(range(12))
+    assert max(inflight) <= 4  # three admitted items and the one being produced
+    assert reports[SOURCE_STAGE].blocked_seconds > 0
+
+
+def test_run_raises_the_first_stage_error():
+    def load(item):
+        if item == 3:
+            raise ValueError('bad item')
+
+    pipeline = StagedPipeline(stages=[Stage('load', load, workers=2)])
+    with pytest.raises(ValueError, match='bad item'):
+        pipeline.run(range(1000))
+
+
+def test_run_needs_a_stage():
+    with pytest.raises(ValueError, match='at least one stage'):
+        StagedPipeline(stages=[])
+
+
+def test_run_raises_the_source_error_after_processing_the_queued_items():
+    loaded = []
+
+    def source():
+        yield from range(3)
+        raise OSError('unreadable file')
+
+    pipeline = StagedPipeline(stages=[Stage('load', loaded.append, queue_size=10)])
+    with pytest.raises(OSError, match='unreadable file'):
+        pipeline.run(source())
+
+    assert pipeline.reports[SOURCE_STAGE].items == 3
+    assert len(loaded) <= 3
+
+
+def test_run_stops_the_source_waiting_for_the_budget():
+    def load(item):
+        time.sleep(0.2 if item == 0 else 0.5)
+        if item == 0:
+            raise ValueError('write failed')
+
+    # the third item does not fit next to the second one, which is still loading
+    pipeline = StagedPipeline(
+        stages=[Stage('load', load, workers=2)],
+        max_inflight_bytes=20,
+        size_of=lambda item: (5, 10, 15)[item],
+    )
+    with pytest.raises(ValueError, match='write failed'):
+        pipeline.run(range(3))
+
+    assert pipeline.reports[SOURCE_STAGE].items == 2
+    assert pipeline.reports[SOURCE_STAGE].blocked_seconds > 0.1
+
+
+def test_run_stops_a_stage_waiting_for_room_in_the_next_queue():
+    def load(item):
+        time.sleep(0.2)
+        raise ValueError('write failed')
+
+    pipeline = StagedPipeline(stages=[
+        Stage('split', lambda item: range(10)),
+        Stage('load', load, queue_size=1),
+    ])
+    with pytest.raises(ValueError, match='write failed'):
+        pipeline.run(range(5))
+
+    assert pipeline.reports['split'].items == 0
+    assert pipeline.reports['split'].outputs == 2
+    assert pipeline.reports['split'].blocked_seconds > 0
+
+
+def test_run_measures_the_waits_for_input():
+    def slow_source():
+        for item in range(2):
+            time.sleep(0.15)
+            yield item
+
+    pipeline = StagedPipeline(stages=[Stage('load', lambda item: None)])
+    reports = pipeline.run(slow_source())
+
+    assert reports['load'].items == 2
+    assert reports['load'].idle_seconds > 0.1
+    assert reports[SOURCE_STAGE].busy_seconds >= 0.3
+    assert reports[SOURCE_STAGE].items_per_sec < 10
+
+
+def test_run_reports_the_stages_per_key():
+    pipeline = StagedPipeline(
+        stages=[
+            Stage('split', lambda item: [item, item], workers=2),
+            Stage('load', lambda item: None),
+        ],
+        size_of=lambda item: item,
+        key_of=lambda item: item % 2,
+    )
+    reports = pipeline.run(range(1, 6))
+
+    assert sorted(pipeline.reports_by_key) == [0, 1]
+    odd, even = pipeline.reports_by_key[1], pipeline.reports_by_key[0]
+    assert (odd[SOURCE_STAGE].items, odd[SOURCE_STAGE].bytes) == (3, 9)
+    assert (even[SOURCE_STAGE].items, even[SOURCE_STAGE].bytes) == (2, 6)
+    assert (odd['split'].items, odd['split'].outputs, odd['load'].items) == (3, 6, 6)
+    assert (even['split'].items, even['split'].outputs, even['load'].items) == (2, 4, 4)
+    assert reports['load'].items == 10
+    assert StagedPipeline([Stage('load', lambda item: None)]).reports_by_key == {}
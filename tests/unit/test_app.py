@@ -1,91 +1,436 @@
-"""
-Module for defining the App class tests.
-
-This module contains  tests for the App class using the pytest framework.
-
-Tests:
-    test_run: Test for the 'run' method of the App class.
-    test_create_csv_file_sources: Test for the 'create_csv_file_sources' method of the App class.
-"""
-
-from unittest.mock import MagicMock, call
-import pytest
-
-from src import App
-from src.models.csv_file_source import CsvFileSource
-from src.models.csv_file_extractor import CsvFileExtractor
-from src.models.df_transformer import DataFrameRowDictTransformer
-from src.models.mongodb_loader import MongoDBLoader, MongoDBStorage
-
-
-def test_run(monkeypatch):
-    """
-    Test for the 'run' method of the App class.
-    """
-    file_paths = ['/path/to/file1.csv', '/path/to/file2.csv']
-
-    csv_file_sources = [
-        CsvFileSource(file_path=file_paths[0]),
-        CsvFileSource(file_path=file_paths[1]),
-    ]
-
-    mock_source = MagicMock(return_value=csv_file_sources)
-    monkeypatch.setattr(App, 'create_csv_file_sources', mock_source)
-
-    extracted_data_iterator = [
-        MagicMock(),
-        MagicMock(),
-    ]
-
-    mock_extract = MagicMock(return_value=extracted_data_iterator)
-    monkeypatch.setattr(CsvFileExtractor, 'extract', mock_extract)
-
-    transformed_data = MagicMock()
-
-    mock_transformer = MagicMock(return_value=transformed_data)
-    monkeypatch.setattr(DataFrameRowDictTransformer, 'transform', mock_transformer)
-
-    mock_loader = MagicMock()
-    monkeypatch.setattr(MongoDBLoader, 'load', mock_loader)
-
-    def mock_init(_):
-        pass
-
-    monkeypatch.setattr(MongoDBStorage, '__init__', mock_init)
-
-    App.run(file_paths)
-    App.create_csv_file_sources.assert_called_once_with(file_paths)
-
-    mock_extract.assert_called_once()
-
-    assert mock_transformer.call_count == len(extracted_data_iterator)
-
-    assert mock_loader.call_count == len(extracted_data_iterator)
-
-    expected_calls = [call(input_data=transformed_data) for _ in extracted_data_iterator]
-    mock_loader.assert_has_calls(expected_calls)
-
-
-@pytest.mark.parametrize(
-    "file_paths, expected_sources",
-    [
-        (['file1.csv'], [CsvFileSource(file_path='file1.csv')]),
-        (
-                ['file1.csv', 'file2.csv', 'file3.csv'],
-                [
-                    CsvFileSource(file_path='file1.csv'),
-                    CsvFileSource(file_path='file2.csv'),
-                    CsvFileSource(file_path='file3.csv')
-                ]
-        )
-    ]
-)
-def test_create_csv_file_sources(file_paths, expected_sources):
-    """
-    Test for the 'create_csv_file_sources' method of the App class.
-    """
-    sources = App.create_csv_file_sources(file_paths)
-    assert len(sources) == len(expected_sources)
-    for i, expected_source in enumerate(expected_sources):
-        assert isinstance(sources[i], CsvFileSource)
-        assert sources[i].file_path == expected_source.file_path
+"""
+Module for defining the App class tests.
+
+This module contains  tests for the App class using the pytest framework.
+
+Tests:
+    test_run: Test for the 'run' method of the App class.
+    test_create_csv_file_sources: Test for the 'create_csv_file_sources' method of the App class.
+"""
+
+import json
+import os
+import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from unittest.mock import MagicMock
+import pandas as pd
+import pytest
+from bson.raw_bson import RawBSONDocument
+
+import src
+from src.app import App
+from src.models.csv_file_source import CsvFileSource
+from src.models.csv_file_extractor import CsvFileExtractor
+from src.models.df_transformer import DataFrameRowDictTransformer
+from src.models.mongodb_loader import MongoDBLoader, MongoDBStorage
+from src.models.parse_cache import ParseCache
+from src.models.pipeline_metrics import PipelineMetrics
+from src.configs.app import AppConfigs
+from src.configs.mongodb import MongoDBConfigs
+
+
+@pytest.mark.parametrize('engine', ['inline', 'staged'])
+def test_run(monkeypatch, mongo_client_fixture, engine):  # pylint: disable=too-many-locals
+    """
+    Test for the 'run' method of the App class.
+    """
+    monkeypatch.setattr(AppConfigs, 'ENGINE', engine)
+    file_paths = ['/path/to/file1.csv', '/path/to/file2.csv']
+
+    csv_file_sources = [
+        CsvFileSource(file_path=file_paths[0]),
+        CsvFileSource(file_path=file_paths[1]),
+    ]
+
+    mock_source = MagicMock(return_value=csv_file_sources)
+    monkeypatch.setattr(App, 'create_csv_file_sources', mock_source)
+
+    extracted_data_iterator = [
+        MagicMock(),
+        MagicMock(),
+    ]
+
+    mock_extract = MagicMock(return_value=extracted_data_iterator)
+    monkeypatch.setattr(CsvFileExtractor, 'extract', mock_extract)
+
+    transformed_data = [{'col1': 1}, {'col1': 2}]
+
+    mock_transformer = MagicMock(return_value=transformed_data)
+    monkeypatch.setattr(DataFrameRowDictTransformer, 'transform', mock_transformer)
+
+    loaded_data = []
+    mock_loader = MagicMock(
+        side_effect=lambda input_data: loaded_data.append(list(input_data))
+    )
+    monkeypatch.setattr(MongoDBLoader, 'load', mock_loader)
+
+    mock_collection = mongo_client_fixture[MongoDBConfigs.MONGO_DATABASE][
+        MongoDBConfigs.INVESTMENT_COLLECTION
+    ]
+    mock_collection.index_information.return_value = {}
+    mock_bump_load_generation = MagicMock()
+    monkeypatch.setattr(MongoDBStorage, 'bump_load_generation', mock_bump_load_generation)
+
+    summary = App.run(file_paths, chunk_size=None)
+    App.create_csv_file_sources.assert_called_once_with(
+        file_paths, chunk_size=None, byte_range=None
+    )
+
+    mock_extract.assert_called_once()
+
+    assert mock_transformer.call_count == len(extracted_data_iterator)
+
+    assert mock_loader.call_count == len(extracted_data_iterator)
+
+    assert loaded_data == [transformed_data for _ in extracted_data_iterator]
+
+    assert len(summary['files']) == len(extracted_data_iterator)
+    for file_summary in summary['files'].values():
+        assert file_summary['stages']['transform']['rows'] == len(transformed_data)
+        assert file_summary['stages']['load']['rows'] == len(transformed_data)
+        assert file_summary['stages']['load']['chunks'] == 1
+
+    mock_collection.create_index.assert_called_once_with(
+        [(MongoDBConfigs.SEARCH_QUERY_COLUMN, 'text')],
+        name=f'{MongoDBConfigs.SEARCH_QUERY_COLUMN}_text',
+    )
+    mock_collection.drop_index.assert_not_called()
+    mock_collection.create_indexes.assert_not_called()
+    assert mock_bump_load_generation.call_count == mock_loader.call_count
+
+
+@pytest.mark.parametrize(
+    "file_paths, expected_sources",
+    [
+        (['file1.csv'], [CsvFileSource(file_path='file1.csv')]),
+        (
+                ['file1.csv', 'file2.csv', 'file3.csv'],
+                [
+                    CsvFileSource(file_path='file1.csv'),
+                    CsvFileSource(file_path='file2.csv'),
+                    CsvFileSource(file_path='file3.csv')
+                ]
+        )
+    ]
+)
+def test_create_csv_file_sources(file_paths, expected_sources):
+    """
+    Test for the 'create_csv_file_sources' method of the App class.
+    """
+    sources = App.create_csv_file_sources(file_paths)
+    assert len(sources) == len(expected_sources)
+    for i, expected_source in enumerate(expected_sources):
+        assert isinstance(sources[i], CsvFileSource)
+        assert sources[i].file_path == expected_source.file_path
+
+
+def test_create_csv_file_sources_with_chunk_size():
+    """
+    Test that the 'create_csv_file_sources' method passes the chunk size to the sources.
+    """
+    sources = App.create_csv_file_sources(['file1.csv', 'file2.csv'], chunk_size=10)
+    assert [source.chunk_size for source in sources] == [10, 10]
+
+
+@pytest.mark.skipif(not ParseCache.is_available(), reason='requires pyarrow')
+def test_create_csv_file_sources_share_the_parse_cache(monkeypatch, tmpdir):
+    """
+    Test that the sources share one parse cache when AppConfigs.PARSE_CACHE_ENABLED is set.
+    """
+    monkeypatch.setattr(AppConfigs, 'PARSE_CACHE_ENABLED', True)
+    monkeypatch.setattr(AppConfigs, 'PARSE_CACHE_DIR', str(tmpdir))
+
+    sources = App.create_csv_file_sources(['file1.csv', 'file2.csv'])
+
+    assert sources[0].parse_cache is sources[1].parse_cache
+    assert sources[0].parse_cache.cache_dir == str(tmpdir)
+
+
+def test_create_loader(monkeypatch):
+    """
+    Test that the 'create_loader' method identifies documents by the registered natural key.
+    """
+    def mock_init(storage, **kwargs):
+        storage.__dict__.update(kwargs)
+
+    monkeypatch.setattr(MongoDBStorage, '__init__', mock_init)
+
+    loader = App.create_loader('funding_rounds.csv', ['funding_round_id', 'object_id'])
+
+    assert loader.storage.natural_key == ('funding_round_id',)
+    assert loader.storage.key_prefix == 'funding_rounds'
+    assert 'collection_name' not in loader.storage.__dict__
+
+
+def test_create_loader_routes_by_source(monkeypatch):
+    """
+    Test that the 'create_loader' method routes the data into the collection of its file.
+    """
+    def mock_init(storage, **kwargs):
+        storage.__dict__.update(kwargs)
+
+    monkeypatch.setattr(MongoDBStorage, '__init__', mock_init)
+    monkeypatch.setattr(MongoDBConfigs, 'ROUTE_BY_SOURCE', True)
+
+    loader = App.create_loader('investments.csv', ['id', 'funding_round_id', 'funded_object_id'])
+
+    assert loader.storage.collection_name == 'investments'
+    assert loader.storage.text_index is False
+    assert loader.storage.secondary_indexes == ['funding_round_id', 'funded_object_id']
+
+
+def test_create_transformer_uses_the_schema_of_the_file(monkeypatch):
+    """
+    Test that the 'create_transformer' method takes the field aliases and the integer columns
+    from the schema of the file of the part.
+    """
+    monkeypatch.setattr(AppConfigs, 'FIELD_ALIASES', True)
+    monkeypatch.setattr(AppConfigs, 'COMPACT_DOCUMENTS', True)
+    data_frame = pd.DataFrame({'object_id': ['c:1'], 'sequence': [2.0]})
+    data_frame.attrs['file_name'] = 'relationships.csv'
+
+    relationships = App.create_transformer(data_frame)
+    data_frame.attrs['file_name'] = 'degrees.csv'
+    degrees = App.create_transformer(data_frame)
+
+    assert relationships.field_aliases == {}
+    assert relationships.integer_columns == ('sequence',)
+    assert list(relationships.transform()) == [{'object_id': 'c:1', 'sequence': 2}]
+    assert degrees.field_aliases == {'object_id': 'oid'}
+    assert not degrees.integer_columns
+
+
+@pytest.mark.parametrize(
+    'route_by_source, byte_range, dropped',
+    [(True, None, True), (False, None, False), (True, [0, 100], False)],
+)
+def test_run_defers_indexes_of_owned_collections(
+        monkeypatch, mongo_client_fixture, route_by_source, byte_range, dropped
+):
+    """
+    Test that indexes are only dropped and rebuilt by tasks that own their collection.
+    """
+    monkeypatch.setattr(MongoDBConfigs, 'DEFER_INDEXES', True)
+    monkeypatch.setattr(MongoDBConfigs, 'ROUTE_BY_SOURCE', route_by_source)
+    monkeypatch.setattr(App, 'create_csv_file_sources', MagicMock(return_value=[]))
+    extracted_data = pd.DataFrame({MongoDBConfigs.SEARCH_QUERY_COLUMN: ['an ai startup']})
+    extracted_data.attrs['file_name'] = 'objects.csv'
+    monkeypatch.setattr(CsvFileExtractor, 'extract', MagicMock(return_value=[extracted_data]))
+    collection_name = 'objects' if route_by_source else MongoDBConfigs.INVESTMENT_COLLECTION
+    mock_collection = mongo_client_fixture[MongoDBConfigs.MONGO_DATABASE][collection_name]
+    mock_collection.index_information.return_value = {
+        f'{MongoDBConfigs.SEARCH_QUERY_COLUMN}_text': {},
+    }
+
+    App.run(['objects.csv'], byte_range=byte_range)
+
+    if dropped:
+        mock_collection.drop_index.assert_called_once_with(
+            f'{MongoDBConfigs.SEARCH_QUERY_COLUMN}_text'
+        )
+        mock_collection.create_indexes.assert_called_once()
+    else:
+        mock_collection.drop_index.assert_not_called()
+        mock_collection.create_indexes.assert_not_called()
+
+
+@pytest.mark.parametrize('write_mode, engine', [
+    ('insert', 'multiprocess'),
+    ('upsert', 'inline'),
+])
+def test_run_pipeline_runs_the_multiprocess_engine_only_for_inserts(
+        monkeypatch, write_mode, engine
+):
+    """
+    Test that the multiprocess engine is replaced by the inline one with a warning when
+    documents are not inserted.
+    """
+    monkeypatch.setattr(AppConfigs, 'ENGINE', 'multiprocess')
+    monkeypatch.setattr(AppConfigs, 'METRICS_DIR', None)
+    monkeypatch.setattr(MongoDBConfigs, 'WRITE_MODE', write_mode)
+    mock_logger = MagicMock()
+    monkeypatch.setattr('src.app.logger', mock_logger)
+    mock_engine = MagicMock()
+    monkeypatch.setattr(App, 'create_engine', MagicMock(return_value=mock_engine))
+    monkeypatch.setattr(App, 'run_inline', MagicMock(return_value=PipelineMetrics()))
+    mock_engine.run.return_value = PipelineMetrics()
+
+    App.run_pipeline(['objects.csv'], chunk_size=10)
+
+    assert App.engine() == engine
+    if engine == 'multiprocess':
+        App.create_engine.assert_called_once_with(10)
+        mock_engine.run.assert_called_once_with(['objects.csv'], None)
+        App.run_inline.assert_not_called()
+        mock_logger.warning.assert_not_called()
+    else:
+        App.create_engine.assert_not_called()
+        App.run_inline.assert_called_once_with(['objects.csv'], 10, None)
+        assert 'MONGO_WRITE_MODE is upsert' in mock_logger.warning.call_args[0][0]
+
+
+@pytest.mark.parametrize('workers, write_mode, pooled', [
+    (2, 'insert', True), (0, 'insert', False), (2, 'upsert', False),
+])
+def test_create_encode_executor(monkeypatch, workers, write_mode, pooled):
+    """
+    Test that documents are only encoded in a process pool when workers are configured and
+    documents are inserted.
+    """
+    monkeypatch.setattr(AppConfigs, 'BSON_ENCODE_WORKERS', workers)
+    monkeypatch.setattr(MongoDBConfigs, 'WRITE_MODE', write_mode)
+
+    executor = App.create_encode_executor()
+
+    assert isinstance(executor, ProcessPoolExecutor) is pooled
+    if pooled:
+        executor.shutdown()
+
+
+@pytest.mark.parametrize('engine', ['inline', 'staged'])
+def test_run_loads_documents_encoded_by_the_encode_executor(monkeypatch, engine):
+    """
+    Test that the parts are encoded into BSON by the encode executor, which is shut down
+    after the run.
+    """
+    monkeypatch.setattr(AppConfigs, 'ENGINE', engine)
+    executor = MagicMock(wraps=ThreadPoolExecutor(max_workers=1))
+    monkeypatch.setattr(App, 'create_encode_executor', MagicMock(return_value=executor))
+    monkeypatch.setattr(App, 'create_csv_file_sources', MagicMock(return_value=[]))
+    extracted_data = pd.DataFrame({'name': ['Acme']})
+    extracted_data.attrs['file_name'] = 'objects.csv'
+    monkeypatch.setattr(CsvFileExtractor, 'extract', MagicMock(return_value=[extracted_data]))
+    loader = MagicMock()
+    loaded_documents = []
+    loader.load.side_effect = lambda input_data: loaded_documents.extend(list(input_data))
+    monkeypatch.setattr(App, 'create_loader', MagicMock(return_value=loader))
+
+    App.run(['objects.csv'])
+
+    assert [document['name'] for document in loaded_documents] == ['Acme']
+    assert all(isinstance(document, RawBSONDocument) for document in loaded_documents)
+    executor.shutdown.assert_called_once_with(cancel_futures=True)
+
+
+def test_create_engine_takes_the_schemas_of_the_files(monkeypatch):
+    """
+    Test that the 'create_engine' method configures the engine with the field aliases and
+    the integer columns of the schemas.
+    """
+    monkeypatch.setattr(AppConfigs, 'FIELD_ALIASES', True)
+    monkeypatch.setattr(AppConfigs, 'ENGINE_PARSE_WORKERS', 3)
+    monkeypatch.setattr(AppConfigs, 'ENGINE_WRITER_PROCESSES', 2)
+
+    engine = App.create_engine(chunk_size=10)
+
+    assert engine.source_factory is App.create_csv_file_sources
+    assert engine.loader_factory is App.create_loader
+    assert (engine.parse_workers, engine.writer_processes, engine.chunk_size) == (3, 2, 10)
+    assert engine.field_aliases['degrees.csv']['object_id'] == 'oid'
+    assert engine.integer_columns['relationships.csv'] == ('sequence',)
+
+
+def test_run_pipeline_exports_the_metrics(monkeypatch, tmpdir):
+    """
+    Test that the 'run_pipeline' method exports the metrics named by file when
+    AppConfigs.METRICS_DIR is set.
+    """
+    monkeypatch.setattr(AppConfigs, 'ENGINE', 'inline')
+    monkeypatch.setattr(AppConfigs, 'METRICS_DIR', str(tmpdir))
+    monkeypatch.setattr(App, 'run_inline', MagicMock(return_value=PipelineMetrics()))
+
+    summary = App.run_pipeline(['data/objects.csv'])
+
+    assert sorted(path.basename for path in tmpdir.listdir()) == [
+        'etl_objects.json', 'etl_objects.prom',
+    ]
+    assert json.loads(tmpdir.join('etl_objects.json').read())['files'] == summary['files']
+
+
+def test_run_with_profiling(monkeypatch, tmpdir):
+    """
+    Test that the 'run' method writes the profiles of the run named by run id and file.
+    """
+    mock_run_pipeline = MagicMock(return_value={'files': {}})
+    monkeypatch.setattr(App, 'run_pipeline', mock_run_pipeline)
+    monkeypatch.setattr(AppConfigs, 'PROFILE_DIR', str(tmpdir))
+
+    summary = App.run(
+        ['data/objects.csv'], profile=True, run_id='scheduled__2023-01-01T00:00:00+00:00'
+    )
+
+    assert summary == {'files': {}}
+    mock_run_pipeline.assert_called_once()
+    run_dir = tmpdir.join(AppConfigs.NAME, 'scheduled__2023-01-01T00_00_00_00_00')
+    assert sorted(path.basename for path in run_dir.listdir()) == [
+        'objects.alloc.txt', 'objects.collapsed', 'objects.pstats',
+    ]
+
+
+def test_run_name_includes_the_byte_range():
+    """
+    Test that the run of a shard is named by its file and byte range.
+    """
+    assert App.run_name(['data/objects.csv', 'data/ipos.csv']) == 'objects_ipos'
+    assert App.run_name(['data/objects.csv'], [0, 100]) == 'objects_0-100'
+
+
+@pytest.mark.parametrize('engine', ['inline', 'staged'])
+def test_run_keeps_the_run_error_when_a_loader_fails_to_close(monkeypatch, engine):
+    """
+    Test that a failing 'close' of a loader does not replace the error of a failed run.
+    """
+    monkeypatch.setattr(AppConfigs, 'ENGINE', engine)
+    monkeypatch.setattr(App, 'create_csv_file_sources', MagicMock(return_value=[]))
+
+    def mock_extract(_):
+        yield MagicMock()
+        raise RuntimeError('extract failed')
+
+    monkeypatch.setattr(CsvFileExtractor, 'extract', mock_extract)
+    monkeypatch.setattr(DataFrameRowDictTransformer, 'transform', MagicMock(return_value=[]))
+    loader = MagicMock()
+    loader.close.side_effect = ValueError('close failed')
+    monkeypatch.setattr(App, 'create_loader', MagicMock(return_value=loader))
+
+    with pytest.raises(RuntimeError, match='extract failed'):
+        App.run(['file1.csv'])
+    assert loader.close.call_count == App.create_loader.call_count
+
+
+@pytest.mark.parametrize('engine', ['inline', 'staged'])
+def test_run_raises_the_close_error_of_a_successful_run(monkeypatch, engine):
+    """
+    Test that a failing 'close' of a loader fails a run that succeeded otherwise.
+    """
+    monkeypatch.setattr(AppConfigs, 'ENGINE', engine)
+    monkeypatch.setattr(App, 'create_csv_file_sources', MagicMock(return_value=[]))
+    monkeypatch.setattr(CsvFileExtractor, 'extract', MagicMock(return_value=[MagicMock()]))
+    monkeypatch.setattr(DataFrameRowDictTransformer, 'transform', MagicMock(return_value=[]))
+    loader = MagicMock()
+    loader.close.side_effect = ValueError('close failed')
+    monkeypatch.setattr(App, 'create_loader', MagicMock(return_value=loader))
+
+    with pytest.raises(ValueError, match='close failed'):
+        App.run(['file1.csv'])
+
+
+def test_package_imports_app_on_first_access():
+    """
+    Test that the package resolves App on first access, so importing the configurations
+    does not import pandas and pymongo.
+    """
+    imported = subprocess.run(
+        [sys.executable, '-c', (
+            'import sys, src.configs.app, src.configs.mongodb; '
+            'print(sorted({"pandas", "pymongo"} & set(sys.modules)))'
+        )],
+        capture_output=True, text=True, check=True,
+        cwd=os.path.dirname(os.path.dirname(src.__file__)),
+    ).stdout
+
+    assert imported.strip() == '[]'
+    assert src.App is App
+    with pytest.raises(AttributeError, match='Loader'):
+        getattr(src, 'Loader')
@@ -0,0 +1,83 @@
+"""
+Module for defining the QueryCache tests.
+"""
+import os
+
+from search_cache import QueryCache
+
+
+def test_get_returns_results_of_same_generation():
+    """
+    Test that cached results are only served for the load generation they were cached at.
+    """
+    cache = QueryCache(max_entries=2, ttl_seconds=60)
+    cache.put('ai', 1, [{'_id': 1}])
+
+    assert cache.get('ai', 1) == [{'_id': 1}]
+    assert cache.get('ai', 2) is None
+    assert cache.get('ai', 1) is None
+
+
+def test_expired_entries_are_not_served(monkeypatch):
+    """
+    Test that entries older than the ttl are not served.
+    """
+    cache = QueryCache(max_entries=2, ttl_seconds=60)
+    monkeypatch.setattr('search_cache.time.time', lambda: 1000.0)
+    cache.put('ai', 1, [{'_id': 1}])
+
+    monkeypatch.setattr('search_cache.time.time', lambda: 1061.0)
+
+    assert cache.get('ai', 1) is None
+
+
+def test_least_recently_used_entry_is_evicted():
+    """
+    Test that a full cache evicts its least recently used entry.
+    """
+    cache = QueryCache(max_entries=2, ttl_seconds=60)
+    cache.put('ai', 1, [])
+    cache.put('biotech', 1, [])
+    cache.get('ai', 1)
+
+    cache.put('fintech', 1, [])
+
+    assert cache.get('biotech', 1) is None
+    assert cache.get('ai', 1) == []
+
+
+def test_cache_is_persisted_on_flush(tmpdir):
+    """
+    Test that the cache is only written to its file on flush and read back on start.
+    """
+    path = str(tmpdir.join('cache', 'queries.json'))
+    cache = QueryCache(max_entries=2, ttl_seconds=60, path=path)
+    cache.put('ai', 3, [{'_id': 1}])
+
+    assert not os.path.exists(path)
+    cache.flush()
+
+    assert QueryCache(max_entries=2, ttl_seconds=60, path=path).get('ai', 3) == [{'_id': 1}]
+
+
+def test_flush_only_writes_changed_entries(tmpdir):
+    """
+    Test that flush skips caches without a file and entries that did not change.
+    """
+    QueryCache(max_entries=2, ttl_seconds=60).flush()
+    path = str(tmpdir.join('queries.json'))
+    cache = QueryCache(max_entries=2, ttl_seconds=60, path=path)
+    cache.put('ai', 3, [{'_id': 1}])
+    cache.flush()
+    os.remove(path)
+
+    cache.flush()
+
+    assert not os.path.exists(path)
+
+
+def test_normalize():
+    """
+    Test that queries are cached by their lowercase words.
+    """
+    assert QueryCache.normalize('  AI   Startup ') == 'ai startup'
@@ -0,0 +1,183 @@
+"""
+Module for defining the BM25 search index tests.
+"""
+import os
+from datetime import datetime
+import numpy as np
+import pytest
+
+from search_index import (
+    CURRENT_FILE, BM25Index, BM25IndexBuilder, decode_varints, encode_varints, length_norms,
+)
+
+
+LOADED_AT = datetime(2024, 1, 1)
+
+
+class FakeCursor(list):
+    """
+    Cursor stand-in that supports sort by _id.
+    """
+    def sort(self, key, direction):
+        """
+        Sorts the documents by a key, in descending order for a negative direction.
+        """
+        return FakeCursor(sorted(self, key=lambda document: document[key], reverse=direction < 0))
+
+
+class FakeCollection:  # pylint: disable=too-few-public-methods
+    """
+    Collection stand-in that supports the queries of the index builder.
+    """
+    def __init__(self, name, documents):
+        self.name = name
+        self.documents = documents
+
+    def find(self, query, projection):
+        """
+        Finds the documents with a search text written since the $gte of _loaded_at.
+        """
+        loaded_since = query.get('_loaded_at', {}).get('$gte')
+        return FakeCursor(
+            {key: document[key] for key in ('_id', *projection) if key in document}
+            for document in self.documents
+            if isinstance(document.get('source_description'), str)
+            and (loaded_since is None or document['_loaded_at'] >= loaded_since)
+        )
+
+
+@pytest.fixture(name='collection')
+def collection_fixture():
+    """
+    Collection fixture with three indexed documents and one without a search text.
+    """
+    return FakeCollection('investment', [
+        {'_id': 1, 'source_description': 'AI startup raises seed round', '_loaded_at': LOADED_AT},
+        {'_id': 2, 'source_description': 'Biotech company acquired', '_loaded_at': LOADED_AT},
+        {'_id': 3, 'source_description': 'AI AI AI platform', '_loaded_at': LOADED_AT},
+        {'_id': 4, 'source_description': float('nan'), '_loaded_at': LOADED_AT},
+    ])
+
+
+def test_varints_round_trip():
+    """
+    Test that varint encoding round trips small and large integers.
+    """
+    values = [0, 1, 127, 128, 300, 2 ** 32]
+    decoded = decode_varints(np.frombuffer(encode_varints(values), dtype=np.uint8))
+    assert decoded.tolist() == values
+    assert decode_varints(np.zeros(0, dtype=np.uint8)).tolist() == []
+
+
+def test_build_and_search(tmpdir, collection):
+    """
+    Test that a built index ranks the documents containing the query terms by BM25.
+    """
+    path = str(tmpdir.join('index'))
+
+    assert BM25IndexBuilder(path, 'source_description').build([collection]) == 3
+
+    index = BM25Index(path)
+    results = index.search('ai platform', limit=10)
+    assert [(collection_name, document_id) for _, collection_name, document_id in results] == [
+        ('investment', 3), ('investment', 1),
+    ]
+    assert results[0][0] > results[1][0]
+    assert index.search('ai', limit=1)[0][2] == 3
+    assert index.search('unknown', limit=10) == []
+
+
+def test_length_norms_are_stored_with_the_generation(tmpdir, collection):
+    """
+    Test that the length norms are stored with the generation, and computed once when
+    opening a generation without them.
+    """
+    path = str(tmpdir.join('index'))
+    BM25IndexBuilder(path, 'source_description').build([collection])
+    index = BM25Index(path)
+    expected_norms = length_norms(index.doc_lengths, index.meta['average_length'])
+    results = index.search('ai platform', limit=10)
+
+    assert isinstance(index.length_norms, np.memmap)
+    assert np.allclose(index.length_norms, expected_norms)
+
+    os.remove(os.path.join(index.generation_path, 'length_norms.bin'))
+    previous_index = BM25Index(path)
+    assert np.allclose(previous_index.length_norms, expected_norms)
+    assert previous_index.search('ai platform', limit=10) == results
+
+
+def test_update_adds_new_documents(tmpdir, collection):
+    """
+    Test that an update adds the documents written since the last build.
+    """
+    path = str(tmpdir.join('index'))
+    BM25IndexBuilder(path, 'source_description').build([collection])
+    collection.documents.append({
+        '_id': 5, 'source_description': 'Biotech seed round',
+        '_loaded_at': datetime(2024, 1, 2),
+    })
+
+    assert BM25IndexBuilder(path, 'source_description').update([collection]) == 1
+
+    results = BM25Index(path).search('biotech', limit=10)
+    assert sorted(document_id for _, _, document_id in results) == [2, 5]
+
+
+def test_update_replaces_upserted_documents(tmpdir):
+    """
+    Test that an update replaces the previous version of an upserted document.
+    """
+    path = str(tmpdir.join('index'))
+    collection = FakeCollection('funds', [
+        {'_id': 'funds:b', 'source_description': 'Seed fund', '_loaded_at': LOADED_AT},
+        {'_id': 'funds:a', 'source_description': 'Growth fund', '_loaded_at': LOADED_AT},
+    ])
+    BM25IndexBuilder(path, 'source_description').build([collection])
+    collection.documents[1] = {
+        '_id': 'funds:a', 'source_description': 'Biotech fund',
+        '_loaded_at': datetime(2024, 1, 2),
+    }
+
+    assert BM25IndexBuilder(path, 'source_description').update([collection]) == 1
+
+    index = BM25Index(path)
+    assert index.meta['document_count'] == 2
+    assert [document_id for _, _, document_id in index.search('biotech', limit=10)] == ['funds:a']
+    assert index.search('growth', limit=10) == []
+    assert [document_id for _, _, document_id in index.search('seed', limit=10)] == ['funds:b']
+
+
+def test_every_write_swaps_a_whole_generation(tmpdir, collection):
+    """
+    Test that every write switches to a new generation and keeps only the previous one.
+    """
+    path = str(tmpdir.join('index'))
+    BM25IndexBuilder(path, 'source_description').build([collection])
+    first_index = BM25Index(path)
+
+    for _ in range(3):
+        BM25IndexBuilder(path, 'source_description').build([collection])
+
+    with open(os.path.join(path, CURRENT_FILE), encoding='utf-8') as current_file:
+        current_generation = current_file.read()
+    assert sorted(name for name in os.listdir(path) if name != CURRENT_FILE) == [
+        'generation-000003', current_generation,
+    ]
+    assert first_index.search('ai', limit=1)[0][2] == 3
+    assert BM25Index(path).generation_path.endswith(current_generation)
+
+
+def test_update_without_an_index_builds_an_empty_one(tmpdir):
+    """
+    Test that an update without a previous build runs a full build, and that an index
+    without documents finds nothing.
+    """
+    path = str(tmpdir.join('index'))
+
+    assert BM25IndexBuilder(path, 'source_description').update([FakeCollection('funds', [])]) == 0
+
+    index = BM25Index(path)
+    assert index.meta['document_count'] == 0
+    assert len(index.doc_lengths) == 0
+    assert index.search('ai', limit=10) == []
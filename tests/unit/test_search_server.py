@@ -0,0 +1,309 @@
+"""
+Module for defining the SearchServer tests.
+"""
+import asyncio
+import json
+import socket
+import threading
+import time
+from unittest.mock import MagicMock
+import pytest
+
+import search_server
+from search_server import MAX_REQUEST_LINE_BYTES, SearchServer, ServerConfigs
+
+
+def request(server: SearchServer, raw_requests: bytes) -> bytes:
+    """
+    Sends raw HTTP requests over one connection to a server on an ephemeral port.
+    """
+    async def run() -> bytes:
+        listener = await asyncio.start_server(
+            server.handle_connection, '127.0.0.1', 0, limit=MAX_REQUEST_LINE_BYTES
+        )
+        port = listener.sockets[0].getsockname()[1]
+        async with listener:
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(raw_requests)
+            writer.write_eof()
+            await writer.drain()
+            response = await reader.read()
+            writer.close()
+            return response
+
+    return asyncio.run(run())
+
+
+def response_bodies(response: bytes):
+    """
+    Splits the JSON bodies out of keep-alive responses.
+    """
+    bodies = []
+    for part in response.split(b'HTTP/1.1 ')[1:]:
+        bodies.append(json.loads(part.split(b'\r\n\r\n', 1)[1]))
+    return bodies
+
+
+def test_search_and_batch_share_one_search_tool():
+    """
+    Test that keep-alive search, batch and health requests are served by one search tool.
+    """
+    search_tool = MagicMock()
+    search_tool.search.side_effect = lambda query: [{'_id': query}]
+    search_tool.search_page.side_effect = lambda query, page_size, cursor, fields: {
+        'results': [{'_id': query, 'fields': fields}], 'next_cursor': cursor,
+    }
+    server = SearchServer(search_tool)
+    batch = json.dumps({'queries': ['ai', 'biotech']}).encode()
+
+    response = request(
+        server,
+        b'GET /search?q=ai+startup&fields=name,city&cursor=abc HTTP/1.1\r\n\r\n'
+        b'POST /batch HTTP/1.1\r\nContent-Length: ' + str(len(batch)).encode() + b'\r\n\r\n'
+        + batch
+        + b'GET /health HTTP/1.1\r\nConnection: close\r\n\r\n'
+    )
+
+    assert response_bodies(response) == [
+        {
+            'query': 'ai startup',
+            'results': [{'_id': 'ai startup', 'fields': ['name', 'city']}],
+            'next_cursor': 'abc',
+        },
+        {'results': [
+            {'query': 'ai', 'results': [{'_id': 'ai'}]},
+            {'query': 'biotech', 'results': [{'_id': 'biotech'}]},
+        ]},
+        {'status': 'ok'},
+    ]
+
+
+def test_batch_queries_run_in_parallel_up_to_the_limit():
+    """
+    Test that the queries of a batch run in parallel, at most max_concurrent_queries at once.
+    """
+    running, peak = [0], [0]
+    lock = threading.Lock()
+
+    def search(_):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+        return []
+
+    search_tool = MagicMock()
+    search_tool.search.side_effect = search
+    server = SearchServer(search_tool, max_concurrent_queries=2)
+
+    asyncio.run(server.search_batch(['a', 'b', 'c', 'd']))
+
+    assert peak[0] == 2
+
+
+@pytest.mark.parametrize('body', [
+    b'{"queries": 1}',
+    b'not json',
+    b'["ai"]',
+    json.dumps({'queries': ['ai'] * (ServerConfigs.MAX_BATCH_SIZE + 1)}).encode(),
+], ids=['not a list', 'not json', 'not an object', 'too many queries'])
+def test_invalid_batch_is_rejected(body):
+    """
+    Test that batch bodies without a list of at most MAX_BATCH_SIZE query strings are
+    answered with a 400 response.
+    """
+    search_tool = MagicMock()
+    server = SearchServer(search_tool)
+
+    status, response = asyncio.run(server.handle_request('POST', '/batch', body))
+
+    assert status == 400
+    assert 'error' in response
+    search_tool.search.assert_not_called()
+
+
+def response_statuses(response: bytes):
+    """
+    Extracts the status codes of keep-alive responses.
+    """
+    return [int(part.split(b' ', 1)[0]) for part in response.split(b'HTTP/1.1 ')[1:]]
+
+
+def test_unknown_paths_and_wrong_methods_are_rejected():
+    """
+    Test that unknown paths get a 404 response and wrong methods a 405 response.
+    """
+    server = SearchServer(MagicMock())
+
+    response = request(
+        server,
+        b'GET /unknown HTTP/1.1\r\n\r\n'
+        b'POST /search HTTP/1.1\r\n\r\n'
+        b'GET /batch HTTP/1.1\r\nConnection: close\r\n\r\n'
+    )
+
+    assert response_statuses(response) == [404, 405, 405]
+    assert response_bodies(response)[0] == {'error': 'unknown path /unknown'}
+
+
+def test_invalid_search_parameters_are_rejected():
+    """
+    Test that invalid paging parameters are answered with a 400 response.
+    """
+    server = SearchServer(MagicMock())
+
+    status, response = asyncio.run(server.handle_request('GET', '/search?q=ai&page_size=x', b''))
+
+    assert status == 400
+    assert 'error' in response
+
+
+@pytest.fixture(name='internal_error_response')
+def internal_error_response_fixture():
+    """
+    Response of a connection whose batch query raises, followed by a health request.
+    """
+    search_tool = MagicMock()
+    search_tool.search.side_effect = RuntimeError('connection lost')
+    batch = b'{"queries": ["ai"]}'
+    return request(
+        SearchServer(search_tool),
+        b'POST /batch HTTP/1.1\r\nContent-Length: ' + str(len(batch)).encode() + b'\r\n\r\n'
+        + batch
+        + b'GET /health HTTP/1.1\r\nConnection: close\r\n\r\n'
+    )
+
+
+def test_unexpected_errors_are_answered_with_500(internal_error_response):
+    """
+    Test that an unexpected error of a query is answered with a 500 response.
+    """
+    assert response_statuses(internal_error_response) == [500, 200]
+    assert response_bodies(internal_error_response)[0] == {
+        'error': 'internal error: connection lost',
+    }
+
+
+def test_keep_alive_connection_ends_when_the_client_closes_it():
+    """
+    Test that a keep-alive connection is closed once the client closes its side.
+    """
+    response = request(SearchServer(MagicMock()), b'GET /health HTTP/1.1\r\n\r\n')
+
+    assert response_statuses(response) == [200]
+
+
+@pytest.mark.parametrize('content_length, status', [
+    (b'abc', 400),
+    (b'-5', 400),
+    (str(ServerConfigs.MAX_BODY_BYTES + 1).encode(), 413),
+], ids=['not a number', 'negative', 'too large'])
+def test_invalid_content_lengths_close_the_connection(content_length, status):
+    """
+    Test that invalid or too large bodies are rejected and close the connection.
+    """
+    search_tool = MagicMock()
+    server = SearchServer(search_tool)
+
+    response = request(
+        server,
+        b'POST /batch HTTP/1.1\r\nContent-Length: ' + content_length + b'\r\n\r\n'
+        b'GET /health HTTP/1.1\r\n\r\n'
+    )
+
+    assert response_statuses(response) == [status]
+    search_tool.search.assert_not_called()
+
+
+@pytest.mark.parametrize('raw_request, error', [
+    (b'GET /health\r\n\r\n', 'malformed request'),
+    (b'GET /' + b'a' * MAX_REQUEST_LINE_BYTES + b' HTTP/1.1\r\n\r\n', 'line too long'),
+    (b'GET /health HTTP/1.1\r\nX-Long: ' + b'a' * MAX_REQUEST_LINE_BYTES + b'\r\n\r\n',
+     'line too long'),
+], ids=['malformed', 'long request line', 'long header line'])
+def test_invalid_request_lines_close_the_connection(raw_request, error):
+    """
+    Test that malformed or too long request lines are rejected and close the connection.
+    """
+    response = request(SearchServer(MagicMock()), raw_request + b'GET /health HTTP/1.1\r\n\r\n')
+
+    assert response_statuses(response) == [400]
+    assert response_bodies(response) == [{'error': error}]
+
+
+def test_connection_closed_before_the_body_is_ignored():
+    """
+    Test that a client closing the connection before sending its body is ignored.
+    """
+    search_tool = MagicMock()
+
+    response = request(
+        SearchServer(search_tool), b'POST /batch HTTP/1.1\r\nContent-Length: 10\r\n\r\n{"q'
+    )
+
+    assert response == b''
+    search_tool.search.assert_not_called()
+
+
+def free_port() -> int:
+    """
+    Returns a TCP port that is free on the loopback interface.
+    """
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+@pytest.mark.parametrize('use_unix_socket', [False, True], ids=['tcp', 'unix socket'])
+def test_serve_answers_on_tcp_or_on_a_unix_socket(tmpdir, capsys, use_unix_socket):
+    """
+    Test that serve listens on the Unix socket if one is given, on TCP otherwise.
+    """
+    unix_socket = str(tmpdir.join('search.sock')) if use_unix_socket else None
+    port = free_port()
+
+    async def run() -> bytes:
+        serving = asyncio.create_task(
+            SearchServer(MagicMock()).serve('127.0.0.1', port, unix_socket)
+        )
+        while 'Serving' not in capsys.readouterr().out:
+            await asyncio.sleep(0.01)
+        if unix_socket:
+            reader, writer = await asyncio.open_unix_connection(unix_socket)
+        else:
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(b'GET /health HTTP/1.1\r\nConnection: close\r\n\r\n')
+        response = await reader.read()
+        writer.close()
+        serving.cancel()
+        return response
+
+    assert response_bodies(asyncio.run(run())) == [{'status': 'ok'}]
+
+
+def test_main_serves_with_the_command_line_options(monkeypatch):
+    """
+    Test that main serves a search tool of the chosen backend until interrupted.
+    """
+    search_tool_class = MagicMock()
+    served = []
+
+    def interrupted_run(coroutine):
+        served.append(coroutine.cr_frame.f_locals)
+        coroutine.close()
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr('search_server.SearchTool', search_tool_class)
+    monkeypatch.setattr('search_server.asyncio.run', interrupted_run)
+    monkeypatch.setattr('sys.argv', [
+        'search_server.py', '--port', '9000', '--backend', 'bm25',
+        '--max-concurrent-queries', '3',
+    ])
+
+    search_server.main()
+
+    search_tool_class.assert_called_once_with(backend='bm25')
+    assert served[0]['port'] == 9000
+    assert served[0]['self'].max_concurrent_queries == 3
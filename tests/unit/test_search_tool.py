@@ -0,0 +1,518 @@
+"""
+Module for defining the SearchTool tests.
+"""
+import io
+import json
+import re
+import threading
+import time
+from datetime import datetime
+from unittest.mock import MagicMock
+import pytest
+
+from bson import ObjectId
+
+from search_tool import (
+    WORD_CHARACTERS, Configs, SearchTool, bson_sort_key, decode_cursor, main, percentile,
+    run_batch,
+)
+
+
+def test_search_runs_one_aggregation_per_collection(monkeypatch):
+    """
+    Test that a multi-word search is answered with a single aggregation per collection.
+    """
+    mock_client = MagicMock()
+    monkeypatch.setattr('search_tool.MongoClient', lambda **_: mock_client)
+    search_tool = SearchTool(use_cache=False)
+    first_collection, second_collection = MagicMock(), MagicMock()
+    first_collection.name, second_collection.name = 'first', 'second'
+    search_tool.collections = [first_collection, second_collection]
+    first_collection.aggregate.return_value = [
+        {'_id': 1, 'match_score': 1, Configs.TEXT_SCORE_FIELD: 2.0},
+    ]
+    second_collection.aggregate.return_value = [
+        {'_id': 2, 'match_score': 2, Configs.TEXT_SCORE_FIELD: 1.0},
+        {'_id': 3, 'match_score': 1, Configs.TEXT_SCORE_FIELD: 3.0},
+    ]
+
+    results = search_tool.search('ai startup')
+
+    assert results == [
+        {'_id': 2, 'match_score': 2},
+        {'_id': 3, 'match_score': 1},
+        {'_id': 1, 'match_score': 1},
+    ]
+    pipeline = first_collection.aggregate.call_args.args[0]
+    assert pipeline == second_collection.aggregate.call_args.args[0]
+    assert pipeline[0] == {'$match': {'$text': {'$search': 'ai startup'}}}
+    assert len(pipeline[1]['$addFields']['match_score']['$add']) == 2
+    assert pipeline[-1] == {'$limit': Configs.DOCUMENT_LIMIT + 1}
+
+
+def test_search_with_empty_query(monkeypatch):
+    """
+    Test that an empty query returns no results without querying MongoDB.
+    """
+    monkeypatch.setattr('search_tool.MongoClient', lambda **_: MagicMock())
+    search_tool = SearchTool(use_cache=False)
+
+    assert search_tool.search('  ') == []
+    for collection in search_tool.collections:
+        collection.aggregate.assert_not_called()
+
+
+def test_build_search_pipeline_escapes_words():
+    """
+    Test that the words are matched literally.
+    """
+    pipeline = SearchTool.build_search_pipeline(['c++', '3.5'])
+
+    word_matches = pipeline[1]['$addFields']['match_score']['$add']
+    regex_match = word_matches[0]['$cond'][0]['$regexMatch']
+    assert r'\+\+(?!' in regex_match['regex']
+    assert regex_match['options'] == 'i'
+    assert word_matches[1]['$cond'][0]['$regexMatch']['regex'] == (
+        rf'(?<!{WORD_CHARACTERS})3\.5(?!{WORD_CHARACTERS})'
+    )
+
+
+def test_build_search_pipeline_ignores_diacritics():
+    """
+    Test that the match score counts words regardless of their diacritical marks, like the
+    $text stage that selects the documents.
+    """
+    pipeline = SearchTool.build_search_pipeline(['cafe', 'Señor'])
+
+    word_matches = pipeline[1]['$addFields']['match_score']['$add']
+    cafe_regex, senor_regex = (
+        word_match['$cond'][0]['$regexMatch']['regex'] for word_match in word_matches
+    )
+    assert re.search(cafe_regex, 'Le Café', re.IGNORECASE)
+    assert re.search(senor_regex, 'senor', re.IGNORECASE)
+    assert not re.search(cafe_regex, 'cave', re.IGNORECASE)
+
+
+def test_build_search_pipeline_matches_whole_words():
+    """
+    Test that a query word only scores the documents containing it as a word, not as a
+    part of a longer word.
+    """
+    pipeline = SearchTool.build_search_pipeline(['art', 'the'])
+
+    word_matches = pipeline[1]['$addFields']['match_score']['$add']
+    art_regex, the_regex = (
+        word_match['$cond'][0]['$regexMatch']['regex'] for word_match in word_matches
+    )
+    assert re.search(art_regex, 'Modern Art, Inc.', re.IGNORECASE)
+    assert not re.search(art_regex, 'startup', re.IGNORECASE)
+    assert not re.search(art_regex, 'Artéfact', re.IGNORECASE)
+    assert re.search(the_regex, 'the startup', re.IGNORECASE)
+    assert not re.search(the_regex, 'other', re.IGNORECASE)
+    assert not re.search(the_regex, 'their', re.IGNORECASE)
+
+
+def test_search_word_runs_a_phrase_search_per_collection(monkeypatch):
+    """
+    Test that the word by word search API is kept.
+    """
+    monkeypatch.setattr('search_tool.MongoClient', lambda **_: MagicMock())
+    search_tool = SearchTool(use_cache=False)
+    collection = MagicMock()
+    collection.find.return_value.sort.return_value = [{'_id': 1}]
+    search_tool.collections = [collection, collection]
+
+    assert search_tool.search_word('ai') == [{'_id': 1}, {'_id': 1}]
+    collection.find.assert_called_with({'$text': {'$search': '"ai"'}})
+    assert search_tool.sort_search_results({1: 1, 2: 3}) == [2, 1]
+
+
+def test_pages_continue_after_the_cursor(monkeypatch):
+    """
+    Test that a page keeps the top documents with a bounded heap and that its cursor
+    selects the documents after its last result.
+    """
+    monkeypatch.setattr('search_tool.MongoClient', lambda **_: MagicMock())
+    search_tool = SearchTool(use_cache=False)
+    first_collection, second_collection = MagicMock(), MagicMock()
+    first_collection.name, second_collection.name = 'acquisitions', 'funds'
+    search_tool.collections = [first_collection, second_collection]
+    first_collection.aggregate.side_effect = lambda _: [
+        {'_id': 1, 'match_score': 2, Configs.TEXT_SCORE_FIELD: 1.5},
+        {'_id': 2, 'match_score': 1, Configs.TEXT_SCORE_FIELD: 1.5},
+    ]
+    second_collection.aggregate.side_effect = lambda _: [
+        {'_id': 1, 'match_score': 1, Configs.TEXT_SCORE_FIELD: 1.5},
+    ]
+
+    page = search_tool.search_page('ai startup', page_size=2, fields=['name'])
+
+    assert page['results'] == [
+        {'_id': 1, 'match_score': 2}, {'_id': 2, 'match_score': 1},
+    ]
+    first_pipeline = first_collection.aggregate.call_args.args[0]
+    assert {'$project': {'name': 1, 'match_score': 1, Configs.TEXT_SCORE_FIELD: 1}} in (
+        first_pipeline
+    )
+    assert first_pipeline[-1] == {'$limit': 3}
+
+    search_tool.search_page('ai startup', page_size=2, cursor=page['next_cursor'])
+
+    first_match = first_collection.aggregate.call_args.args[0][2]['$match']['$and'][1]['$or']
+    assert first_match[-1] == {
+        'match_score': 1, Configs.TEXT_SCORE_FIELD: 1.5, '$expr': {'$gt': ['$_id', 2]},
+    }
+    second_match = second_collection.aggregate.call_args.args[0][2]['$match']['$and'][1]['$or']
+    assert second_match[-1] == {'match_score': 1, Configs.TEXT_SCORE_FIELD: 1.5}
+
+
+def test_full_last_page_has_no_cursor_and_mixed_ids_are_ordered(monkeypatch):
+    """
+    Test that a page only gets a cursor when another page has results, and that ObjectId
+    and string _ids with equal scores are ordered like MongoDB sorts them.
+    """
+    monkeypatch.setattr('search_tool.MongoClient', lambda **_: MagicMock())
+    search_tool = SearchTool(use_cache=False)
+    collection = MagicMock()
+    collection.name = 'funds'
+    search_tool.collections = [collection]
+    object_id = ObjectId()
+    collection.aggregate.side_effect = lambda _: [
+        {'_id': object_id, 'match_score': 1, Configs.TEXT_SCORE_FIELD: 1.0},
+        {'_id': 'funds:1', 'match_score': 1, Configs.TEXT_SCORE_FIELD: 1.0},
+    ]
+
+    page = search_tool.search_page('ai', page_size=2)
+    first_page = search_tool.search_page('ai', page_size=1)
+
+    assert [document['_id'] for document in page['results']] == ['funds:1', object_id]
+    assert page['next_cursor'] is None
+    assert decode_cursor(first_page['next_cursor']) == {
+        'after': [1, 1.0, 'funds', 'funds:1'],
+    }
+
+
+def test_bson_sort_key_orders_types_like_mongodb():
+    """
+    Test that values of different types are ordered like MongoDB sorts them.
+    """
+    object_id = ObjectId()
+    loaded_at = datetime(2024, 1, 1)
+
+    assert sorted([loaded_at, True, object_id, ('a',), 'b', 2.5, None], key=bson_sort_key) == [
+        None, 2.5, 'b', ('a',), object_id, True, loaded_at,
+    ]
+
+
+def test_invalid_cursor_is_rejected():
+    """
+    Test that a cursor token that does not decode raises a ValueError.
+    """
+    with pytest.raises(ValueError, match='Invalid cursor'):
+        decode_cursor('not a cursor')
+
+
+def test_search_with_bm25_index(monkeypatch):
+    """
+    Test that the bm25 backend ranks with the index and fetches the top documents by _id.
+    """
+    mock_client = MagicMock()
+    monkeypatch.setattr('search_tool.MongoClient', lambda **_: mock_client)
+    search_tool = SearchTool(use_cache=False)
+    search_tool.index = MagicMock()
+    search_tool.index.search.return_value = [(2.5, 'investment', 7), (1.5, 'investment', 3)]
+    mock_collection = mock_client[Configs.MONGO_DATABASE]['investment']
+    mock_collection.find.return_value = [{'_id': 3}, {'_id': 7}]
+
+    results = search_tool.search('ai')
+
+    assert results == [{'_id': 7, 'match_score': 2.5}, {'_id': 3, 'match_score': 1.5}]
+    mock_collection.find.assert_called_once_with({'_id': {'$in': [7, 3]}}, None)
+    mock_collection.aggregate.assert_not_called()
+
+
+def test_bm25_backend_opens_the_index_or_asks_for_a_build(monkeypatch, tmpdir):
+    """
+    Test that the bm25 backend opens the index, and asks for an index build when there is
+    no index.
+    """
+    monkeypatch.setattr('search_tool.MongoClient', lambda **_: MagicMock())
+    monkeypatch.setattr(Configs, 'INDEX_PATH', str(tmpdir.join('index')))
+
+    with pytest.raises(FileNotFoundError, match='--build-index'):
+        SearchTool(backend='bm25', use_cache=False)
+
+    index_class = MagicMock()
+    monkeypatch.setattr('search_tool.BM25Index', index_class)
+    assert SearchTool(backend='bm25', use_cache=False).index is index_class.return_value
+    index_class.assert_called_once_with(Configs.INDEX_PATH)
+
+
+@pytest.mark.parametrize('incremental', [False, True], ids=['build', 'update'])
+def test_build_index_builds_or_updates_the_index(monkeypatch, incremental):
+    """
+    Test that build_index runs a full build, or an update when incremental.
+    """
+    monkeypatch.setattr('search_tool.MongoClient', lambda **_: MagicMock())
+    builder_class = MagicMock()
+    builder_class.return_value.build.return_value = 3
+    builder_class.return_value.update.return_value = 1
+    monkeypatch.setattr('search_tool.BM25IndexBuilder', builder_class)
+    search_tool = SearchTool(use_cache=False)
+
+    assert search_tool.build_index(incremental=incremental) == (1 if incremental else 3)
+
+    builder_class.assert_called_once_with(
+        Configs.INDEX_PATH, Configs.SEARCH_QUERY_COLUMN, Configs.LOADED_AT_FIELD
+    )
+    method = builder_class.return_value.update if incremental else builder_class.return_value.build
+    method.assert_called_once_with(search_tool.collections)
+
+
+@pytest.mark.parametrize('option', ['--build-index', '--update-index'])
+def test_main_builds_the_index(monkeypatch, capsys, option):
+    """
+    Test that main builds or updates the index from MongoDB and reports its size.
+    """
+    search_tool_class = MagicMock()
+    search_tool_class.return_value.build_index.return_value = 3
+    monkeypatch.setattr('search_tool.SearchTool', search_tool_class)
+    monkeypatch.setattr('sys.argv', ['search_tool.py', option])
+
+    main()
+
+    search_tool_class.assert_called_once_with(backend='mongo')
+    search_tool_class.return_value.build_index.assert_called_once_with(
+        incremental=option == '--update-index'
+    )
+    assert capsys.readouterr().out == f'Indexed 3 documents at {Configs.INDEX_PATH}.\n'
+
+
+def test_bm25_pages_are_addressed_by_offset(monkeypatch):
+    """
+    Test that the bm25 backend pages through the ranking with offset cursors.
+    """
+    mock_client = MagicMock()
+    monkeypatch.setattr('search_tool.MongoClient', lambda **_: mock_client)
+    search_tool = SearchTool(use_cache=False)
+    search_tool.index = MagicMock()
+    search_tool.index.search.return_value = [
+        (3.0, 'investment', 1), (2.0, 'investment', 2), (1.0, 'investment', 3),
+    ]
+    mock_collection = mock_client[Configs.MONGO_DATABASE]['investment']
+    mock_collection.find.return_value = [{'_id': 1, 'name': 'A'}, {'_id': 2, 'name': 'B'}]
+
+    page = search_tool.search_page('ai', page_size=2, fields=['name'])
+    mock_collection.find.assert_called_once_with({'_id': {'$in': [1, 2]}}, {'name': 1})
+    search_tool.index.search.return_value = []
+    last_page = search_tool.search_page('ai', page_size=2, cursor=page['next_cursor'])
+
+    search_tool.index.search.assert_called_with('ai', 5)
+    assert last_page == {'results': [], 'next_cursor': None}
+
+
+def test_repeated_search_is_served_from_cache(monkeypatch):
+    """
+    Test that a repeated query does no search work until the load generation changes.
+    """
+    mock_client = MagicMock()
+    monkeypatch.setattr('search_tool.MongoClient', lambda **_: mock_client)
+    monkeypatch.setattr(Configs, 'LOAD_GENERATION_CHECK_SECONDS', -1)
+    search_tool = SearchTool(use_cache=True)
+    mock_collection = MagicMock()
+    mock_collection.name = 'investment'
+    mock_collection.aggregate.side_effect = lambda _: [
+        {'_id': 1, 'match_score': 1, Configs.TEXT_SCORE_FIELD: 1.0},
+    ]
+    search_tool.collections = [mock_collection]
+    meta_collection = mock_client[Configs.MONGO_DATABASE][Configs.META_COLLECTION]
+    meta_collection.find_one.return_value = {'_id': Configs.LOAD_GENERATION_ID, 'value': 1}
+
+    assert search_tool.search('AI') == [{'_id': 1, 'match_score': 1}]
+    assert search_tool.search(' ai ') == [{'_id': 1, 'match_score': 1}]
+    assert mock_collection.aggregate.call_count == 1
+
+    meta_collection.find_one.return_value = {'_id': Configs.LOAD_GENERATION_ID, 'value': 2}
+    search_tool.search('ai')
+    assert mock_collection.aggregate.call_count == 2
+
+
+def test_run_batch_streams_results_and_summarizes():
+    """
+    Test that a batch writes one JSONL line per query and returns a latency summary.
+    """
+    search_tool = MagicMock()
+    search_tool.search.side_effect = lambda query: (
+        [{'_id': query}] if query != 'broken' else 1 / 0
+    )
+    output = io.StringIO()
+    input_lines = [
+        json.dumps({'id': 1, 'query': 'ai'}),
+        '',
+        json.dumps('biotech'),
+        json.dumps({'id': 3, 'query': 'broken'}),
+    ]
+
+    summary = run_batch(search_tool, input_lines, output, concurrency=2)
+
+    results = sorted(
+        (json.loads(line) for line in output.getvalue().splitlines()),
+        key=lambda result: result['query'],
+    )
+    assert [result['query'] for result in results] == ['ai', 'biotech', 'broken']
+    assert results[0]['id'] == 1 and results[0]['results'] == [{'_id': 'ai'}]
+    assert 'error' in results[2]
+    assert all(result['latency_ms'] >= 0 for result in results)
+    assert summary['queries'] == 3
+    assert summary['errors'] == 1
+    assert summary['p50_ms'] <= summary['p95_ms'] <= summary['p99_ms']
+
+
+def test_run_batch_reports_invalid_lines_and_goes_on():
+    """
+    Test that malformed lines get an error line each instead of aborting the batch.
+    """
+    search_tool = MagicMock()
+    search_tool.search.side_effect = lambda query: [{'_id': query}]
+    output = io.StringIO()
+    input_lines = ['{"query": ', json.dumps({'id': 2}), json.dumps({'query': 'ai'})]
+
+    summary = run_batch(search_tool, input_lines, output, concurrency=1)
+
+    results = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert results[0]['line'] == 1 and results[0]['error'].startswith('invalid JSON')
+    assert results[1] == {'line': 2, 'id': 2, 'error': 'expected a query string'}
+    assert results[2]['results'] == [{'_id': 'ai'}]
+    assert summary['queries'] == 1
+    assert summary['errors'] == 2
+
+
+def test_run_batch_writes_results_before_the_input_ends():
+    """
+    Test that a finished query is written while the next input lines are still read.
+    """
+    resumed = threading.Event()
+
+    def search(query):
+        resumed.wait(1)
+        return [{'_id': query}]
+
+    search_tool = MagicMock()
+    search_tool.search.side_effect = search
+    output = io.StringIO()
+    written_before_the_end = []
+
+    def input_lines():
+        yield json.dumps('ai')
+        resumed.set()
+        deadline = time.monotonic() + 1
+        while not output.getvalue() and time.monotonic() < deadline:
+            time.sleep(0.01)
+            yield ''
+        written_before_the_end.append(bool(output.getvalue()))
+        yield json.dumps('biotech')
+
+    run_batch(search_tool, input_lines(), output, concurrency=8)
+
+    assert written_before_the_end == [True]
+    assert [json.loads(line)['query'] for line in output.getvalue().splitlines()] == [
+        'ai', 'biotech',
+    ]
+
+
+def test_percentile():
+    """
+    Test the nearest-rank percentile.
+    """
+    values = [float(value) for value in range(1, 101)]
+
+    assert percentile(values, 0.5) == 50.0
+    assert percentile(values, 0.99) == 99.0
+    assert percentile([], 0.5) == 0.0
+
+
+def test_search_translates_field_aliases(monkeypatch):
+    """
+    Test that requested fields are searched by their alias and returned by their name.
+    """
+    mock_client = MagicMock()
+    monkeypatch.setattr('search_tool.MongoClient', lambda **_: mock_client)
+    search_tool = SearchTool(use_cache=False)
+    meta_collection = mock_client[Configs.MONGO_DATABASE][Configs.META_COLLECTION]
+    meta_collection.find_one.side_effect = lambda query: (
+        {'aliases': {'object_id': 'oid'}} if query['_id'].startswith('field_aliases') else None
+    )
+    mock_collection = MagicMock()
+    mock_collection.name = 'investment'
+    mock_collection.aggregate.return_value = [
+        {'_id': 1, 'oid': 'c:1', 'match_score': 1, Configs.TEXT_SCORE_FIELD: 1.0},
+    ]
+    search_tool.collections = [mock_collection]
+
+    page = search_tool.search_page('ai', fields=['object_id'])
+
+    project_stage = mock_collection.aggregate.call_args.args[0][3]
+    assert 'oid' in project_stage['$project']
+    assert page['results'] == [{'_id': 1, 'object_id': 'c:1', 'match_score': 1}]
+
+
+@pytest.mark.parametrize('results, next_cursor, expected_output', [
+    ([{'_id': 1}], 'abc', '[\n    {\n        "_id": 1\n    }\n]\n'),
+    ([], None, 'No results found.\n'),
+], ids=['results', 'no results'])
+def test_main_prints_a_page_and_its_cursor(
+        monkeypatch, capsys, results, next_cursor, expected_output
+):
+    """
+    Test that main prints the results of a page, and the cursor of the next page to stderr.
+    """
+    search_tool_class = MagicMock()
+    search_tool_class.return_value.search_page.return_value = {
+        'results': results, 'next_cursor': next_cursor,
+    }
+    monkeypatch.setattr('search_tool.SearchTool', search_tool_class)
+    monkeypatch.setattr('sys.argv', [
+        'search_tool.py', 'ai', '--fields', 'name,city', '--page-size', '5', '--cursor', 'xyz',
+    ])
+
+    main()
+
+    search_tool_class.return_value.search_page.assert_called_once_with(
+        'ai', 5, 'xyz', ['name', 'city']
+    )
+    output = capsys.readouterr()
+    assert output.out == expected_output
+    assert output.err == (f'Next page: --cursor {next_cursor}\n' if next_cursor else '')
+
+
+@pytest.mark.parametrize('use_stdin', [False, True], ids=['file', 'stdin'])
+def test_main_runs_a_batch(monkeypatch, capsys, tmpdir, use_stdin):
+    """
+    Test that main runs the queries of a batch file or of stdin and reports the summary.
+    """
+    search_tool_class = MagicMock()
+    search_tool_class.return_value.search.side_effect = lambda query: [{'_id': query}]
+    monkeypatch.setattr('search_tool.SearchTool', search_tool_class)
+    batch_file = tmpdir.join('queries.jsonl')
+    batch_file.write('"ai"\n')
+    monkeypatch.setattr('sys.stdin', io.StringIO('"ai"\n'))
+    monkeypatch.setattr('sys.argv', [
+        'search_tool.py', '--batch', '-' if use_stdin else str(batch_file), '--backend', 'bm25',
+    ])
+
+    main()
+
+    search_tool_class.assert_called_once_with(backend='bm25')
+    output = capsys.readouterr()
+    assert json.loads(output.out)['results'] == [{'_id': 'ai'}]
+    assert json.loads(output.err)['queries'] == 1
+
+
+def test_main_requires_a_query(monkeypatch):
+    """
+    Test that main exits with a usage error without a query, a batch or an index option.
+    """
+    monkeypatch.setattr('sys.argv', ['search_tool.py'])
+
+    with pytest.raises(SystemExit):
+        main()